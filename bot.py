@@ -2,26 +2,55 @@ import discord
 from discord.ext import commands
 import asyncio
 import logging
-from database import Database
+import time
+from database import Database, DEFAULT_COMMAND_PERMISSIONS
+from storage import create_backend, create_cache
 from config import Config
+from utils.sanctions import SanctionPipeline
+from utils.watchdog import LoopWatchdog
+from utils.logs import setup_dedicated_log
 
-class CrowBot(commands.Bot):
-    def __init__(self):
+class CrowBot(commands.AutoShardedBot):
+    def __init__(self, shard_ids=None, shard_count=None, cluster=None):
+        self.config = Config()
+        
         # Initialize with default prefix, will be updated from database
         intents = discord.Intents.default()
         intents.message_content = True
         intents.members = True
         intents.guilds = True
         
+        # Cache sizing: the lean profile only keeps members seen joining or updating,
+        # plus guilds chunked on demand by ensure_members()
+        profile = self.config.memory_profiles[self.config.memory_profile]
+        member_cache_flags = discord.MemberCacheFlags.from_intents(intents)
+        member_cache_flags.voice = profile['cache_voice_members']
+        
         super().__init__(
             command_prefix=self.get_prefix,
             intents=intents,
-            help_command=None
+            help_command=None,
+            shard_ids=shard_ids,
+            shard_count=shard_count,
+            member_cache_flags=member_cache_flags,
+            chunk_guilds_at_startup=profile['chunk_guilds_at_startup'],
+            max_messages=profile['max_messages']
         )
         
-        self.db = Database()
-        self.config = Config()
+        self.db = Database(
+            backend=create_backend(self.config.database_url),
+            cache=create_cache(self.config.redis_url)
+        )
         self.logger = logging.getLogger('chdfz gestion')
+        self.sanctions = SanctionPipeline(self)
+        # ClusterClient when launched by cluster.py, None for a single process
+        self.cluster = cluster
+        self._chunk_locks = {}
+        self.watchdog = LoopWatchdog(
+            logging.getLogger('chdfz gestion.watchdog'),
+            interval=self.config.watchdog_interval,
+            threshold=self.config.watchdog_threshold
+        )
         
     async def get_prefix(self, message):
         """Get the prefix for a guild"""
@@ -32,14 +61,29 @@ class CrowBot(commands.Bot):
         return prefix or self.config.default_prefix
     
     async def setup_hook(self):
+        # Stalls also get their own file so they are easy to find
+        stall_log = f'crowbot-stalls-cluster-{self.cluster.cluster_id}.log' if self.cluster else 'crowbot-stalls.log'
+        setup_dedicated_log(self.config, 'chdfz gestion.watchdog', stall_log)
+        self.watchdog.start()
+        # Settings changed by another process through the shared cache reach the cogs like cluster ones
+        self.db.remote_invalidation_hook = lambda kind, guild_id: self.dispatch('cache_invalidate', kind, guild_id)
         await self.db.initialize()
+        await self.db.load_ownership_cache()
+        if self.cluster:
+            await self.cluster.start(self)
+            self.db.invalidation_hook = self.cluster.publish_invalidation
+        self.sanctions.start()
         cogs = [
             'cogs.administration',
             'cogs.moderation',
             'cogs.roles',
             'cogs.help_interactive',
             'cogs.triggers',
-            'cogs.ownership'
+            'cogs.ownership',
+            'cogs.antiraid',
+            'cogs.antispam',
+            'cogs.maintenance',
+            'cogs.diagnostics'
         ]
 
         for cog in cogs:
@@ -50,11 +94,49 @@ class CrowBot(commands.Bot):
                 except Exception as e:
                     self.logger.error(f"Failed to load cog {cog}: {e}")
     
+    async def close(self):
+        await self.watchdog.close()
+        await self.sanctions.close()
+        await super().close()
+        if self.cluster:
+            await self.cluster.close()
+        await self.db.close()
+    
+    async def before_identify_hook(self, shard_id, *, initial=False):
+        """In a cluster, IDENTIFY slots are handed out by the coordinator for every process"""
+        if self.cluster:
+            await self.cluster.acquire_identify(shard_id)
+        else:
+            await super().before_identify_hook(shard_id, initial=initial)
+    
+    async def is_buyer_user(self, user_id, guild_id):
+        """Whether the user is the buyer of the bot in this guild"""
+        buyer, _ = await self.db.get_ownership(guild_id)
+        return buyer == user_id
+    
+    async def is_owner_user(self, user_id, guild_id):
+        """Whether the user is an owner (or the buyer) of the bot in this guild"""
+        buyer, owners = await self.db.get_ownership(guild_id)
+        return user_id == buyer or user_id in owners
+    
+    async def ensure_members(self, guild):
+        """Full member list of a guild, requested from Discord the first time it is needed"""
+        if not guild.chunked:
+            lock = self._chunk_locks.setdefault(guild.id, asyncio.Lock())
+            async with lock:
+                if not guild.chunked:
+                    await guild.chunk(cache=True)
+        return guild.members
+    
     async def on_ready(self):
         """Called when the bot is ready"""
         self.logger.info(f'{self.user.name if self.user else "Bot"} has connected to Discord!')
         self.logger.info(f'Bot is in {len(self.guilds)} guilds')
         
+        initialized = await self.db.bootstrap_guilds([guild.id for guild in self.guilds])
+        if initialized:
+            self.logger.info(f"Initialized default permissions for {initialized} guilds")
+        
         # Set bot status
         await self.change_presence(
             activity=discord.Activity(
@@ -66,15 +148,43 @@ class CrowBot(commands.Bot):
     async def on_guild_join(self, guild):
         """Called when the bot joins a new guild"""
         self.logger.info(f"Joined guild: {guild.name} (ID: {guild.id})")
-        await self.db.setup_guild(guild.id)
+        await self.db.bootstrap_guilds([guild.id])
+    
+    async def on_command_completion(self, ctx):
+        """Structured record of each command with its latency (guild, command, latency_ms)"""
+        if not self.logger.isEnabledFor(logging.INFO):
+            return
+        source = 'slash' if ctx.interaction else 'prefix'
+        # From the snowflake timestamp: gateway delivery, parsing and checks all count
+        created_at = ctx.interaction.created_at if ctx.interaction else ctx.message.created_at
+        latency_ms = round((discord.utils.utcnow() - created_at).total_seconds() * 1000, 1)
+        # The text form carries the source too, for scripts/command_latency.py
+        self.logger.info(
+            "Command %s (%s) completed in %.1f ms", ctx.command.qualified_name, source, latency_ms,
+            extra={
+                'guild_id': ctx.guild.id if ctx.guild else None,
+                'channel_id': ctx.channel.id,
+                'user_id': ctx.author.id,
+                'command': ctx.command.qualified_name,
+                'latency_ms': latency_ms,
+                'source': source
+            }
+        )
     
     async def on_command_error(self, ctx, error):
         """Global error handler"""
         if isinstance(error, commands.CommandNotFound):
             return
         
+        # Errors raised on the slash side of hybrid commands (option transformers)
+        if isinstance(error, commands.HybridCommandError):
+            error = error.original
+        
         if isinstance(error, commands.CheckFailure):
             # Don't send error message for check failures, already handled by custom checks
+            # A slash command must still be answered or Discord shows it as failed
+            if ctx.interaction and not ctx.interaction.response.is_done():
+                await ctx.send(f"❌ {error}", ephemeral=True)
             return
         
         if isinstance(error, commands.MissingPermissions):
@@ -108,15 +218,23 @@ class CrowBot(commands.Bot):
             return
         
         # Enhanced error logging with more details
-        self.logger.error(f"Unhandled error in command '{ctx.command}' by {ctx.author} ({ctx.author.id}) in {ctx.guild.name if ctx.guild else 'DM'}: {error}")
+        self.logger.error(
+            f"Unhandled error in command '{ctx.command}' by {ctx.author} ({ctx.author.id}) in {ctx.guild.name if ctx.guild else 'DM'}: {error}",
+            extra={
+                'guild_id': ctx.guild.id if ctx.guild else None,
+                'user_id': ctx.author.id,
+                'command': ctx.command.qualified_name if ctx.command else None
+            }
+        )
         await ctx.send(f"❌ **Erreur inattendue**\n🔧 Détails : `{str(error)[:100]}...`\n💡 Contactez l'administrateur si le problème persiste.")
     
     async def check_permissions(self, ctx, command_name):
         """Check if user has permission to use a command"""
-        # Initialize default permissions if not set
-        existing_perms = await self.db.get_all_command_permissions(ctx.guild.id)
-        if not existing_perms:
-            await self.db.initialize_default_permissions(ctx.guild.id)
+        await self.db.prefetch_command_state(ctx.guild.id)
+        
+        # Guilds are bootstrapped at on_ready/on_guild_join; this only runs again after a reset
+        if ctx.guild.id not in self.db.initialized_guilds:
+            await self.db.bootstrap_guilds([ctx.guild.id])
         
         # Bot owner always has permission
         if await self.is_owner(ctx.author):
@@ -127,17 +245,18 @@ class CrowBot(commands.Bot):
             return True
         
         # Check buyer permission
-        if await self.is_buyer_user(ctx.author.id):
+        if await self.is_buyer_user(ctx.author.id, ctx.guild.id):
             return True
         
+        # Get command permission level (commands added after the guild was set up fall back to their default)
+        command_level = await self.db.get_command_permission_level(ctx.guild.id, command_name)
+        command_level = command_level or DEFAULT_COMMAND_PERMISSIONS.get(command_name)
+        
         # Check owner permission
-        if await self.is_owner_user(ctx.author.id):
-            command_level = await self.db.get_command_permission_level(ctx.guild.id, command_name)
-            if command_level in ['owner', 'buyer', 'public', 'everyone'] or command_level.startswith('perm'):
+        if await self.is_owner_user(ctx.author.id, ctx.guild.id):
+            if command_level in ['owner', 'buyer', 'public', 'everyone'] or (command_level and command_level.startswith('perm')):
                 return True
         
-        # Get command permission level
-        command_level = await self.db.get_command_permission_level(ctx.guild.id, command_name)
         if not command_level:
             return True  # Default allow if no permission set
         
@@ -161,10 +280,10 @@ class CrowBot(commands.Bot):
             return True  # TODO: Add public channel check if needed
         
         if command_level == 'owner':
-            return await self.is_owner_user(ctx.author.id)
+            return await self.is_owner_user(ctx.author.id, ctx.guild.id)
         
         if command_level == 'buyer':
-            return await self.is_buyer_user(ctx.author.id)
+            return await self.is_buyer_user(ctx.author.id, ctx.guild.id)
         
         # Handle permission levels (perm1-perm9)
         if command_level.startswith('perm'):
@@ -210,7 +329,6 @@ class CrowBot(commands.Bot):
             await self.db.update_last_command_use(ctx.guild.id, ctx.author.id, command_name)
             return True
         
-        import time
         if time.time() - last_used < cooldown_time:
             return False
         
@@ -0,0 +1,405 @@
+import os
+import json
+import time
+import signal
+import asyncio
+import logging
+import argparse
+import tempfile
+import multiprocessing
+from typing import Any, Dict, List, Optional, Set
+
+import aiohttp
+from aiohttp import web
+
+from config import Config
+from database import Database
+from storage import create_backend, SQLiteBackend
+from utils.ipc import send_message, read_message
+from utils.logs import setup_logging
+
+IDENTIFY_INTERVAL = 5.0
+RESTART_BACKOFF_MAX = 60.0
+STABLE_AFTER = 60.0
+STATS_STALE_AFTER = 30.0
+SHUTDOWN_TIMEOUT = 15.0
+
+logger = logging.getLogger('chdfz gestion.coordinator')
+
+def run_worker(cluster_id: int, shard_ids: List[int], shard_count: int, socket_path: str, token: str):
+    """Entry point of a worker process: one CrowBot for a range of shards"""
+    # One file per process: rotation is not safe with several writers on the same file
+    setup_logging(Config(), f'crowbot-cluster-{cluster_id}.log', worker=f'cluster {cluster_id}')
+
+    from bot import CrowBot
+    from utils.ipc import ClusterClient
+
+    async def main():
+        bot = CrowBot(
+            shard_ids=shard_ids,
+            shard_count=shard_count,
+            cluster=ClusterClient(socket_path, cluster_id)
+        )
+        loop = asyncio.get_running_loop()
+        close_tasks: Set[asyncio.Task] = set()
+
+        def close_done(task: asyncio.Task):
+            close_tasks.discard(task)
+            if not task.cancelled() and task.exception() is not None:
+                logging.error(f"Cluster {cluster_id} failed to shut down cleanly: {task.exception()!r}")
+
+        def request_close():
+            task = asyncio.create_task(bot.close(), name=f"cluster-{cluster_id}-close")
+            close_tasks.add(task)
+            task.add_done_callback(close_done)
+
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            loop.add_signal_handler(sig, request_close)
+
+        try:
+            await bot.start(token)
+        except Exception as e:
+            logging.error(f"Cluster {cluster_id} encountered an error: {e}")
+        finally:
+            await bot.close()
+
+    asyncio.run(main())
+
+async def fetch_gateway(token: str) -> Dict[str, Any]:
+    """Recommended shard count and IDENTIFY max_concurrency"""
+    headers = {'Authorization': f'Bot {token}'}
+    async with aiohttp.ClientSession(headers=headers) as session:
+        async with session.get('https://discord.com/api/v10/gateway/bot') as response:
+            response.raise_for_status()
+            return await response.json()
+
+def split_shards(shard_count: int, workers: int) -> List[List[int]]:
+    """Contiguous shard ranges, as even as possible"""
+    workers = max(1, min(workers, shard_count))
+    size, extra = divmod(shard_count, workers)
+    ranges, start = [], 0
+    for index in range(workers):
+        end = start + size + (1 if index < extra else 0)
+        ranges.append(list(range(start, end)))
+        start = end
+    return ranges
+
+class WorkerHandle:
+    """Worker process tracked by the coordinator"""
+
+    def __init__(self, cluster_id: int, shard_ids: List[int]):
+        self.cluster_id = cluster_id
+        self.shard_ids = shard_ids
+        self.process: Optional[multiprocessing.Process] = None
+        self.writer: Optional[asyncio.StreamWriter] = None
+        self.started_at = 0.0
+        self.restarts = 0
+        self.backoff = 1.0
+        self.restart_at: Optional[float] = None
+        self.stats: Optional[Dict[str, Any]] = None
+        self.stats_at = 0.0
+
+    @property
+    def alive(self) -> bool:
+        return self.process is not None and self.process.is_alive()
+
+    @property
+    def healthy(self) -> bool:
+        return (
+            self.alive and self.writer is not None
+            and time.time() - self.stats_at < STATS_STALE_AFTER
+        )
+
+class Coordinator:
+    """Start the workers, grant IDENTIFY slots and relay cache invalidations
+
+    Each worker is a CrowBot limited to its shards. The database is shared:
+    PostgreSQL preferably, otherwise the SQLite file in WAL mode.
+    """
+
+    def __init__(self, token: str, shard_count: int, max_concurrency: int,
+                 workers: int, socket_path: str, metrics_port: int):
+        self.token = token
+        self.shard_count = shard_count
+        self.max_concurrency = max(1, max_concurrency)
+        self.socket_path = socket_path
+        self.metrics_port = metrics_port
+        self.workers = {
+            cluster_id: WorkerHandle(cluster_id, shard_ids)
+            for cluster_id, shard_ids in enumerate(split_shards(shard_count, workers))
+        }
+        self.context = multiprocessing.get_context('spawn')
+        self.invalidations = 0
+        self.identifies = 0
+        self._identify_locks: Dict[int, asyncio.Lock] = {}
+        self._identify_next: Dict[int, float] = {}
+        # Pending IDENTIFY grants, referenced so they are not collected before replying
+        self._identify_tasks: Set[asyncio.Task] = set()
+        self._stopping = asyncio.Event()
+
+    async def prepare_database(self):
+        """Create the schema once, before the workers start"""
+        backend = create_backend(Config().database_url)
+        db = Database(backend=backend)
+        await db.initialize()
+        if isinstance(backend, SQLiteBackend):
+            # SQLite has a single writer: WAL lets the workers read while it is held
+            await backend.enable_wal()
+            logger.warning("SQLite shared by several processes: DATABASE_URL=postgresql://... is recommended")
+        await db.close()
+
+    # ── Processes ────────────────────────────────────────────
+
+    def spawn(self, worker: WorkerHandle):
+        worker.process = self.context.Process(
+            target=run_worker,
+            args=(worker.cluster_id, worker.shard_ids, self.shard_count, self.socket_path, self.token),
+            name=f'crowbot-cluster-{worker.cluster_id}'
+        )
+        worker.process.start()
+        worker.started_at = time.time()
+        worker.restart_at = None
+        logger.info(f"Cluster {worker.cluster_id} started (pid {worker.process.pid}, shards {worker.shard_ids})")
+
+    async def supervise(self):
+        """Restart stopped workers with an increasing delay"""
+        while not self._stopping.is_set():
+            now = time.time()
+            for worker in self.workers.values():
+                if worker.alive:
+                    continue
+                if worker.restart_at is None:
+                    if now - worker.started_at > STABLE_AFTER:
+                        worker.backoff = 1.0
+                    worker.restart_at = now + worker.backoff
+                    logger.warning(
+                        f"Cluster {worker.cluster_id} exited (code {worker.process.exitcode}), "
+                        f"restarting in {worker.backoff:.0f}s"
+                    )
+                    worker.backoff = min(worker.backoff * 2, RESTART_BACKOFF_MAX)
+                elif now >= worker.restart_at:
+                    worker.restarts += 1
+                    self.spawn(worker)
+            try:
+                await asyncio.wait_for(self._stopping.wait(), timeout=1.0)
+            except asyncio.TimeoutError:
+                pass
+
+    async def stop_workers(self):
+        for worker in self.workers.values():
+            if worker.alive:
+                worker.process.terminate()
+
+        deadline = time.time() + SHUTDOWN_TIMEOUT
+        for worker in self.workers.values():
+            if worker.process is None:
+                continue
+            await asyncio.to_thread(worker.process.join, max(0.0, deadline - time.time()))
+            if worker.process.is_alive():
+                logger.warning(f"Cluster {worker.cluster_id} did not stop, killing it")
+                worker.process.kill()
+
+    # ── IPC ──────────────────────────────────────────────────
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        worker = None
+        try:
+            hello = await read_message(reader)
+            if not hello or hello.get('op') != 'hello' or hello.get('cluster_id') not in self.workers:
+                return
+            worker = self.workers[hello['cluster_id']]
+            worker.writer = writer
+
+            while True:
+                message = await read_message(reader)
+                if message is None:
+                    break
+                await self.dispatch(worker, message)
+        except (ConnectionError, json.JSONDecodeError) as e:
+            logger.warning(f"IPC connection error: {e}")
+        finally:
+            if worker is not None and worker.writer is writer:
+                worker.writer = None
+            writer.close()
+
+    async def dispatch(self, worker: WorkerHandle, message: Dict[str, Any]):
+        op = message.get('op')
+        if op == 'invalidate':
+            self.invalidations += 1
+            await self.broadcast(message, exclude=worker)
+        elif op == 'stats':
+            worker.stats = message.get('data')
+            worker.stats_at = time.time()
+        elif op == 'identify':
+            # Waiting for a slot must not block the worker's other messages
+            task = asyncio.create_task(
+                self.grant_identify(worker, message),
+                name=f"identify:{worker.cluster_id}:{message.get('shard_id')}"
+            )
+            self._identify_tasks.add(task)
+            task.add_done_callback(self._identify_done)
+        elif op == 'cluster_stats':
+            await self.reply(worker, message, self.aggregate())
+
+    def _identify_done(self, task: asyncio.Task):
+        self._identify_tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            # The shard keeps waiting on its request until the worker's timeout
+            logger.warning(f"Failed to grant {task.get_name()} ({task.exception()!r})")
+
+    async def broadcast(self, message: Dict[str, Any], exclude: Optional[WorkerHandle] = None):
+        for other in self.workers.values():
+            if other is exclude or other.writer is None:
+                continue
+            try:
+                await send_message(other.writer, message)
+            except (ConnectionError, OSError) as e:
+                logger.warning(f"Failed to relay to cluster {other.cluster_id}: {e}")
+
+    async def reply(self, worker: WorkerHandle, request: Dict[str, Any], data: Any = None):
+        if worker.writer is None:
+            return
+        try:
+            await send_message(worker.writer, {'op': 'reply', 'nonce': request.get('nonce'), 'data': data})
+        except (ConnectionError, OSError) as e:
+            logger.warning(f"Failed to reply to cluster {worker.cluster_id}: {e}")
+
+    async def grant_identify(self, worker: WorkerHandle, request: Dict[str, Any]):
+        """One IDENTIFY every 5 seconds per bucket (shard_id % max_concurrency)"""
+        bucket = int(request.get('shard_id', 0)) % self.max_concurrency
+        lock = self._identify_locks.setdefault(bucket, asyncio.Lock())
+        async with lock:
+            delay = self._identify_next.get(bucket, 0.0) - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            self._identify_next[bucket] = time.monotonic() + IDENTIFY_INTERVAL
+        self.identifies += 1
+        await self.reply(worker, request)
+
+    # ── Health and metrics ───────────────────────────────────
+
+    def aggregate(self) -> Dict[str, Any]:
+        workers = []
+        for worker in self.workers.values():
+            stats = worker.stats or {}
+            workers.append({
+                'cluster_id': worker.cluster_id,
+                'shard_ids': worker.shard_ids,
+                'pid': worker.process.pid if worker.process else None,
+                'alive': worker.alive,
+                'healthy': worker.healthy,
+                'restarts': worker.restarts,
+                'ready': stats.get('ready', False),
+                'guilds': stats.get('guilds', 0),
+                'members': stats.get('members', 0),
+                'rss_bytes': stats.get('rss_bytes', 0),
+                'uptime': stats.get('uptime', 0),
+                'shards': stats.get('shards', {})
+            })
+        return {
+            'shard_count': self.shard_count,
+            'workers': workers,
+            'guilds': sum(w['guilds'] for w in workers),
+            'members': sum(w['members'] for w in workers),
+            'rss_bytes': sum(w['rss_bytes'] for w in workers),
+            'invalidations': self.invalidations,
+            'identifies': self.identifies
+        }
+
+    async def health(self, request: web.Request) -> web.Response:
+        data = self.aggregate()
+        healthy = all(w['healthy'] for w in data['workers'])
+        data['status'] = 'ok' if healthy else 'degraded'
+        return web.json_response(data, status=200 if healthy else 503)
+
+    async def metrics(self, request: web.Request) -> web.Response:
+        data = self.aggregate()
+        lines = [
+            '# TYPE crowbot_worker_up gauge',
+            '# TYPE crowbot_worker_restarts_total counter',
+            '# TYPE crowbot_worker_rss_bytes gauge',
+            '# TYPE crowbot_guilds gauge',
+            '# TYPE crowbot_members gauge',
+            '# TYPE crowbot_shard_latency_seconds gauge'
+        ]
+        for w in data['workers']:
+            label = f'cluster="{w["cluster_id"]}"'
+            lines.append(f'crowbot_worker_up{{{label}}} {int(w["healthy"])}')
+            lines.append(f'crowbot_worker_restarts_total{{{label}}} {w["restarts"]}')
+            lines.append(f'crowbot_worker_rss_bytes{{{label}}} {w["rss_bytes"]}')
+            lines.append(f'crowbot_guilds{{{label}}} {w["guilds"]}')
+            lines.append(f'crowbot_members{{{label}}} {w["members"]}')
+            for shard_id, shard in w['shards'].items():
+                if shard.get('latency_ms') is not None:
+                    lines.append(
+                        f'crowbot_shard_latency_seconds{{{label},shard="{shard_id}"}} '
+                        f'{shard["latency_ms"] / 1000:.4f}'
+                    )
+        lines.append('# TYPE crowbot_invalidations_total counter')
+        lines.append(f'crowbot_invalidations_total {data["invalidations"]}')
+        lines.append('# TYPE crowbot_identifies_total counter')
+        lines.append(f'crowbot_identifies_total {data["identifies"]}')
+        return web.Response(text='\n'.join(lines) + '\n', content_type='text/plain')
+
+    # ── Lifecycle ────────────────────────────────────────────
+
+    async def run(self):
+        await self.prepare_database()
+
+        server = await asyncio.start_unix_server(self.handle_connection, path=self.socket_path)
+
+        app = web.Application()
+        app.router.add_get('/health', self.health)
+        app.router.add_get('/metrics', self.metrics)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        await web.TCPSite(runner, '127.0.0.1', self.metrics_port).start()
+
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            loop.add_signal_handler(sig, self._stopping.set)
+
+        logger.info(
+            f"Coordinator ready: {self.shard_count} shards over {len(self.workers)} workers, "
+            f"metrics on 127.0.0.1:{self.metrics_port}"
+        )
+        for worker in self.workers.values():
+            self.spawn(worker)
+
+        try:
+            await self.supervise()
+        finally:
+            logger.info("Stopping workers")
+            for task in self._identify_tasks:
+                task.cancel()
+            await self.stop_workers()
+            server.close()
+            await server.wait_closed()
+            await runner.cleanup()
+
+async def main():
+    parser = argparse.ArgumentParser(description="Lance CrowBot sur plusieurs processus")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help="nombre de processus worker")
+    parser.add_argument('--shards', type=int, default=None, help="nombre total de shards (par défaut : recommandé par Discord)")
+    parser.add_argument('--metrics-port', type=int, default=8765, help="port local de /health et /metrics")
+    args = parser.parse_args()
+
+    token = os.getenv('DISCORD_TOKEN')
+    if not token:
+        logging.error("DISCORD_TOKEN environment variable not set!")
+        return
+
+    gateway = await fetch_gateway(token)
+    shard_count = args.shards or gateway['shards']
+    max_concurrency = gateway.get('session_start_limit', {}).get('max_concurrency', 1)
+
+    with tempfile.TemporaryDirectory(prefix='crowbot-') as tmp:
+        coordinator = Coordinator(
+            token, shard_count, max_concurrency, args.workers,
+            os.path.join(tmp, 'coordinator.sock'), args.metrics_port
+        )
+        await coordinator.run()
+
+if __name__ == "__main__":
+    setup_logging(Config(), worker='coordinator')
+    asyncio.run(main())
@@ -1,16 +1,22 @@
 import discord
 from discord.ext import commands
+import io
+import json
+from typing import Optional
 from utils.permissions import has_permission, admin_only, owner_only, buyer_only, get_permission_level_name, get_permission_description
 from utils.helpers import parse_time, format_time
 from utils.converters import RoleConverter
+from database import COMMAND_PERMISSION_LEVELS
 
 class Administration(commands.Cog):
     """Administration and configuration commands"""
     
     def __init__(self, bot):
         self.bot = bot
+        # (name, guild_id) -> (permission version, embed) for +perms and +helpall
+        self._render_cache = {}
     
-    @commands.command(name="set")
+    @commands.hybrid_command(name="set")
     @admin_only()
     async def set_permission(self, ctx, perm_type: str, level_or_command: str, target: str = None):
         """Système de permissions CrowBots compatible
@@ -70,7 +76,7 @@ class Administration(commands.Cog):
         else:
             await ctx.send("❌ Usage incorrect. Utilisez: `+set perm <niveau> <@rôle>` ou `+set perm <commande> <@rôle>`")
     
-    @commands.command(name="del")
+    @commands.hybrid_command(name="del")
     @admin_only()
     async def delete_permission(self, ctx, perm_type: str, level_or_command: str, target: str = None):
         """Supprimer des permissions CrowBots
@@ -108,7 +114,7 @@ class Administration(commands.Cog):
         else:
             await ctx.send("❌ Usage: `+del perm <niveau> <@rôle/@membre>`")
     
-    @commands.command(name="change")
+    @commands.hybrid_command(name="change")
     @admin_only()
     async def change_command_permission(self, ctx, command_name: str = None, permission_level: str = None):
         """Changer le niveau de permission d'une commande CrowBots
@@ -129,7 +135,7 @@ class Administration(commands.Cog):
             return
         
         # Valider le niveau de permission
-        valid_levels = ['perm1', 'perm2', 'perm3', 'perm4', 'perm5', 'perm6', 'perm7', 'perm8', 'perm9', 'owner', 'buyer', 'public', 'everyone']
+        valid_levels = COMMAND_PERMISSION_LEVELS
         if permission_level.lower() not in valid_levels:
             await ctx.send(f"❌ Niveau de permission invalide.\n💡 Niveaux disponibles: {', '.join(valid_levels)}")
             return
@@ -137,7 +143,7 @@ class Administration(commands.Cog):
         await self.bot.db.set_command_permission(ctx.guild.id, command_name.lower(), permission_level.lower())
         await ctx.send(f"✅ Commande **{command_name}** déplacée vers **{permission_level}**")
     
-    @commands.command(name="changeall")
+    @commands.hybrid_command(name="changeall")
     @admin_only()
     async def change_all_permissions(self, ctx, old_level: str = None, new_level: str = None):
         """Déplacer toutes les commandes d'un niveau vers un autre CrowBots
@@ -150,7 +156,7 @@ class Administration(commands.Cog):
             return
             
         # Valider les niveaux de permission
-        valid_levels = ['perm1', 'perm2', 'perm3', 'perm4', 'perm5', 'perm6', 'perm7', 'perm8', 'perm9', 'owner', 'buyer', 'public', 'everyone']
+        valid_levels = COMMAND_PERMISSION_LEVELS
         
         if old_level.lower() not in valid_levels or new_level.lower() not in valid_levels:
             await ctx.send(f"❌ Niveaux invalides.\n💡 Niveaux disponibles: {', '.join(valid_levels)}")
@@ -164,81 +170,88 @@ class Administration(commands.Cog):
             await ctx.send(f"❌ Aucune commande trouvée au niveau **{old_level}**")
             return
         
-        # Déplacer toutes les commandes
-        for command_name in commands_to_move:
-            await self.bot.db.set_command_permission(ctx.guild.id, command_name, new_level.lower())
+        # Move every command (a single transaction)
+        await self.bot.db.apply_permission_diff(
+            ctx.guild.id, commands={command_name: new_level.lower() for command_name in commands_to_move}
+        )
         
         await ctx.send(f"✅ **{len(commands_to_move)} commandes** déplacées de **{old_level}** vers **{new_level}**\n"
                       f"Commandes déplacées: {', '.join(commands_to_move)}")
     
-    @commands.command(name="perms")
+    @commands.hybrid_command(name="permexport")
+    @admin_only()
+    async def export_permissions(self, ctx):
+        """Export the permission configuration as JSON"""
+        data = await self.bot.db.export_permissions(ctx.guild.id)
+        # Role names let +permimport find the matching roles on another server
+        for entry in data['levels'] + data['specific']:
+            role = ctx.guild.get_role(entry['role_id']) if entry['role_id'] else None
+            if role:
+                entry['role_name'] = role.name
+        
+        content = json.dumps(data, ensure_ascii=False, indent=2).encode()
+        await ctx.send(
+            f"✅ **{len(data['commands'])}** commandes, **{len(data['levels'])}** niveaux et "
+            f"**{len(data['specific'])}** permissions spécifiques exportés.",
+            file=discord.File(io.BytesIO(content), filename=f"permissions_{ctx.guild.id}.json")
+        )
+    
+    @commands.hybrid_command(name="permimport")
+    @admin_only()
+    async def import_permissions(self, ctx, mode: str = "replace", file: Optional[discord.Attachment] = None):
+        """Import a configuration exported with +permexport (attached file)
+        
+        Usage: +permimport [replace|merge]
+        """
+        if mode.lower() not in ("replace", "merge") or file is None:
+            return await ctx.send("❌ Usage: `+permimport [replace|merge]` avec le fichier JSON en pièce jointe")
+        
+        await ctx.defer()
+        try:
+            data = json.loads(await file.read())
+        except (ValueError, discord.HTTPException):
+            return await ctx.send("❌ Fichier JSON illisible.")
+        
+        # Roles from another server are matched by name
+        skipped = 0
+        if isinstance(data, dict):
+            for key in ('levels', 'specific'):
+                entries = []
+                for entry in data.get(key, []):
+                    role_id = entry.get('role_id') if isinstance(entry, dict) else None
+                    # Non-numeric IDs are left for import_permissions to reject
+                    if role_id and str(role_id).isdigit() and not ctx.guild.get_role(int(role_id)):
+                        role = discord.utils.get(ctx.guild.roles, name=entry.get('role_name'))
+                        if role is None:
+                            skipped += 1
+                            continue
+                        entry['role_id'] = role.id
+                    entries.append(entry)
+                data[key] = entries
+        
+        try:
+            await self.bot.db.import_permissions(ctx.guild.id, data, replace=mode.lower() == "replace")
+        except ValueError as e:
+            return await ctx.send(f"❌ Import refusé : {e}")
+        
+        message = (
+            f"✅ Permissions importées ({'remplacement' if mode.lower() == 'replace' else 'fusion'}) : "
+            f"**{len(data.get('commands', {}))}** commandes, **{len(data.get('levels', []))}** niveaux, "
+            f"**{len(data.get('specific', []))}** permissions spécifiques."
+        )
+        if skipped:
+            message += f"\n⚠️ {skipped} entrée(s) ignorée(s) : rôle introuvable sur ce serveur."
+        await ctx.send(message)
+        
+        await self.bot.db.log_moderation_action(
+            ctx.guild.id, 0, ctx.author.id, "permimport", f"Import des permissions ({mode.lower()})"
+        )
+    
+    @commands.hybrid_command(name="perms")
     async def show_permissions(self, ctx):
         """Affiche les permissions et rôles associés CrowBots"""
         try:
-            # Get permission levels
-            permission_levels = await self.bot.db.get_permission_levels(ctx.guild.id)
-            command_permissions = await self.bot.db.get_all_command_permissions(ctx.guild.id)
-            
-            embed = discord.Embed(
-                title="Système de Permissions",
-                description="Configuration hiérarchique des permissions (niveaux 1-9)",
-                color=self.bot.config.embed_color
-            )
-            
-            # Show permission levels
-            if permission_levels:
-                for level in sorted(permission_levels.keys()):
-                    data = permission_levels[level]
-                    roles_text = ""
-                    users_text = ""
-                    
-                    if data['roles']:
-                        roles = [ctx.guild.get_role(r_id) for r_id in data['roles']]
-                        roles_text = ", ".join([r.mention for r in roles if r])
-                    
-                    if data['users']:
-                        users = [ctx.guild.get_member(u_id) for u_id in data['users']]
-                        users_text = ", ".join([u.mention for u in users if u])
-                    
-                    field_value = ""
-                    if roles_text:
-                        field_value += f"**Rôles:** {roles_text}\n"
-                    if users_text:
-                        field_value += f"**Utilisateurs:** {users_text}\n"
-                    
-                    if not field_value:
-                        field_value = "*Aucun rôle/utilisateur assigné*"
-                    
-                    embed.add_field(
-                        name=f"Permission Niveau {level}",
-                        value=field_value,
-                        inline=False
-                    )
-            else:
-                embed.add_field(
-                    name="Niveaux de Permission",
-                    value="*Aucun niveau configuré*\nUtilisez `+set perm <niveau> <@role/@user>` pour configurer",
-                    inline=False
-                )
-            
-            # Group commands by permission level
-            commands_by_level = {}
-            for command, level in command_permissions.items():
-                if level not in commands_by_level:
-                    commands_by_level[level] = []
-                commands_by_level[level].append(command)
-            
-            # Show commands for each level
-            level_order = ['perm1', 'perm2', 'perm3', 'perm4', 'perm5', 'perm6', 'perm7', 'perm8', 'perm9', 'owner', 'buyer', 'public', 'everyone']
-            for level in level_order:
-                if level in commands_by_level:
-                    commands = commands_by_level[level]
-                    embed.add_field(
-                        name=f"{get_permission_level_name(level)} - Commandes",
-                        value=f"`{', '.join(sorted(commands))}`",
-                        inline=False
-                    )
-            
+            embed = await self._cached_render('perms', ctx.guild, self._render_permissions)
             await ctx.send(embed=embed)
             
         except Exception as e:
@@ -249,44 +262,16 @@ class Administration(commands.Cog):
             )
             await ctx.send(embed=embed)
     
-    @commands.command(name="helpall")
+    @commands.hybrid_command(name="helpall")
     @has_permission()
     async def help_all_permissions(self, ctx):
         """Show all commands organized by permission levels"""
         try:
-            command_permissions = await self.bot.db.get_all_command_permissions(ctx.guild.id)
-            
             # If no permissions set, initialize defaults
-            if not command_permissions:
+            if not await self.bot.db.get_all_command_permissions(ctx.guild.id):
                 await self.bot.db.initialize_default_permissions(ctx.guild.id)
-                command_permissions = await self.bot.db.get_all_command_permissions(ctx.guild.id)
-            
-            embed = discord.Embed(
-                title="Toutes les Commandes par Niveau",
-                description="Organisation hiérarchique des commandes",
-                color=self.bot.config.embed_color
-            )
-            
-            # Group commands by permission level
-            commands_by_level = {}
-            for command, level in command_permissions.items():
-                if level not in commands_by_level:
-                    commands_by_level[level] = []
-                commands_by_level[level].append(command)
-            
-            # Show commands for each level with descriptions
-            level_order = ['buyer', 'owner', 'perm9', 'perm8', 'perm7', 'perm6', 'perm5', 'perm4', 'perm3', 'perm2', 'perm1', 'public', 'everyone']
-            for level in level_order:
-                if level in commands_by_level:
-                    commands = sorted(commands_by_level[level])
-                    description = get_permission_description(level)
-                    
-                    embed.add_field(
-                        name=f"{get_permission_level_name(level)}",
-                        value=f"*{description}*\n`{', '.join(commands)}`",
-                        inline=False
-                    )
             
+            embed = await self._cached_render('helpall', ctx.guild, self._render_help_all)
             await ctx.send(embed=embed)
             
         except Exception as e:
@@ -297,10 +282,137 @@ class Administration(commands.Cog):
             )
             await ctx.send(embed=embed)
     
-    @commands.command(name="resetperms")
+    async def _cached_render(self, name, guild, render):
+        """Embed rendered once per version of the guild's permissions"""
+        version = self.bot.db.get_permission_version(guild.id)
+        cached = self._render_cache.get((name, guild.id))
+        if cached is not None and cached[0] == version:
+            return cached[1]
+        
+        embed = await render(guild)
+        self._render_cache[(name, guild.id)] = (version, embed)
+        return embed
+    
+    def _drop_renders(self, guild_id):
+        for name in ('perms', 'helpall'):
+            self._render_cache.pop((name, guild_id), None)
+    
+    @commands.Cog.listener()
+    async def on_guild_role_delete(self, role):
+        # Deleted roles and departed members disappear from +perms
+        self._drop_renders(role.guild.id)
+    
+    @commands.Cog.listener()
+    async def on_member_remove(self, member):
+        self._drop_renders(member.guild.id)
+    
+    @commands.Cog.listener()
+    async def on_guild_remove(self, guild):
+        self._drop_renders(guild.id)
+    
+    async def _render_permissions(self, guild):
+        # Get permission levels
+        permission_levels = await self.bot.db.get_permission_levels(guild.id)
+        command_permissions = await self.bot.db.get_all_command_permissions(guild.id)
+        
+        embed = discord.Embed(
+            title="Système de Permissions",
+            description="Configuration hiérarchique des permissions (niveaux 1-9)",
+            color=self.bot.config.embed_color
+        )
+        
+        # Show permission levels
+        if permission_levels:
+            for level in sorted(permission_levels.keys()):
+                data = permission_levels[level]
+                roles_text = ""
+                users_text = ""
+                
+                if data['roles']:
+                    roles = [guild.get_role(r_id) for r_id in data['roles']]
+                    roles_text = ", ".join([r.mention for r in roles if r])
+                
+                if data['users']:
+                    users = [guild.get_member(u_id) for u_id in data['users']]
+                    users_text = ", ".join([u.mention for u in users if u])
+                
+                field_value = ""
+                if roles_text:
+                    field_value += f"**Rôles:** {roles_text}\n"
+                if users_text:
+                    field_value += f"**Utilisateurs:** {users_text}\n"
+                
+                if not field_value:
+                    field_value = "*Aucun rôle/utilisateur assigné*"
+                
+                embed.add_field(
+                    name=f"Permission Niveau {level}",
+                    value=field_value,
+                    inline=False
+                )
+        else:
+            embed.add_field(
+                name="Niveaux de Permission",
+                value="*Aucun niveau configuré*\nUtilisez `+set perm <niveau> <@role/@user>` pour configurer",
+                inline=False
+            )
+        
+        # Group commands by permission level
+        commands_by_level = {}
+        for command, level in command_permissions.items():
+            if level not in commands_by_level:
+                commands_by_level[level] = []
+            commands_by_level[level].append(command)
+        
+        # Show commands for each level
+        level_order = ['perm1', 'perm2', 'perm3', 'perm4', 'perm5', 'perm6', 'perm7', 'perm8', 'perm9', 'owner', 'buyer', 'public', 'everyone']
+        for level in level_order:
+            if level in commands_by_level:
+                commands = commands_by_level[level]
+                embed.add_field(
+                    name=f"{get_permission_level_name(level)} - Commandes",
+                    value=f"`{', '.join(sorted(commands))}`",
+                    inline=False
+                )
+        
+        return embed
+    
+    async def _render_help_all(self, guild):
+        command_permissions = await self.bot.db.get_all_command_permissions(guild.id)
+        
+        embed = discord.Embed(
+            title="Toutes les Commandes par Niveau",
+            description="Organisation hiérarchique des commandes",
+            color=self.bot.config.embed_color
+        )
+        
+        # Group commands by permission level
+        commands_by_level = {}
+        for command, level in command_permissions.items():
+            if level not in commands_by_level:
+                commands_by_level[level] = []
+            commands_by_level[level].append(command)
+        
+        # Show commands for each level with descriptions
+        level_order = ['buyer', 'owner', 'perm9', 'perm8', 'perm7', 'perm6', 'perm5', 'perm4', 'perm3', 'perm2', 'perm1', 'public', 'everyone']
+        for level in level_order:
+            if level in commands_by_level:
+                commands = sorted(commands_by_level[level])
+                description = get_permission_description(level)
+                
+                embed.add_field(
+                    name=f"{get_permission_level_name(level)}",
+                    value=f"*{description}*\n`{', '.join(commands)}`",
+                    inline=False
+                )
+        
+        return embed
+    
+    @commands.hybrid_command(name="resetperms")
     @admin_only()
     async def reset_permissions(self, ctx):
         """Reset all permissions to default"""
+        await ctx.defer()
         try:
             await self.bot.db.reset_permissions(ctx.guild.id)
             await self.bot.db.initialize_default_permissions(ctx.guild.id)
@@ -316,13 +428,13 @@ class Administration(commands.Cog):
         except Exception as e:
             await ctx.send(f"❌ Erreur lors de la remise à zéro : {str(e)}")
     
-    @commands.command(name="clearperm")
+    @commands.hybrid_command(name="clearperm")
     @admin_only()
     async def clear_permissions(self, ctx):
         """Clear all permission level assignments (alias for resetperms)"""
         await self.reset_permissions(ctx)
     
-    @commands.command(name="setcooldown")
+    @commands.hybrid_command(name="setcooldown")
     @admin_only()
     async def set_cooldown(self, ctx, command_name: str, seconds: int):
         """Set cooldown for a command"""
@@ -344,7 +456,7 @@ class Administration(commands.Cog):
         except Exception as e:
             await ctx.send(f"❌ Erreur lors de la définition du délai: {str(e)}")
     
-    @commands.command(name="settings")
+    @commands.hybrid_command(name="settings")
     @has_permission()
     async def show_settings(self, ctx):
         """Show server settings"""
@@ -383,7 +495,7 @@ class Administration(commands.Cog):
             )
             await ctx.send(embed=embed)
     
-    @commands.command(name="prefix")
+    @commands.hybrid_command(name="prefix")
     @admin_only()
     async def change_prefix(self, ctx, new_prefix: str):
         """Change the bot prefix for this server"""
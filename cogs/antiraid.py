@@ -0,0 +1,290 @@
+import discord
+from discord.ext import commands
+import asyncio
+import time
+from typing import Dict, Set, List
+from database import ANTIRAID_DEFAULTS
+from cogs.ownership import is_owner_or_buyer
+from utils.antiraid import JoinWindow, AGE_BIN_LABELS
+from utils.lockdown import lock_guild
+
+RAID_MODE_SECONDS = 120
+SANCTION_FLUSH_INTERVAL = 1.0
+BULK_BAN_CHUNK = 200
+KICK_CONCURRENCY = 5
+VALID_ACTIONS = ('kick', 'ban', 'none')
+
+class AntiRaid(commands.Cog):
+    """Detection of join waves and automatic response"""
+
+    def __init__(self, bot):
+        self.bot = bot
+        self.settings: Dict[int, Dict] = {}
+        self.windows: Dict[int, JoinWindow] = {}
+        self.raid_until: Dict[int, float] = {}
+        self.pending: Dict[int, Set[int]] = {}
+        self._flush_tasks: Dict[int, asyncio.Task] = {}
+        # Held until done: the loop only keeps weak references to tasks
+        self._trigger_tasks: Set[asyncio.Task] = set()
+
+    async def cog_load(self):
+        self.settings = await self.bot.db.get_all_antiraid_settings()
+        await self.bot.db.load_whitelist_cache()
+
+    def cog_unload(self):
+        for task in self._flush_tasks.values():
+            task.cancel()
+        for task in self._trigger_tasks:
+            task.cancel()
+
+    @commands.Cog.listener()
+    async def on_member_join(self, member: discord.Member):
+        """Count joins and trigger the response when a threshold is exceeded"""
+        guild = member.guild
+        settings = self.settings.get(guild.id)
+        if not settings or not settings['enabled'] or member.bot:
+            return
+        if member.id in await self.bot.db.get_whitelist_set(guild.id):
+            return
+
+        now = time.monotonic()
+        age = (discord.utils.utcnow() - member.created_at).total_seconds()
+        is_young = age < settings['young_account_hours'] * 3600
+
+        window = self.windows.get(guild.id)
+        if window is None or window.size != settings['window_seconds']:
+            window = self.windows[guild.id] = JoinWindow(settings['window_seconds'])
+        window.add(member.id, age, is_young, now)
+
+        # Raid in progress: every new member goes straight into the cohort
+        if self.raid_until.get(guild.id, 0) > now:
+            self._queue_sanctions(guild, settings, [member.id])
+            return
+
+        joins, young = window.counts(now)
+        if joins >= settings['join_threshold'] or young >= settings['young_threshold']:
+            self.raid_until[guild.id] = now + RAID_MODE_SECONDS
+            cohort = window.recent_members(now - window.size)
+            task = asyncio.create_task(
+                self._trigger(guild, settings, joins, young, window.histogram(now), cohort),
+                name=f"antiraid-trigger-{guild.id}"
+            )
+            self._trigger_tasks.add(task)
+            task.add_done_callback(self._trigger_done)
+
+    def _trigger_done(self, task: asyncio.Task):
+        self._trigger_tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            self.bot.logger.error(f"Anti-raid response failed ({task.get_name()})", exc_info=task.exception())
+
+    async def _trigger(self, guild, settings, joins, young, histogram, cohort):
+        self.bot.logger.warning(
+            f"Raid détecté sur {guild.name} ({guild.id}) : {joins} arrivées, {young} comptes récents"
+        )
+
+        lockdown_text = "Non"
+        if settings['auto_lockdown']:
+            try:
+                result = await lock_guild(self.bot.db, guild, reason="Anti-raid : vague d'arrivées détectée")
+                lockdown_text = f"{result.changed} salons verrouillés"
+            except Exception as e:
+                self.bot.logger.error(f"Anti-raid lockdown failed in {guild.id}: {e}")
+                lockdown_text = "Échec"
+
+        self._queue_sanctions(guild, settings, cohort)
+
+        await self.bot.db.log_moderation_action(
+            guild.id, 0, self.bot.user.id if self.bot.user else 0, "antiraid",
+            "Vague d'arrivées détectée",
+            f"Joins: {joins} | Young: {young} | Cohort: {len(cohort)} | Action: {settings['action']} | Lockdown: {lockdown_text}"
+        )
+
+        await self._notify_owners(guild, settings, joins, young, histogram, len(cohort), lockdown_text)
+
+    def _queue_sanctions(self, guild, settings, member_ids: List[int]):
+        if settings['action'] == 'none' or not member_ids:
+            return
+        self.pending.setdefault(guild.id, set()).update(member_ids)
+        task = self._flush_tasks.get(guild.id)
+        if task is None or task.done():
+            self._flush_tasks[guild.id] = asyncio.create_task(self._flush_sanctions(guild))
+
+    async def _flush_sanctions(self, guild):
+        """Apply sanctions in batches while joined members are pending"""
+        while self.pending.get(guild.id):
+            await asyncio.sleep(SANCTION_FLUSH_INTERVAL)
+            member_ids = self.pending.pop(guild.id, set())
+            settings = self.settings.get(guild.id, ANTIRAID_DEFAULTS)
+            whitelist = await self.bot.db.get_whitelist_set(guild.id)
+            member_ids = [member_id for member_id in member_ids if member_id not in whitelist]
+            if not member_ids:
+                continue
+            try:
+                await self._apply_sanctions(guild, settings['action'], member_ids)
+            except Exception as e:
+                self.bot.logger.error(f"Anti-raid sanctions failed in {guild.id}: {e}")
+
+    async def _apply_sanctions(self, guild, action, member_ids):
+        reason = "Anti-raid : vague d'arrivées"
+        done = 0
+        failed = 0
+
+        if action == 'ban':
+            for i in range(0, len(member_ids), BULK_BAN_CHUNK):
+                chunk = [discord.Object(id=member_id) for member_id in member_ids[i:i + BULK_BAN_CHUNK]]
+                try:
+                    result = await guild.bulk_ban(chunk, reason=reason, delete_message_seconds=3600)
+                    done += len(result.banned)
+                    failed += len(result.failed)
+                except discord.HTTPException:
+                    failed += len(chunk)
+
+        elif action == 'kick':
+            semaphore = asyncio.Semaphore(KICK_CONCURRENCY)
+
+            async def kick(member_id):
+                async with semaphore:
+                    await guild.kick(discord.Object(id=member_id), reason=reason)
+
+            results = await asyncio.gather(*(kick(member_id) for member_id in member_ids), return_exceptions=True)
+            failed = sum(1 for result in results if isinstance(result, Exception))
+            done = len(results) - failed
+
+        await self.bot.db.log_moderation_action(
+            guild.id, 0, self.bot.user.id if self.bot.user else 0, f"antiraid_{action}",
+            reason, f"Done: {done} | Failed: {failed}"
+        )
+
+    async def _notify_owners(self, guild, settings, joins, young, histogram, cohort_size, lockdown_text):
+        embed = discord.Embed(
+            title="🚨 Raid détecté",
+            description=f"Une vague d'arrivées a été détectée sur **{guild.name}**.",
+            color=self.bot.config.error_color
+        )
+        embed.add_field(name="Arrivées", value=f"{joins} en {settings['window_seconds']}s", inline=True)
+        embed.add_field(name="Comptes récents", value=f"{young} (< {settings['young_account_hours']}h)", inline=True)
+        embed.add_field(name="Cohorte", value=str(cohort_size), inline=True)
+        embed.add_field(name="Sanction", value=settings['action'], inline=True)
+        embed.add_field(name="Lockdown", value=lockdown_text, inline=True)
+        embed.add_field(
+            name="Âge des comptes",
+            value="\n".join(f"`{label}` : {count}" for label, count in zip(AGE_BIN_LABELS, histogram)),
+            inline=False
+        )
+        embed.set_footer(text="Utilisez +unlockdown pour restaurer les salons")
+
+        recipients = set(await self.bot.db.get_owners(guild.id))
+        buyer = await self.bot.db.get_buyer(guild.id)
+        if buyer:
+            recipients.add(buyer)
+        if guild.owner_id:
+            recipients.add(guild.owner_id)
+
+        for user_id in recipients:
+            user = guild.get_member(user_id) or self.bot.get_user(user_id)
+            if user is None:
+                continue
+            try:
+                await user.send(embed=embed)
+            except discord.HTTPException:
+                pass
+
+        log_channel_id = await self.bot.db.get_log_channel_id(guild.id)
+        log_channel = guild.get_channel(log_channel_id) if log_channel_id else None
+        if log_channel:
+            try:
+                await log_channel.send(embed=embed)
+            except discord.HTTPException:
+                pass
+
+    @commands.Cog.listener()
+    async def on_cache_invalidate(self, kind, guild_id):
+        """Settings changed by another process of the cluster"""
+        if kind == 'antiraid' and guild_id is not None:
+            await self._reload_settings(guild_id)
+
+    async def _reload_settings(self, guild_id):
+        self.settings[guild_id] = await self.bot.db.get_antiraid_settings(guild_id)
+        self.windows.pop(guild_id, None)
+
+    @commands.group(name="antiraid", invoke_without_command=True)
+    @is_owner_or_buyer()
+    async def antiraid(self, ctx):
+        """Show the anti-raid configuration"""
+        settings = self.settings.get(ctx.guild.id) or await self.bot.db.get_antiraid_settings(ctx.guild.id)
+
+        embed = discord.Embed(
+            title="🛡️ Anti-raid",
+            description="Activé" if settings['enabled'] else "Désactivé",
+            color=self.bot.config.embed_color
+        )
+        embed.add_field(name="join_threshold", value=f"{settings['join_threshold']} arrivées", inline=True)
+        embed.add_field(name="window_seconds", value=f"{settings['window_seconds']}s", inline=True)
+        embed.add_field(name="young_threshold", value=f"{settings['young_threshold']} comptes", inline=True)
+        embed.add_field(name="young_account_hours", value=f"{settings['young_account_hours']}h", inline=True)
+        embed.add_field(name="action", value=settings['action'], inline=True)
+        embed.add_field(name="auto_lockdown", value="Oui" if settings['auto_lockdown'] else "Non", inline=True)
+
+        remaining = self.raid_until.get(ctx.guild.id, 0) - time.monotonic()
+        if remaining > 0:
+            embed.add_field(name="🚨 Raid en cours", value=f"Encore {int(remaining)}s", inline=False)
+
+        embed.set_footer(text="+antiraid on/off • +antiraid set <paramètre> <valeur> • +antiraid stop")
+        await ctx.send(embed=embed)
+
+    @antiraid.command(name="on")
+    @is_owner_or_buyer()
+    async def antiraid_on(self, ctx):
+        """Activer l'anti-raid"""
+        await self.bot.db.set_antiraid_setting(ctx.guild.id, 'enabled', 1)
+        await self._reload_settings(ctx.guild.id)
+        await ctx.send("✅ Anti-raid activé.")
+
+    @antiraid.command(name="off")
+    @is_owner_or_buyer()
+    async def antiraid_off(self, ctx):
+        """Disable the anti-raid"""
+        await self.bot.db.set_antiraid_setting(ctx.guild.id, 'enabled', 0)
+        await self._reload_settings(ctx.guild.id)
+        await ctx.send("❌ Anti-raid désactivé.")
+
+    @antiraid.command(name="set")
+    @is_owner_or_buyer()
+    async def antiraid_set(self, ctx, key: str, value: str):
+        """Change an anti-raid setting"""
+        key = key.lower()
+        if key not in ANTIRAID_DEFAULTS or key == 'enabled':
+            keys = ", ".join(k for k in ANTIRAID_DEFAULTS if k != 'enabled')
+            return await ctx.send(f"❌ Paramètre inconnu.\n💡 Paramètres disponibles : {keys}")
+
+        if key == 'action':
+            value = value.lower()
+            if value not in VALID_ACTIONS:
+                return await ctx.send(f"❌ Action invalide.\n💡 Actions disponibles : {', '.join(VALID_ACTIONS)}")
+        elif key == 'auto_lockdown':
+            value = 1 if value.lower() in ('on', 'oui', 'yes', 'true', '1') else 0
+        else:
+            try:
+                value = int(value)
+            except ValueError:
+                return await ctx.send("❌ La valeur doit être un nombre entier.")
+            if value < 1 or (key == 'window_seconds' and value > 300):
+                return await ctx.send("❌ Valeur hors limites.")
+
+        await self.bot.db.set_antiraid_setting(ctx.guild.id, key, value)
+        await self._reload_settings(ctx.guild.id)
+        await ctx.send(f"✅ `{key}` défini à `{value}`.")
+
+    @antiraid.command(name="stop")
+    @is_owner_or_buyer()
+    async def antiraid_stop(self, ctx):
+        """End the current raid mode"""
+        self.raid_until.pop(ctx.guild.id, None)
+        self.pending.pop(ctx.guild.id, None)
+        window = self.windows.get(ctx.guild.id)
+        if window:
+            window.reset()
+        await ctx.send("✅ Mode raid terminé. Utilisez `+unlockdown` pour restaurer les salons.")
+
+async def setup(bot):
+    await bot.add_cog(AntiRaid(bot))
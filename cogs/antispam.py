@@ -0,0 +1,183 @@
+import discord
+from discord.ext import commands, tasks
+import asyncio
+import datetime
+from typing import Dict, List
+from database import ANTISPAM_DEFAULTS
+from cogs.ownership import is_owner_or_buyer
+from utils.antispam import SpamTracker
+
+INFRACTION_FLUSH_SECONDS = 5
+INFRACTION_FLUSH_SIZE = 50
+
+REASONS = {
+    'flood': "Anti-spam : trop de messages",
+    'mentions': "Anti-spam : trop de mentions",
+    'duplicate': "Anti-spam : messages répétés"
+}
+
+class AntiSpam(commands.Cog):
+    """Message rate limiting and automatic mute of spammers"""
+
+    def __init__(self, bot):
+        self.bot = bot
+        self.settings: Dict[int, Dict] = {}
+        self.tracker = SpamTracker()
+        self._pending_infractions: List[tuple] = []
+        self._sanctioning = set()
+        # Held until done: the loop only keeps weak references to tasks
+        self._sanction_tasks = set()
+
+    async def cog_load(self):
+        self.settings = await self.bot.db.get_all_antispam_settings()
+        self.flush_infractions.start()
+
+    async def cog_unload(self):
+        self.flush_infractions.cancel()
+        for task in self._sanction_tasks:
+            task.cancel()
+        await self._flush()
+
+    @commands.Cog.listener()
+    async def on_message(self, message: discord.Message):
+        """Check every message against the member's buckets"""
+        guild = message.guild
+        if guild is None or message.author.bot:
+            return
+        settings = self.settings.get(guild.id)
+        if not settings or not settings['enabled']:
+            return
+
+        mentions = len(message.raw_mentions) + len(message.raw_role_mentions)
+        if message.mention_everyone:
+            mentions += 1
+
+        violation = self.tracker.check(guild.id, message.author.id, message.content, mentions, settings)
+        if violation is None:
+            return
+
+        # Slow path: only once a limit is exceeded
+        key = (guild.id, message.author.id)
+        if key in self._sanctioning:
+            return
+        member = message.author
+        if not isinstance(member, discord.Member) or member.guild_permissions.manage_messages:
+            return
+        if member.id in await self.bot.db.get_whitelist_set(guild.id):
+            return
+
+        self._sanctioning.add(key)
+        task = asyncio.create_task(
+            self._sanction(member, message.channel, violation, settings),
+            name=f"antispam-sanction-{guild.id}-{member.id}"
+        )
+        self._sanction_tasks.add(task)
+        task.add_done_callback(self._sanction_done)
+
+    def _sanction_done(self, task: asyncio.Task):
+        self._sanction_tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            self.bot.logger.error(f"Anti-spam sanction failed ({task.get_name()})", exc_info=task.exception())
+
+    async def _sanction(self, member, channel, violation, settings):
+        key = (member.guild.id, member.id)
+        reason = REASONS[violation]
+        try:
+            await member.timeout(
+                datetime.timedelta(seconds=settings['mute_seconds']),
+                reason=reason
+            )
+            self._pending_infractions.append((
+                member.guild.id, member.id, self.bot.user.id if self.bot.user else 0,
+                "mute", reason, settings['mute_seconds']
+            ))
+            if len(self._pending_infractions) >= INFRACTION_FLUSH_SIZE:
+                await self._flush()
+            try:
+                await channel.send(f"🔇 {member.mention} a été rendu muet. {reason}", delete_after=10)
+            except discord.HTTPException:
+                pass
+        except discord.Forbidden:
+            self.bot.logger.warning(f"Anti-spam: missing permission to timeout {member.id} in {member.guild.id}")
+        except discord.HTTPException as e:
+            self.bot.logger.error(f"Anti-spam timeout failed for {member.id}: {e}")
+        finally:
+            self.tracker.reset(*key)
+            self._sanctioning.discard(key)
+
+    async def _flush(self):
+        if not self._pending_infractions:
+            return
+        batch, self._pending_infractions = self._pending_infractions, []
+        try:
+            await self.bot.db.add_infractions_bulk(batch)
+        except Exception as e:
+            self.bot.logger.error(f"Anti-spam: failed to record {len(batch)} infractions: {e}")
+
+    @tasks.loop(seconds=INFRACTION_FLUSH_SECONDS)
+    async def flush_infractions(self):
+        await self._flush()
+
+    @commands.Cog.listener()
+    async def on_cache_invalidate(self, kind, guild_id):
+        """Settings changed by another process of the cluster"""
+        if kind == 'antispam' and guild_id is not None:
+            await self._reload_settings(guild_id)
+
+    async def _reload_settings(self, guild_id):
+        self.settings[guild_id] = await self.bot.db.get_antispam_settings(guild_id)
+
+    @commands.group(name="antispam", invoke_without_command=True)
+    @is_owner_or_buyer()
+    async def antispam(self, ctx):
+        """Show the anti-spam configuration"""
+        settings = self.settings.get(ctx.guild.id) or await self.bot.db.get_antispam_settings(ctx.guild.id)
+
+        embed = discord.Embed(
+            title="🛡️ Anti-spam",
+            description="Activé" if settings['enabled'] else "Désactivé",
+            color=self.bot.config.embed_color
+        )
+        embed.add_field(name="message_rate", value=f"{settings['message_rate']} messages", inline=True)
+        embed.add_field(name="per_seconds", value=f"{settings['per_seconds']}s", inline=True)
+        embed.add_field(name="max_mentions", value=f"{settings['max_mentions']} / 10s", inline=True)
+        embed.add_field(name="duplicate_threshold", value=f"{settings['duplicate_threshold']} répétitions", inline=True)
+        embed.add_field(name="mute_seconds", value=f"{settings['mute_seconds']}s", inline=True)
+        embed.set_footer(text="+antispam on/off • +antispam set <paramètre> <valeur>")
+        await ctx.send(embed=embed)
+
+    @antispam.command(name="on")
+    @is_owner_or_buyer()
+    async def antispam_on(self, ctx):
+        """Activer l'anti-spam"""
+        await self.bot.db.set_antispam_setting(ctx.guild.id, 'enabled', 1)
+        await self._reload_settings(ctx.guild.id)
+        await ctx.send("✅ Anti-spam activé.")
+
+    @antispam.command(name="off")
+    @is_owner_or_buyer()
+    async def antispam_off(self, ctx):
+        """Disable the anti-spam"""
+        await self.bot.db.set_antispam_setting(ctx.guild.id, 'enabled', 0)
+        await self._reload_settings(ctx.guild.id)
+        await ctx.send("❌ Anti-spam désactivé.")
+
+    @antispam.command(name="set")
+    @is_owner_or_buyer()
+    async def antispam_set(self, ctx, key: str, value: int):
+        """Change an anti-spam setting"""
+        key = key.lower()
+        if key not in ANTISPAM_DEFAULTS or key == 'enabled':
+            keys = ", ".join(k for k in ANTISPAM_DEFAULTS if k != 'enabled')
+            return await ctx.send(f"❌ Paramètre inconnu.\n💡 Paramètres disponibles : {keys}")
+
+        # Discord caps timeouts at 28 days
+        if value < 1 or (key == 'mute_seconds' and value > 28 * 86400):
+            return await ctx.send("❌ Valeur hors limites.")
+
+        await self.bot.db.set_antispam_setting(ctx.guild.id, key, value)
+        await self._reload_settings(ctx.guild.id)
+        await ctx.send(f"✅ `{key}` défini à `{value}`.")
+
+async def setup(bot):
+    await bot.add_cog(AntiSpam(bot))
@@ -0,0 +1,249 @@
+import discord
+from discord.ext import commands, tasks
+import io
+import os
+import time
+import asyncio
+import threading
+import tracemalloc
+from collections import deque
+from cogs.ownership import is_owner_or_buyer
+from utils.ipc import rss_bytes
+from utils.memory import TracemallocSession, cache_object_counts, format_stat, task_counts
+from utils.profiler import SamplingProfiler
+
+PROFILE_MAX_SECONDS = 300
+# One day of records at the default interval
+MEMORY_HISTORY = 144
+MEMTRACE_MAX_FRAMES = 25
+MEMTRACE_REPORT_LINES = 200
+
+class Diagnostics(commands.Cog):
+    """Process health measurements for owners"""
+
+    def __init__(self, bot):
+        self.bot = bot
+        self._profiling = asyncio.Lock()
+        self.memory_history = deque(maxlen=MEMORY_HISTORY)
+        self.memtrace = TracemallocSession()
+
+    async def cog_load(self):
+        minutes = self.bot.config.memory_record_minutes
+        if minutes > 0:
+            self.record_memory.change_interval(minutes=minutes)
+            self.record_memory.start()
+
+    def cog_unload(self):
+        self.record_memory.cancel()
+        if self.memtrace.tracing:
+            self.memtrace.stop()
+
+    @tasks.loop(minutes=10)
+    async def record_memory(self):
+        rss = rss_bytes()
+        counts = cache_object_counts(self.bot)
+        self.memory_history.append({'time': time.time(), 'rss': rss, 'counts': counts})
+
+        biggest = sorted(counts.items(), key=lambda item: item[1], reverse=True)[:5]
+        summary = ", ".join(f"{name}={count}" for name, count in biggest)
+        self.bot.logger.info(
+            f"Memory: RSS {rss / 1024 / 1024:.1f} MB, {summary}",
+            extra={'rss_bytes': rss, 'cache_counts': counts}
+        )
+        warn_mb = self.bot.config.memory_warn_mb
+        if warn_mb and rss > warn_mb * 1024 * 1024:
+            self.bot.logger.warning(f"Memory: RSS {rss / 1024 / 1024:.1f} MB above MEMORY_WARN_MB ({warn_mb} MB)")
+
+    @record_memory.before_loop
+    async def before_record_memory(self):
+        await self.bot.wait_until_ready()
+
+    @commands.command(name="lag")
+    @is_owner_or_buyer()
+    async def loop_lag(self, ctx):
+        """Event loop lag and the latest detected stalls"""
+        watchdog = self.bot.watchdog
+        lag = watchdog.percentiles()
+
+        embed = discord.Embed(title="⏱️ Retard de la boucle d'événements", color=self.bot.config.embed_color)
+        embed.add_field(
+            name=f"Sur {len(watchdog.samples)} mesures",
+            value=" • ".join(f"**{name}** {value * 1000:.1f} ms" for name, value in lag.items()),
+            inline=False
+        )
+        embed.add_field(
+            name="Blocages",
+            value=f"{watchdog.stall_count} au-delà de {watchdog.threshold * 1000:.0f} ms depuis le démarrage",
+            inline=False
+        )
+
+        if watchdog.stalls:
+            lines = []
+            for stall in reversed(watchdog.stalls):
+                where = f"`{os.path.basename(stall['where'])}`" if stall['where'] else "pile non capturée"
+                lines.append(f"<t:{int(stall['time'])}:R> • {stall['lag'] * 1000:.0f} ms • {where}")
+            embed.add_field(name="Derniers blocages", value="\n".join(lines[:10]), inline=False)
+
+        embed.set_footer(text=f"Intervalle {watchdog.interval * 1000:.0f} ms • piles complètes dans le journal des blocages")
+        await ctx.send(embed=embed)
+
+    @commands.command(name="profile")
+    @is_owner_or_buyer()
+    async def profile(self, ctx, seconds: int = 30):
+        """Profile the live process for N seconds (stacks aggregated per task)"""
+        if not 1 <= seconds <= PROFILE_MAX_SECONDS:
+            return await ctx.send(f"❌ La durée doit être entre 1 et {PROFILE_MAX_SECONDS} secondes.")
+        if self._profiling.locked():
+            return await ctx.send("❌ Un profilage est déjà en cours.")
+
+        async with self._profiling:
+            status = await ctx.send(f"⏳ Profilage pendant {seconds} s...")
+            profiler = SamplingProfiler(asyncio.get_running_loop(), threading.get_ident())
+            await asyncio.to_thread(profiler.run, seconds)
+
+        report = profiler.report()
+        files = [
+            discord.File(io.BytesIO(profiler.collapsed().encode()), filename="profile.collapsed"),
+            discord.File(io.BytesIO(report.encode()), filename="profile.txt")
+        ]
+        preview = report if len(report) <= 1900 else report[:1900] + "\n..."
+        await status.edit(content=f"✅ Profilage terminé\n```\n{preview}```")
+        await ctx.send(
+            "📎 `profile.collapsed` : format collapsed stacks (flamegraph.pl, speedscope, inferno)",
+            files=files
+        )
+
+    @commands.group(name="memtrace", invoke_without_command=True)
+    @is_owner_or_buyer()
+    async def memtrace_group(self, ctx):
+        """Allocation tracing status and recorded memory trend"""
+        embed = discord.Embed(title="🧠 Traçage mémoire", color=self.bot.config.embed_color)
+        if self.memtrace.tracing:
+            current, peak = tracemalloc.get_traced_memory()
+            embed.description = f"Actif depuis <t:{int(self.memtrace.baseline_at)}:R> (référence)"
+            embed.add_field(
+                name="Mémoire tracée",
+                value=f"{current / 1024 / 1024:.1f} Mo (pic {peak / 1024 / 1024:.1f} Mo)",
+                inline=False
+            )
+        else:
+            embed.description = "Inactif"
+
+        if self.memory_history:
+            first, last = self.memory_history[0], self.memory_history[-1]
+            embed.add_field(
+                name=f"RSS sur {len(self.memory_history)} relevés",
+                value=(
+                    f"{first['rss'] / 1024 / 1024:.1f} Mo <t:{int(first['time'])}:R> → "
+                    f"{last['rss'] / 1024 / 1024:.1f} Mo <t:{int(last['time'])}:R>"
+                ),
+                inline=False
+            )
+            growth = sorted(
+                ((name, count - first['counts'].get(name, 0)) for name, count in last['counts'].items()),
+                key=lambda item: item[1], reverse=True
+            )
+            lines = [f"`{name}` {diff:+d}" for name, diff in growth[:8] if diff > 0]
+            if lines:
+                embed.add_field(name="Caches en hausse", value="\n".join(lines), inline=False)
+
+        embed.set_footer(text="+memtrace start [frames] • diff [n] • baseline • tasks • history • stop")
+        await ctx.send(embed=embed)
+
+    @memtrace_group.command(name="start")
+    @is_owner_or_buyer()
+    async def memtrace_start(self, ctx, frames: int = 1):
+        """Start tracemalloc and take the baseline snapshot"""
+        if not 1 <= frames <= MEMTRACE_MAX_FRAMES:
+            return await ctx.send(f"❌ Le nombre de frames doit être entre 1 et {MEMTRACE_MAX_FRAMES}.")
+        if self.memtrace.tracing:
+            return await ctx.send("❌ Le traçage est déjà actif (`+memtrace baseline` pour changer de référence).")
+        await asyncio.to_thread(self.memtrace.start, frames)
+        await ctx.send(
+            f"✅ Traçage démarré ({frames} frame(s) par allocation). "
+            "Il ralentit le bot et consomme de la mémoire : pensez à `+memtrace stop`."
+        )
+
+    @memtrace_group.command(name="baseline")
+    @is_owner_or_buyer()
+    async def memtrace_baseline(self, ctx):
+        """Replace the baseline snapshot with the current state"""
+        if not self.memtrace.tracing:
+            return await ctx.send("❌ Le traçage n'est pas actif (`+memtrace start`).")
+        await asyncio.to_thread(self.memtrace.reset_baseline)
+        await ctx.send("✅ Nouvel instantané de référence.")
+
+    @memtrace_group.command(name="diff")
+    @is_owner_or_buyer()
+    async def memtrace_diff(self, ctx, limit: int = 10):
+        """Allocation sites that grew the most since the baseline, by size and count"""
+        if not self.memtrace.tracing:
+            return await ctx.send("❌ Le traçage n'est pas actif (`+memtrace start`).")
+        limit = max(1, min(limit, 25))
+        stats = await asyncio.to_thread(self.memtrace.diff)
+
+        by_size = sorted(stats, key=lambda stat: stat.size_diff, reverse=True)
+        by_count = sorted(stats, key=lambda stat: stat.count_diff, reverse=True)
+        total = sum(stat.size_diff for stat in stats)
+
+        lines = [f"Depuis la référence : {total / 1024:+.1f} Ko", "", "Par taille :"]
+        lines += [f"  {format_stat(stat)}" for stat in by_size[:MEMTRACE_REPORT_LINES]]
+        lines += ["", "Par nombre d'objets :"]
+        lines += [f"  {format_stat(stat)}" for stat in by_count[:MEMTRACE_REPORT_LINES]]
+        report = "\n".join(lines) + "\n"
+
+        preview = [f"Depuis la référence : {total / 1024:+.1f} Ko", "", "Par taille :"]
+        preview += [format_stat(stat) for stat in by_size[:limit]]
+        preview += ["", "Par nombre d'objets :"]
+        preview += [format_stat(stat) for stat in by_count[:limit]]
+        text = "\n".join(preview)
+        if len(text) > 1900:
+            text = text[:1900] + "\n..."
+        await ctx.send(
+            f"```\n{text}```",
+            file=discord.File(io.BytesIO(report.encode()), filename="memtrace.txt")
+        )
+
+    @memtrace_group.command(name="tasks")
+    @is_owner_or_buyer()
+    async def memtrace_tasks(self, ctx, limit: int = 15):
+        """Live asyncio tasks per coroutine (sleeping temporary mutes, etc.)"""
+        limit = max(1, min(limit, 30))
+        lines = [f"`{count:5d}` {name}" for name, count in task_counts(limit)]
+        embed = discord.Embed(
+            title=f"🧵 {len(asyncio.all_tasks())} tâches asyncio",
+            description="\n".join(lines) or "Aucune",
+            color=self.bot.config.embed_color
+        )
+        await ctx.send(embed=embed)
+
+    @memtrace_group.command(name="history")
+    @is_owner_or_buyer()
+    async def memtrace_history(self, ctx):
+        """Periodic RSS and cache size records"""
+        if not self.memory_history:
+            return await ctx.send("❌ Aucun relevé pour le moment.")
+        names = sorted(self.memory_history[-1]['counts'])
+        lines = ["time\trss_bytes\t" + "\t".join(names)]
+        for record in self.memory_history:
+            values = "\t".join(str(record['counts'].get(name, 0)) for name in names)
+            lines.append(f"{int(record['time'])}\t{record['rss']}\t{values}")
+
+        last = self.memory_history[-1]
+        await ctx.send(
+            f"📈 {len(self.memory_history)} relevés, dernier <t:{int(last['time'])}:R> : "
+            f"RSS {last['rss'] / 1024 / 1024:.1f} Mo",
+            file=discord.File(io.BytesIO(("\n".join(lines) + "\n").encode()), filename="memory-history.tsv")
+        )
+
+    @memtrace_group.command(name="stop")
+    @is_owner_or_buyer()
+    async def memtrace_stop(self, ctx):
+        """Stop tracemalloc and free its traces"""
+        if not self.memtrace.tracing:
+            return await ctx.send("❌ Le traçage n'est pas actif.")
+        self.memtrace.stop()
+        await ctx.send("✅ Traçage arrêté.")
+
+async def setup(bot):
+    await bot.add_cog(Diagnostics(bot))
@@ -1,126 +1,265 @@
 import discord
 from discord.ext import commands
+from utils.permissions import get_permission_level_name
+
+# (command, description, usage) per category; commands missing from the bot are skipped
+ADMIN_COMMANDS = [
+    ("set perm", "Attribuer niveau permission", "`+set perm <niveau> <@rôle/@user>`"),
+    ("del perm", "Retirer niveau permission", "`+del perm <niveau> <@rôle/@user>`"),
+    ("change", "Changer niveau commande", "`+change <commande> <niveau>`"),
+    ("changeall", "Déplacer toutes commandes", "`+changeall <ancien> <nouveau>`"),
+    ("permexport", "Exporter les permissions (JSON)", "`+permexport`"),
+    ("permimport", "Importer les permissions", "`+permimport [replace|merge]` + fichier joint"),
+    ("clearperm", "Supprimer toutes permissions", "`+clearperm`"),
+    ("addrole", "Ajouter rôle", "`+addrole <@user> <@rôle>`"),
+    ("delrole", "Retirer rôle", "`+delrole <@user> <@rôle>`"),
+    ("massrole", "Rôle à tous humains", "`+massrole <@rôle>`"),
+    ("prefix", "Changer le préfixe", "`+prefix <nouveau_préfixe>`")
+]
+
+MODERATION_COMMANDS = [
+    ("ban", "Bannir un membre", "`+ban <membre> [raison]`"),
+    ("unban", "Débannir un utilisateur", "`+unban <id_utilisateur>`"),
+    ("massban", "Bannir en masse", "`+massban <IDs...> [raison]` ou `+massban joined:<minutes>`"),
+    ("kick", "Expulser un membre", "`+kick <membre> [raison]`"),
+    ("mute", "Rendre muet un membre", "`+mute <membre> [durée] [raison]`"),
+    ("unmute", "Enlever le mute", "`+unmute <membre>`"),
+    ("warn", "Avertir un membre", "`+warn <membre> [raison]`"),
+    ("delwarn", "Supprimer avertissement", "`+delwarn <@user> <ID>`"),
+    ("infractions", "Voir l'historique d'un membre", "`+infractions <membre>`"),
+    ("mutelist", "Liste des membres mués", "`+mutelist`"),
+    ("clear", "Supprimer des messages", "`+clear <nombre>`"),
+    ("purge", "Purge filtrée de messages", "`+purge <nombre> [@membre] [bots] [fichiers] [liens] [regex:<motif>]`"),
+    ("lock", "Verrouiller un salon", "`+lock [#salon]`"),
+    ("unlock", "Déverrouiller un salon", "`+unlock [#salon]`"),
+    ("lockdown", "Verrouiller tout le serveur", "`+lockdown [raison]`"),
+    ("unlockdown", "Restaurer après un lockdown", "`+unlockdown`")
+]
+
+ROLE_COMMANDS = [
+    ("addrole", "Ajouter un rôle à un membre", "`+addrole <membre> <rôle>`"),
+    ("delrole", "Retirer un rôle d'un membre", "`+delrole <membre> <rôle>`"),
+    ("createrole", "Créer un nouveau rôle", "`+createrole <nom> [couleur] [permissions]`"),
+    ("deleterole", "Supprimer un rôle", "`+deleterole <rôle>`"),
+    ("rolestats", "Statistiques d'un rôle", "`+rolestats <rôle>`"),
+    ("roles", "Nombre de membres de chaque rôle", "`+roles`")
+]
+
+OWNER_COMMANDS = (
+    "`massrole <rôle>` - Donne le rôle à tous les humains\n"
+    "`say <message>` - Fait parler le bot anonymement\n"
+    "`dm <membre> <msg>` - Message privé via le bot\n"
+    "`laisse <membre>` - Met en laisse (🐶🦮)\n"
+    "`unlaisse <membre>` - Retire de la laisse\n"
+    "`wl <membre>` - Ajoute à la whitelist anti-raid\n"
+    "`unwl <membre>` - Retire de la whitelist\n"
+    "`blrank add <membre>` - Ajoute au blacklist-rank\n"
+    "`blrank del <membre>` - Retire du blacklist-rank\n"
+    "`blrank` - Liste blacklist-rank\n"
+    "`antiraid [on/off]` - Détection des vagues d'arrivées\n"
+    "`antiraid set <paramètre> <valeur>` - Seuils et sanction\n"
+    "`antispam [on/off]` - Mute automatique des spammeurs\n"
+    "`export [logs/infractions] [jsonl/csv]` - Exporte l'historique\n"
+    "`retention [set/run]` - Durée de conservation des historiques\n"
+    "`sync [guild/global/clear]` - Publie les commandes slash"
+)
+
+# Separate field: embed field values are capped at 1024 characters
+DIAGNOSTIC_COMMANDS = (
+    "`cluster` - État des processus du cluster\n"
+    "`memory [n]` - Mémoire des caches par serveur\n"
+    "`lag` - Retard de la boucle et blocages récents\n"
+    "`profile [secondes]` - Profilage du processus en direct\n"
+    "`memtrace [start/diff/baseline/tasks/history/stop]` - Traçage des allocations"
+)
 
 class HelpView(discord.ui.View):
-    """Vue interactive pour le système d'aide"""
+    """Persistent view: a single instance, registered with bot.add_view, serves every help message"""
     
-    def __init__(self, bot):
-        super().__init__(timeout=180)
-        self.bot = bot
-        
-    @discord.ui.button(label="Administration", style=discord.ButtonStyle.primary)
+    def __init__(self, cog):
+        super().__init__(timeout=None)
+        self.cog = cog
+    
+    async def show(self, interaction: discord.Interaction, page: str):
+        await interaction.response.edit_message(embed=await self.cog.get_page(interaction.guild, page))
+    
+    @discord.ui.button(label="Administration", style=discord.ButtonStyle.primary, custom_id="help:administration")
     async def admin_help(self, interaction: discord.Interaction, button: discord.ui.Button):
         """Affiche l'aide pour les commandes d'administration"""
-        embed = discord.Embed(
-            title="Commandes d'Administration",
-            description="Gestion des permissions et configuration du bot",
-            color=self.bot.config.embed_color
-        )
-        
-        commands_list = [
-            ("set perm", "Attribuer niveau permission", "`+set perm <niveau> <@rôle/@user>`"),
-            ("del perm", "Retirer niveau permission", "`+del perm <niveau> <@rôle/@user>`"),
-            ("change", "Changer niveau commande", "`+change <commande> <niveau>`"),
-            ("changeall", "Déplacer toutes commandes", "`+changeall <ancien> <nouveau>`"),
-            ("clearperms", "Supprimer toutes permissions", "`+clearperms`"),
-            ("addrole", "Ajouter rôle", "`+addrole <@user> <@rôle>`"),
-            ("delrole", "Retirer rôle", "`+delrole <@user> <@rôle>`"),
-            ("massrole", "Rôle à tous humains", "`+massrole <@rôle>`"),
-            ("prefix", "Changer le préfixe", "`+prefix <nouveau_préfixe>`")
-        ]
-        
-        for name, desc, usage in commands_list:
-            embed.add_field(
-                name=f"`{name}`",
-                value=f"{desc}\n{usage}",
-                inline=False
-            )
-        
-        embed.set_footer(text="Ces commandes nécessitent les permissions d'administrateur")
-        await interaction.response.edit_message(embed=embed, view=self)
+        await self.show(interaction, 'administration')
     
-    @discord.ui.button(label="Modération", style=discord.ButtonStyle.primary)
+    @discord.ui.button(label="Modération", style=discord.ButtonStyle.primary, custom_id="help:moderation")
     async def moderation_help(self, interaction: discord.Interaction, button: discord.ui.Button):
         """Affiche l'aide pour les commandes de modération"""
-        embed = discord.Embed(
-            title="Commandes de Modération",
-            description="Gestion et modération des membres",
-            color=self.bot.config.embed_color
-        )
-        
-        commands_list = [
-            ("ban", "Bannir un membre", "`+ban <membre> [raison]`"),
-            ("unban", "Débannir un utilisateur", "`+unban <id_utilisateur>`"),
-            ("kick", "Expulser un membre", "`+kick <membre> [raison]`"),
-            ("mute", "Rendre muet un membre", "`+mute <membre> [durée] [raison]`"),
-            ("unmute", "Enlever le mute", "`+unmute <membre>`"),
-            ("warn", "Avertir un membre", "`+warn <membre> [raison]`"),
-            ("delwarn", "Supprimer avertissement", "`+delwarn <@user> <ID>`"),
-            ("infractions", "Voir l'historique d'un membre", "`+infractions <membre>`"),
-            ("mutelist", "Liste des membres mués", "`+mutelist`"),
-            ("clear", "Supprimer des messages", "`+clear <nombre>`"),
-            ("lock", "Verrouiller un salon", "`+lock [#salon]`"),
-            ("unlock", "Déverrouiller un salon", "`+unlock [#salon]`")
-        ]
-        
-        for name, desc, usage in commands_list:
+        await self.show(interaction, 'moderation')
+    
+    @discord.ui.button(label="Rôles", style=discord.ButtonStyle.primary, custom_id="help:roles")
+    async def roles_help(self, interaction: discord.Interaction, button: discord.ui.Button):
+        """Affiche l'aide pour les commandes de gestion des rôles"""
+        await self.show(interaction, 'roles')
+    
+    @discord.ui.button(label="👨‍💼 Ownership", style=discord.ButtonStyle.success, custom_id="help:ownership")
+    async def ownership_help(self, interaction: discord.Interaction, button: discord.ui.Button):
+        """Affiche l'aide pour les commandes d'ownership"""
+        await self.show(interaction, 'ownership')
+    
+    @discord.ui.button(label="🔢 Permissions", style=discord.ButtonStyle.success, custom_id="help:permissions")
+    async def permissions_help(self, interaction: discord.Interaction, button: discord.ui.Button):
+        """Affiche l'aide pour le système de permissions"""
+        await self.show(interaction, 'permissions')
+    
+    @discord.ui.button(label="Menu Principal", style=discord.ButtonStyle.secondary, row=1, custom_id="help:main")
+    async def main_menu(self, interaction: discord.Interaction, button: discord.ui.Button):
+        """Retourne au menu principal"""
+        await self.show(interaction, 'main')
+
+class HelpCommand(commands.Cog):
+    """Système d'aide interactif du bot"""
+    
+    def __init__(self, bot):
+        self.bot = bot
+        self.view = HelpView(self)
+        # guild_id -> ((prefix, permission version), pages) ; rebuilt only when the key changes
+        self._pages = {}
+    
+    async def cog_load(self):
+        # Buttons of help messages sent before a restart keep working
+        self.bot.add_view(self.view)
+    
+    async def cog_unload(self):
+        self.view.stop()
+    
+    @commands.Cog.listener()
+    async def on_guild_remove(self, guild):
+        self._pages.pop(guild.id, None)
+    
+    async def get_page(self, guild, page):
+        """One help embed; the main page shows the live server count, so it is built on each render"""
+        prefix, pages = await self.get_pages(guild)
+        if page == 'main':
+            return self.main_page(prefix)
+        return pages[page]
+    
+    async def get_pages(self, guild):
+        """Prefix and help embeds of the guild, built once per prefix and permission version"""
+        if guild is None:
+            guild_id, prefix, version = None, None, 0
+        else:
+            guild_id = guild.id
+            prefix = await self.bot.db.get_guild_prefix(guild.id)
+            version = self.bot.db.get_permission_version(guild.id)
+        key = (prefix or self.bot.config.default_prefix, version)
+        
+        cached = self._pages.get(guild_id)
+        if cached is not None and cached[0] == key:
+            return key[0], cached[1]
+        
+        permissions = await self.bot.db.get_all_command_permissions(guild_id) if guild else {}
+        pages = self.build_pages(key[0], permissions)
+        self._pages[guild_id] = (key, pages)
+        return key[0], pages
+    
+    def build_pages(self, prefix, permissions):
+        return {
+            'administration': self.command_page(
+                "Commandes d'Administration",
+                "Gestion des permissions et configuration du bot",
+                ADMIN_COMMANDS, prefix, permissions,
+                footer="Ces commandes nécessitent les permissions d'administrateur"
+            ),
+            'moderation': self.command_page(
+                "Commandes de Modération",
+                "Gestion et modération des membres",
+                MODERATION_COMMANDS, prefix, permissions,
+                extra_fields=[(
+                    "📝 Format des durées",
+                    "`10s` = 10 secondes\n`5m` = 5 minutes\n`2h` = 2 heures\n`1d` = 1 jour"
+                )],
+                footer="Vous pouvez utiliser les noms d'utilisateurs au lieu de les mentionner"
+            ),
+            'roles': self.command_page(
+                "Commandes de Gestion des Rôles",
+                "Gestion complète des rôles du serveur",
+                ROLE_COMMANDS, prefix, permissions,
+                extra_fields=[
+                    (
+                        "🎨 Couleurs disponibles",
+                        "`rouge`, `bleu`, `vert`, `jaune`, `orange`, `violet`, `rose`, `cyan`, `noir`, `blanc` ou `#RRGGBB`"
+                    ),
+                    (
+                        "🔐 Permissions spéciales",
+                        "`admin` = toutes les permissions\n`mod` = permissions de modération"
+                    )
+                ],
+                footer="💡 Vous pouvez utiliser les noms de rôles et membres directement"
+            ),
+            'ownership': self.ownership_page(),
+            'permissions': self.permissions_page(prefix)
+        }
+    
+    def command_page(self, title, description, entries, prefix, permissions, extra_fields=(), footer=None):
+        embed = discord.Embed(title=title, description=description, color=self.bot.config.embed_color)
+        
+        for name, desc, usage in entries:
+            command_name = name.split()[0]
+            if self.bot.get_command(command_name) is None:
+                continue
+            level = permissions.get(command_name)
+            field_name = f"`{name}` · {get_permission_level_name(level)}" if level else f"`{name}`"
             embed.add_field(
-                name=f"`{name}`",
-                value=f"{desc}\n{usage}",
+                name=field_name,
+                value=f"{desc}\n{usage.replace('`+', f'`{prefix}')}",
                 inline=False
             )
         
-        embed.add_field(
-            name="📝 Format des durées",
-            value="`10s` = 10 secondes\n`5m` = 5 minutes\n`2h` = 2 heures\n`1d` = 1 jour",
-            inline=False
-        )
+        for name, value in extra_fields:
+            embed.add_field(name=name, value=value, inline=False)
         
-        embed.set_footer(text="Vous pouvez utiliser les noms d'utilisateurs au lieu de les mentionner")
-        await interaction.response.edit_message(embed=embed, view=self)
+        if footer:
+            embed.set_footer(text=footer)
+        return embed
     
-    @discord.ui.button(label="Rôles", style=discord.ButtonStyle.primary)
-    async def roles_help(self, interaction: discord.Interaction, button: discord.ui.Button):
-        """Affiche l'aide pour les commandes de gestion des rôles"""
+    def main_page(self, prefix):
         embed = discord.Embed(
-            title="Commandes de Gestion des Rôles",
-            description="Gestion complète des rôles du serveur",
+            title="chdfz gestion - Aide Interactive",
+            description="Choisissez une catégorie avec les boutons ci-dessous pour voir les commandes disponibles.",
             color=self.bot.config.embed_color
         )
         
-        commands_list = [
-            ("addrole", "Ajouter un rôle à un membre", "`+addrole <membre> <rôle>`"),
-            ("delrole", "Retirer un rôle d'un membre", "`+delrole <membre> <rôle>`"),
-            ("createrole", "Créer un nouveau rôle", "`+createrole <nom> [couleur] [permissions]`"),
-            ("deleterole", "Supprimer un rôle", "`+deleterole <rôle>`"),
-            ("rolestats", "Statistiques d'un rôle", "`+rolestats <rôle>`")
-        ]
+        embed.add_field(
+            name="🎛️ Administration",
+            value="Gestion des permissions et configuration",
+            inline=True
+        )
+        
+        embed.add_field(
+            name="🔨 Modération",
+            value="Commandes de modération des membres",
+            inline=True
+        )
         
-        for name, desc, usage in commands_list:
-            embed.add_field(
-                name=f"`{name}`",
-                value=f"{desc}\n{usage}",
-                inline=False
-            )
+        embed.add_field(
+            name="👑 Rôles",
+            value="Gestion complète des rôles",
+            inline=True
+        )
         
         embed.add_field(
-            name="🎨 Couleurs disponibles",
-            value="`rouge`, `bleu`, `vert`, `jaune`, `orange`, `violet`, `rose`, `cyan`, `noir`, `blanc` ou `#RRGGBB`",
-            inline=False
+            name="👨‍💼 Ownership",
+            value="Commandes avancées propriété",
+            inline=True
         )
         
         embed.add_field(
-            name="🔐 Permissions spéciales",
-            value="`admin` = toutes les permissions\n`mod` = permissions de modération",
+            name="ℹ️ Informations",
+            value=f"Préfixe actuel : `{prefix}`\nServeurs : {len(self.bot.guilds)}\nVersion : 2.0",
             inline=False
         )
         
-        embed.set_footer(text="💡 Vous pouvez utiliser les noms de rôles et membres directement")
-        await interaction.response.edit_message(embed=embed, view=self)
+        embed.set_footer(text="Sélectionnez une catégorie avec les boutons ci-dessous")
+        return embed
     
-    @discord.ui.button(label="👨‍💼 Ownership", style=discord.ButtonStyle.success)
-    async def ownership_help(self, interaction: discord.Interaction, button: discord.ui.Button):
-        """Affiche l'aide pour les commandes d'ownership"""
+    def ownership_page(self):
         embed = discord.Embed(
             title="👨‍💼 Commandes Ownership",
             description="Gestion avancée du bot et propriété",
@@ -129,18 +268,13 @@ class HelpView(discord.ui.View):
         
         embed.add_field(
             name="🏢 Commandes Owners",
-            value=(
-                "`massrole <rôle>` - Donne le rôle à tous les humains\n"
-                "`say <message>` - Fait parler le bot anonymement\n"
-                "`dm <membre> <msg>` - Message privé via le bot\n"
-                "`laisse <membre>` - Met en laisse (🐶🦮)\n"
-                "`unlaisse <membre>` - Retire de la laisse\n"
-                "`wl <membre>` - Ajoute à la whitelist anti-raid\n"
-                "`unwl <membre>` - Retire de la whitelist\n"
-                "`blrank add <membre>` - Ajoute au blacklist-rank\n"
-                "`blrank del <membre>` - Retire du blacklist-rank\n"
-                "`blrank` - Liste blacklist-rank"
-            ),
+            value=OWNER_COMMANDS,
+            inline=False
+        )
+        
+        embed.add_field(
+            name="🩺 Diagnostics",
+            value=DIAGNOSTIC_COMMANDS,
             inline=False
         )
         
@@ -166,11 +300,9 @@ class HelpView(discord.ui.View):
         )
         
         embed.set_footer(text="Le système de laisse surveille automatiquement les pseudos")
-        await interaction.response.edit_message(embed=embed, view=self)
+        return embed
     
-    @discord.ui.button(label="🔢 Permissions", style=discord.ButtonStyle.success)
-    async def permissions_help(self, interaction: discord.Interaction, button: discord.ui.Button):
-        """Affiche l'aide pour le système de permissions"""
+    def permissions_page(self, prefix):
         embed = discord.Embed(
             title="🔢 Système de Permissions",
             description="Gestion hiérarchique des permissions CrowBots",
@@ -202,8 +334,8 @@ class HelpView(discord.ui.View):
                 "`+changeall <ancien> <nouveau>` - Déplacer commandes\n"
                 "`+perms` - Voir configuration\n"
                 "`+helpall` - Toutes commandes par niveau\n"
-                "`+clearperms` - Supprimer tout (avec confirmation)"
-            ),
+                "`+clearperm` - Supprimer tout (avec confirmation)"
+            ).replace('`+', f'`{prefix}'),
             inline=False
         )
         
@@ -219,106 +351,12 @@ class HelpView(discord.ui.View):
         )
         
         embed.set_footer(text="Un utilisateur avec perm3 peut utiliser toutes les commandes perm1-3")
-        await interaction.response.edit_message(embed=embed, view=self)
-    
-    @discord.ui.button(label="Menu Principal", style=discord.ButtonStyle.secondary, row=1)
-    async def main_menu(self, interaction: discord.Interaction, button: discord.ui.Button):
-        """Retourne au menu principal"""
-        embed = discord.Embed(
-            title="chdfz gestion - Aide Interactive",
-            description="Choisissez une catégorie avec les boutons ci-dessous pour voir les commandes disponibles.",
-            color=self.bot.config.embed_color
-        )
-        
-        embed.add_field(
-            name="🎛️ Administration",
-            value="Gestion des permissions et configuration",
-            inline=True
-        )
-        
-        embed.add_field(
-            name="🔨 Modération", 
-            value="Commandes de modération des membres",
-            inline=True
-        )
-        
-        embed.add_field(
-            name="👑 Rôles", 
-            value="Gestion complète des rôles",
-            inline=True
-        )
-        
-        embed.add_field(
-            name="👨‍💼 Ownership", 
-            value="Commandes avancées propriété",
-            inline=True
-        )
-        
-        embed.add_field(
-            name="ℹ️ Informations",
-            value=f"Préfixe actuel : `+`\nServeurs : {len(self.bot.guilds)}\nVersion : 2.0",
-            inline=False
-        )
-        
-        embed.set_footer(text="Sélectionnez une catégorie avec les boutons ci-dessous")
-        await interaction.response.edit_message(embed=embed, view=self)
-    
-    async def on_timeout(self):
-        """Appelé quand la vue expire"""
-        # Disable all buttons when timeout
-        for item in self.children:
-            item.disabled = True
-
-class HelpCommand(commands.Cog):
-    """Système d'aide interactif du bot"""
-    
-    def __init__(self, bot):
-        self.bot = bot
+        return embed
     
     @commands.command(name="help", aliases=["aide", "h"])
     async def help_command(self, ctx):
         """Affiche le menu d'aide interactif"""
-        
-        embed = discord.Embed(
-            title="chdfz gestion - Aide Interactive",
-            description="Choisissez une catégorie avec les boutons ci-dessous pour voir les commandes disponibles.",
-            color=self.bot.config.embed_color
-        )
-        
-        embed.add_field(
-            name="🎛️ Administration",
-            value="Gestion des permissions et configuration",
-            inline=True
-        )
-        
-        embed.add_field(
-            name="🔨 Modération", 
-            value="Commandes de modération des membres",
-            inline=True
-        )
-        
-        embed.add_field(
-            name="👑 Rôles", 
-            value="Gestion complète des rôles",
-            inline=True
-        )
-        
-        embed.add_field(
-            name="👨‍💼 Ownership", 
-            value="Commandes avancées propriété",
-            inline=True
-        )
-        
-        embed.add_field(
-            name="ℹ️ Informations",
-            value=f"Préfixe actuel : `+`\nServeurs : {len(self.bot.guilds)}\nVersion : 2.0",
-            inline=False
-        )
-        
-        embed.set_footer(text="Sélectionnez une catégorie avec les boutons ci-dessous")
-        
-        view = HelpView(self.bot)
-        await ctx.send(embed=embed, view=view)
+        await ctx.send(embed=await self.get_page(ctx.guild, 'main'), view=self.view)
 
 async def setup(bot):
-    await bot.add_cog(HelpCommand(bot))
\ No newline at end of file
+    await bot.add_cog(HelpCommand(bot))
@@ -0,0 +1,191 @@
+import discord
+from discord.ext import commands, tasks
+import asyncio
+import os
+import time
+from database import RETENTION_DEFAULTS, RETENTION_TABLES
+from cogs.ownership import is_owner_or_buyer
+from utils.export import EXPORTABLE_TABLES, GzipPartWriter
+
+PRUNE_BATCH_SIZE = 500
+ARCHIVE_PART_SIZE = 64 * 1024 * 1024
+
+class Maintenance(commands.Cog):
+    """History retention and database compaction"""
+
+    def __init__(self, bot):
+        self.bot = bot
+        self._running = asyncio.Lock()
+        self.last_report = None
+
+    async def cog_load(self):
+        self.maintenance.change_interval(hours=self.bot.config.maintenance_interval_hours)
+        self.maintenance.start()
+
+    def cog_unload(self):
+        self.maintenance.cancel()
+
+    @tasks.loop(hours=6)
+    async def maintenance(self):
+        try:
+            await self.run_maintenance()
+        except Exception as e:
+            self.bot.logger.error(f"Database maintenance failed: {e}")
+
+    @maintenance.before_loop
+    async def before_maintenance(self):
+        await self.bot.wait_until_ready()
+
+    async def run_maintenance(self) -> dict:
+        """Apply each guild's retention, then compact the database"""
+        async with self._running:
+            started = time.perf_counter()
+            configured = await self.bot.db.get_all_retention_settings()
+            deleted = {table: 0 for table in RETENTION_TABLES}
+            deleted['command_usage'] = 0
+
+            for guild in self.bot.guilds:
+                settings = configured.get(guild.id, RETENTION_DEFAULTS)
+                for table in RETENTION_TABLES:
+                    deleted[table] += await self._prune_table(table, guild.id, settings)
+                if settings['usage_days']:
+                    deleted['command_usage'] += await self._prune_usage(guild.id, settings['usage_days'])
+
+            freed_pages = await self.bot.db.compact()
+            stats = await self.bot.db.get_database_stats()
+
+            self.last_report = {
+                'deleted': deleted,
+                'freed_pages': freed_pages,
+                'size_bytes': stats['size_bytes'],
+                'duration': time.perf_counter() - started,
+                'finished_at': discord.utils.utcnow()
+            }
+            if any(deleted.values()):
+                self.bot.logger.info(
+                    f"Maintenance: pruned {deleted}, freed {freed_pages} pages in {self.last_report['duration']:.1f}s"
+                )
+            return self.last_report
+
+    async def _prune_table(self, table, guild_id, settings) -> int:
+        days_key, rows_key = RETENTION_TABLES[table]
+        max_age_days, max_rows = settings[days_key], settings[rows_key]
+        if not max_age_days and not max_rows:
+            return 0
+
+        max_id = None
+        if max_rows:
+            max_id = await self.bot.db.get_retention_cutoff_id(table, guild_id, max_rows)
+            if max_id is None and not max_age_days:
+                return 0
+
+        writer = None
+        if settings['archive']:
+            os.makedirs(self.bot.config.archive_dir, exist_ok=True)
+            stamp = discord.utils.utcnow().strftime('%Y%m%d%H%M%S')
+            writer = GzipPartWriter(
+                self.bot.config.archive_dir, f"{table}_{guild_id}_{stamp}", 'jsonl',
+                EXPORTABLE_TABLES[table], ARCHIVE_PART_SIZE
+            )
+
+        total = 0
+        try:
+            # Small batches: the database lock is never held for long
+            columns = EXPORTABLE_TABLES[table] if writer else ('id',)
+            id_index = columns.index('id')
+            while True:
+                rows = await self.bot.db.get_prunable_rows(
+                    table, guild_id, max_id=max_id, max_age_days=max_age_days, limit=PRUNE_BATCH_SIZE,
+                    columns=columns
+                )
+                if not rows:
+                    break
+                # Archived and flushed to disk before deleting: a failed write loses no rows
+                if writer:
+                    await asyncio.to_thread(writer.write_rows, rows)
+                    await asyncio.to_thread(writer.flush)
+                await self.bot.db.delete_rows(table, [row[id_index] for row in rows])
+                total += len(rows)
+                if len(rows) < PRUNE_BATCH_SIZE:
+                    break
+                await asyncio.sleep(0)
+        finally:
+            if writer:
+                await asyncio.to_thread(writer.close)
+        return total
+
+    async def _prune_usage(self, guild_id, max_age_days) -> int:
+        total = 0
+        while True:
+            deleted = await self.bot.db.prune_command_usage(guild_id, max_age_days, limit=PRUNE_BATCH_SIZE)
+            total += deleted
+            if deleted < PRUNE_BATCH_SIZE:
+                return total
+            await asyncio.sleep(0)
+
+    @commands.group(name="retention", invoke_without_command=True)
+    @is_owner_or_buyer()
+    async def retention(self, ctx):
+        """Show the guild's retention policy"""
+        settings = await self.bot.db.get_retention_settings(ctx.guild.id)
+        stats = await self.bot.db.get_database_stats()
+
+        def limit_text(value, unit):
+            return f"{value} {unit}" if value else "Illimité"
+
+        embed = discord.Embed(title="🗄️ Rétention des données", color=self.bot.config.embed_color)
+        embed.add_field(name="Logs de modération", value=f"Âge : {limit_text(settings['logs_days'], 'jours')}\nLignes : {limit_text(settings['logs_max_rows'], 'max')}", inline=True)
+        embed.add_field(name="Infractions", value=f"Âge : {limit_text(settings['infractions_days'], 'jours')}\nLignes : {limit_text(settings['infractions_max_rows'], 'max')}", inline=True)
+        embed.add_field(name="Utilisation des commandes", value=f"Âge : {limit_text(settings['usage_days'], 'jours')}", inline=True)
+        embed.add_field(name="Archivage", value="Oui" if settings['archive'] else "Non", inline=True)
+        embed.add_field(name="Base de données", value=f"{stats['size_bytes'] / 1024 / 1024:.1f} Mo ({stats['free_bytes'] / 1024 / 1024:.1f} Mo libres)", inline=True)
+
+        if self.last_report:
+            deleted = sum(self.last_report['deleted'].values())
+            embed.add_field(
+                name="Dernière maintenance",
+                value=f"{discord.utils.format_dt(self.last_report['finished_at'], 'R')} • {deleted} lignes supprimées",
+                inline=False
+            )
+
+        embed.set_footer(text="+retention set <paramètre> <valeur> • +retention run • 0 = illimité")
+        await ctx.send(embed=embed)
+
+    @retention.command(name="set")
+    @is_owner_or_buyer()
+    async def retention_set(self, ctx, key: str, value: str):
+        """Change a retention setting"""
+        key = key.lower()
+        if key not in RETENTION_DEFAULTS:
+            return await ctx.send(f"❌ Paramètre inconnu.\n💡 Paramètres disponibles : {', '.join(RETENTION_DEFAULTS)}")
+
+        if key == 'archive':
+            value = 1 if value.lower() in ('on', 'oui', 'yes', 'true', '1') else 0
+        else:
+            try:
+                value = int(value)
+            except ValueError:
+                return await ctx.send("❌ La valeur doit être un nombre entier.")
+            if value < 0:
+                return await ctx.send("❌ Valeur hors limites.")
+
+        await self.bot.db.set_retention_setting(ctx.guild.id, key, value)
+        await ctx.send(f"✅ `{key}` défini à `{value}`.")
+
+    @retention.command(name="run")
+    @is_owner_or_buyer()
+    async def retention_run(self, ctx):
+        """Run the maintenance now"""
+        if self._running.locked():
+            return await ctx.send("⏳ Une maintenance est déjà en cours.")
+
+        status = await ctx.send("⏳ Maintenance en cours...")
+        report = await self.run_maintenance()
+        details = "\n".join(f"`{table}` : {count}" for table, count in report['deleted'].items())
+        await status.edit(content=(
+            f"✅ Maintenance terminée en {report['duration']:.1f}s.\n{details}\n"
+            f"Pages libérées : {report['freed_pages']}"
+        ))
+
+async def setup(bot):
+    await bot.add_cog(Maintenance(bot))
@@ -1,11 +1,124 @@
 import discord
 from discord.ext import commands
 import asyncio
+import re
 import time
+import datetime
 from typing import Optional
 from utils.permissions import has_permission
-from utils.helpers import parse_time, format_time, get_or_fetch_user, get_mute_role
+from utils.helpers import parse_time, format_time, get_or_fetch_user, get_mute_role, extract_user_ids
 from utils.converters import MemberConverter, UserConverter
+from utils.purge import PurgeFilter, purge_channel, parse_purge_filters, MAX_PURGE, MAX_SCAN, MAX_PINS
+from utils.lockdown import lock_channels, unlock_channels, lock_guild, unlock_guild
+
+BULK_BAN_CHUNK = 200
+MASSBAN_MAX = 5000
+MASSBAN_FILE_MAX_BYTES = 1024 * 1024
+JOINED_SELECTOR = re.compile(r'^(?:joined|recent|depuis):(\d+)m?$', re.IGNORECASE)
+
+class ConfirmView(discord.ui.View):
+    """Confirmation of a mass action by its author"""
+    
+    def __init__(self, author_id: int, timeout: float = 30):
+        super().__init__(timeout=timeout)
+        self.author_id = author_id
+        self.confirmed = False
+    
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        return interaction.user.id == self.author_id
+    
+    @discord.ui.button(label="Confirmer", style=discord.ButtonStyle.danger)
+    async def confirm(self, interaction: discord.Interaction, button: discord.ui.Button):
+        self.confirmed = True
+        await interaction.response.edit_message(view=None)
+        self.stop()
+    
+    @discord.ui.button(label="Annuler", style=discord.ButtonStyle.secondary)
+    async def cancel(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await interaction.response.edit_message(content="❌ Action annulée.", embed=None, view=None)
+        self.stop()
+
+INFRACTIONS_PAGE_SIZE = 10
+
+class InfractionsView(discord.ui.View):
+    """Paginated browsing of a member's infractions
+    
+    Each page is read on demand with id-based pagination, never loading
+    the whole history.
+    """
+    
+    def __init__(self, bot, author_id: int, guild_id: int, member: discord.Member, total: int):
+        super().__init__(timeout=120)
+        self.bot = bot
+        self.author_id = author_id
+        self.guild_id = guild_id
+        self.member = member
+        self.total = total
+        self.page = 0
+        self.first_id = None
+        self.last_id = None
+        self.message = None
+    
+    @property
+    def page_count(self) -> int:
+        return max(1, -(-self.total // INFRACTIONS_PAGE_SIZE))
+    
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        return interaction.user.id == self.author_id
+    
+    async def load_page(self, before_id: Optional[int] = None, after_id: Optional[int] = None) -> discord.Embed:
+        infractions = await self.bot.db.get_user_infractions_page(
+            self.guild_id, self.member.id, before_id=before_id, after_id=after_id,
+            limit=INFRACTIONS_PAGE_SIZE
+        )
+        if infractions:
+            self.first_id = infractions[0]['id']
+            self.last_id = infractions[-1]['id']
+        
+        embed = discord.Embed(
+            title="Infractions de l'utilisateur",
+            description=f"Infractions de **{self.member}** ({self.total} au total)",
+            color=self.bot.config.embed_color
+        )
+        
+        offset = self.page * INFRACTIONS_PAGE_SIZE
+        for i, infraction in enumerate(infractions, offset + 1):
+            value = f"**Raison:** {infraction['reason'] or 'Aucune raison'}\n"
+            value += f"**Modérateur:** <@{infraction['moderator_id']}>\n"
+            value += f"**Date:** {infraction['created_at']}"
+            
+            if infraction['duration']:
+                value += f"\n**Durée:** {format_time(infraction['duration'])}"
+            
+            embed.add_field(
+                name=f"{i}. {infraction['infraction_type'].title()} (ID: {infraction['id']})",
+                value=value,
+                inline=False
+            )
+        
+        embed.set_footer(text=f"Page {self.page + 1}/{self.page_count}")
+        self.previous_page.disabled = self.page == 0
+        self.next_page.disabled = self.page + 1 >= self.page_count
+        return embed
+    
+    @discord.ui.button(label="◀ Précédent", style=discord.ButtonStyle.secondary)
+    async def previous_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        self.page = max(0, self.page - 1)
+        embed = await self.load_page(after_id=self.first_id)
+        await interaction.response.edit_message(embed=embed, view=self)
+    
+    @discord.ui.button(label="Suivant ▶", style=discord.ButtonStyle.secondary)
+    async def next_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        self.page += 1
+        embed = await self.load_page(before_id=self.last_id)
+        await interaction.response.edit_message(embed=embed, view=self)
+    
+    async def on_timeout(self):
+        if self.message:
+            try:
+                await self.message.edit(view=None)
+            except discord.HTTPException:
+                pass
 
 class Moderation(commands.Cog):
     """Moderation commands for managing users and maintaining order"""
@@ -13,7 +126,7 @@ class Moderation(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
     
-    @commands.command(name="ban")
+    @commands.hybrid_command(name="ban")
     @has_permission()
     async def ban_user(self, ctx, member: MemberConverter, *, reason: str = "Aucune raison fournie"):
         """Ban a member from the server"""
@@ -36,31 +149,21 @@ class Moderation(commands.Cog):
             return
         
         try:
-            # Send DM to user before banning
-            try:
-                dm_embed = discord.Embed(
-                    title="🔨 Vous avez été banni",
-                    description=f"Vous avez été banni de **{ctx.guild.name}**",
-                    color=self.bot.config.error_color
-                )
-                dm_embed.add_field(name="Raison", value=reason, inline=False)
-                dm_embed.add_field(name="Modérateur", value=str(ctx.author), inline=False)
-                await member.send(embed=dm_embed)
-            except:
-                pass  # User has DMs disabled
-            
-            await member.ban(reason=f"{reason} | Moderator: {ctx.author}")
-            
-            # Log the infraction
-            await self.bot.db.add_infraction(
-                ctx.guild.id, member.id, ctx.author.id, "ban", reason
+            # The ban goes out first; the DM channel opens alongside it and the notice is queued after
+            dm_embed = discord.Embed(
+                title="🔨 Vous avez été banni",
+                description=f"Vous avez été banni de **{ctx.guild.name}**",
+                color=self.bot.config.error_color
             )
-            
-            # Log moderation action
-            await self.bot.db.log_moderation_action(
-                ctx.guild.id, member.id, ctx.author.id, "ban", reason
+            dm_embed.add_field(name="Raison", value=reason, inline=False)
+            dm_embed.add_field(name="Modérateur", value=str(ctx.author), inline=False)
+            await self.bot.sanctions.apply(
+                member, dm_embed, member.ban(reason=f"{reason} | Moderator: {ctx.author}")
             )
             
+            # Infraction and moderation log in one transaction
+            await self.bot.sanctions.record(ctx.guild.id, member.id, ctx.author.id, "ban", reason)
+            
             embed = discord.Embed(
                 title="Utilisateur banni",
                 description=f"**{member}** a été banni.",
@@ -85,7 +188,7 @@ class Moderation(commands.Cog):
             )
             await ctx.send(embed=embed)
     
-    @commands.command(name="unban")
+    @commands.hybrid_command(name="unban")
     @has_permission()
     async def unban_user(self, ctx, user: UserConverter):
         """Unban a user by their ID"""
@@ -120,7 +223,114 @@ class Moderation(commands.Cog):
             )
             await ctx.send(embed=embed)
     
-    @commands.command(name="kick")
+    @commands.hybrid_command(name="massban")
+    @has_permission()
+    async def mass_ban(self, ctx, file: Optional[discord.Attachment] = None, *, targets: str = ""):
+        """Ban several users at once
+        
+        Usage: +massban <IDs/mentions...> [raison]
+               +massban joined:<minutes> [raison]
+               +massban [raison] with a .txt file of IDs attached
+        """
+        await ctx.defer()
+        user_ids = []
+        reason_tokens = []
+        joined_minutes = None
+        
+        for token in targets.split():
+            selector = JOINED_SELECTOR.match(token)
+            if selector and not reason_tokens:
+                joined_minutes = int(selector.group(1))
+            elif not reason_tokens and extract_user_ids(token):
+                user_ids.extend(extract_user_ids(token))
+            else:
+                reason_tokens.append(token)
+        reason = " ".join(reason_tokens) or "Massban"
+        
+        for attachment in ctx.message.attachments or ([file] if file else []):
+            if attachment.size > MASSBAN_FILE_MAX_BYTES:
+                return await ctx.send("❌ Fichier trop volumineux (1 Mo maximum).")
+            content = await attachment.read()
+            user_ids.extend(extract_user_ids(content.decode('utf-8', errors='ignore')))
+        
+        if joined_minutes is not None:
+            since = discord.utils.utcnow() - datetime.timedelta(minutes=joined_minutes)
+            user_ids.extend(
+                member.id for member in await self.bot.ensure_members(ctx.guild)
+                if member.joined_at and member.joined_at >= since and not member.bot
+            )
+        
+        # Deduplicate and drop protected targets
+        whitelist = await self.bot.db.get_whitelist_set(ctx.guild.id)
+        protected = {ctx.author.id, ctx.guild.owner_id, ctx.guild.me.id}
+        targets_ids = []
+        skipped = 0
+        for user_id in dict.fromkeys(user_ids):
+            member = ctx.guild.get_member(user_id)
+            if user_id in protected or user_id in whitelist:
+                skipped += 1
+            elif member and ctx.author != ctx.guild.owner and member.top_role >= ctx.author.top_role:
+                skipped += 1
+            elif member and member.top_role >= ctx.guild.me.top_role:
+                skipped += 1
+            else:
+                targets_ids.append(user_id)
+        
+        if not targets_ids:
+            return await ctx.send("❌ Aucun utilisateur à bannir.\n💡 Usage: `+massban <IDs...> [raison]` ou `+massban joined:<minutes> [raison]`")
+        
+        if len(targets_ids) > MASSBAN_MAX:
+            return await ctx.send(f"❌ Trop d'utilisateurs ({len(targets_ids)}), maximum {MASSBAN_MAX}.")
+        
+        embed = discord.Embed(
+            title="🔨 Confirmation du massban",
+            description=f"**{len(targets_ids)}** utilisateurs vont être bannis.",
+            color=self.bot.config.warning_color
+        )
+        embed.add_field(name="Raison", value=reason, inline=False)
+        if skipped:
+            embed.add_field(name="Ignorés", value=f"{skipped} (protégés, whitelist ou hiérarchie)", inline=False)
+        
+        view = ConfirmView(ctx.author.id)
+        prompt = await ctx.send(embed=embed, view=view)
+        timed_out = await view.wait()
+        if not view.confirmed:
+            if timed_out:
+                try:
+                    await prompt.edit(content="⌛ Délai expiré, massban annulé.", embed=None, view=None)
+                except discord.HTTPException:
+                    pass
+            return
+        
+        banned = []
+        failed = 0
+        audit_reason = f"{reason} | Massban par {ctx.author}"
+        for i in range(0, len(targets_ids), BULK_BAN_CHUNK):
+            chunk = [discord.Object(id=user_id) for user_id in targets_ids[i:i + BULK_BAN_CHUNK]]
+            try:
+                result = await ctx.guild.bulk_ban(chunk, reason=audit_reason)
+                banned.extend(user.id for user in result.banned)
+                failed += len(result.failed)
+            except discord.HTTPException:
+                failed += len(chunk)
+        
+        # Every infraction in a single transaction
+        await self.bot.db.add_infractions_bulk([
+            (ctx.guild.id, user_id, ctx.author.id, "ban", reason, None) for user_id in banned
+        ])
+        
+        embed = discord.Embed(
+            title="🔨 Massban terminé",
+            color=self.bot.config.success_color if not failed else self.bot.config.warning_color
+        )
+        embed.add_field(name="Bannis", value=str(len(banned)), inline=True)
+        embed.add_field(name="Échecs", value=str(failed), inline=True)
+        embed.add_field(name="Ignorés", value=str(skipped), inline=True)
+        embed.add_field(name="Raison", value=reason, inline=False)
+        embed.add_field(name="Modérateur", value=ctx.author.mention, inline=False)
+        await prompt.edit(embed=embed, view=None)
+    
+    @commands.hybrid_command(name="kick")
     @has_permission()
     async def kick_user(self, ctx, member: MemberConverter, *, reason: str = "Aucune raison fournie"):
         """Kick a member from the server"""
@@ -143,31 +353,21 @@ class Moderation(commands.Cog):
             return
         
         try:
-            # Send DM to user before kicking
-            try:
-                dm_embed = discord.Embed(
-                    title="Vous avez été expulsé",
-                    description=f"Vous avez été expulsé de **{ctx.guild.name}**",
-                    color=self.bot.config.warning_color
-                )
-                dm_embed.add_field(name="Raison", value=reason, inline=False)
-                dm_embed.add_field(name="Modérateur", value=str(ctx.author), inline=False)
-                await member.send(embed=dm_embed)
-            except:
-                pass  # User has DMs disabled
-            
-            await member.kick(reason=f"{reason} | Moderator: {ctx.author}")
-            
-            # Log the infraction
-            await self.bot.db.add_infraction(
-                ctx.guild.id, member.id, ctx.author.id, "kick", reason
+            # The kick goes out first; the DM channel opens alongside it and the notice is queued after
+            dm_embed = discord.Embed(
+                title="Vous avez été expulsé",
+                description=f"Vous avez été expulsé de **{ctx.guild.name}**",
+                color=self.bot.config.warning_color
             )
-            
-            # Log moderation action
-            await self.bot.db.log_moderation_action(
-                ctx.guild.id, member.id, ctx.author.id, "kick", reason
+            dm_embed.add_field(name="Raison", value=reason, inline=False)
+            dm_embed.add_field(name="Modérateur", value=str(ctx.author), inline=False)
+            await self.bot.sanctions.apply(
+                member, dm_embed, member.kick(reason=f"{reason} | Moderator: {ctx.author}")
             )
             
+            # Infraction and moderation log in one transaction
+            await self.bot.sanctions.record(ctx.guild.id, member.id, ctx.author.id, "kick", reason)
+            
             embed = discord.Embed(
                 title="👢 User Kicked",
                 description=f"**{member}** has been kicked.",
@@ -192,7 +392,7 @@ class Moderation(commands.Cog):
             )
             await ctx.send(embed=embed)
     
-    @commands.command(name="mute")
+    @commands.hybrid_command(name="mute")
     @has_permission()
     async def mute_user(self, ctx, member: MemberConverter, duration: Optional[str] = None, *, reason: str = "Aucune raison fournie"):
         """Mute a member (prevent them from sending messages)"""
@@ -281,7 +481,7 @@ class Moderation(commands.Cog):
             )
             await ctx.send(embed=embed)
     
-    @commands.command(name="unmute")
+    @commands.hybrid_command(name="unmute")
     @has_permission()
     async def unmute_user(self, ctx, member: MemberConverter):
         """Unmute a member"""
@@ -320,7 +520,7 @@ class Moderation(commands.Cog):
             )
             await ctx.send(embed=embed)
     
-    @commands.command(name="mutelist")
+    @commands.hybrid_command(name="mutelist")
     @has_permission()
     async def mute_list(self, ctx):
         """Show list of currently muted users"""
@@ -372,7 +572,7 @@ class Moderation(commands.Cog):
             )
             await ctx.send(embed=embed)
     
-    @commands.command(name="warn")
+    @commands.hybrid_command(name="warn")
     @has_permission()
     async def warn_user(self, ctx, member: MemberConverter, *, reason: str = "Aucune raison fournie"):
         """Give a warning to a member"""
@@ -386,28 +586,18 @@ class Moderation(commands.Cog):
             return
         
         try:
-            # Add warning to database
-            await self.bot.db.add_infraction(
-                ctx.guild.id, member.id, ctx.author.id, "warn", reason
-            )
+            # Infraction and moderation log in one transaction
+            await self.bot.sanctions.record(ctx.guild.id, member.id, ctx.author.id, "warn", reason)
             
-            # Log moderation action
-            await self.bot.db.log_moderation_action(
-                ctx.guild.id, member.id, ctx.author.id, "warn", reason
+            # Send DM to user in the background
+            dm_embed = discord.Embed(
+                title="Vous avez reçu un avertissement",
+                description=f"Vous avez reçu un avertissement dans **{ctx.guild.name}**",
+                color=self.bot.config.warning_color
             )
-            
-            # Send DM to user
-            try:
-                dm_embed = discord.Embed(
-                    title="Vous avez reçu un avertissement",
-                    description=f"Vous avez reçu un avertissement dans **{ctx.guild.name}**",
-                    color=self.bot.config.warning_color
-                )
-                dm_embed.add_field(name="Raison", value=reason, inline=False)
-                dm_embed.add_field(name="Modérateur", value=str(ctx.author), inline=False)
-                await member.send(embed=dm_embed)
-            except:
-                pass  # User has DMs disabled
+            dm_embed.add_field(name="Raison", value=reason, inline=False)
+            dm_embed.add_field(name="Modérateur", value=str(ctx.author), inline=False)
+            self.bot.sanctions.notify(member, dm_embed)
             
             await ctx.send(f"**{member}** a été averti. Raison: {reason}")
             
@@ -419,7 +609,7 @@ class Moderation(commands.Cog):
             )
             await ctx.send(embed=embed)
     
-    @commands.command(name="delwarn")
+    @commands.hybrid_command(name="delwarn")
     @has_permission()
     async def delete_warning(self, ctx, member: MemberConverter, warning_id: int = None):
         """Delete a specific warning for a member. Use warning ID or leave empty to see warnings."""
@@ -485,14 +675,15 @@ class Moderation(commands.Cog):
             )
             await ctx.send(embed=embed)
     
-    @commands.command(name="infractions")
+    @commands.hybrid_command(name="infractions")
     @has_permission()
     async def show_infractions(self, ctx, member: MemberConverter):
         """Show infractions for a member"""
+        await ctx.defer()
         try:
-            infractions = await self.bot.db.get_user_infractions(ctx.guild.id, member.id)
+            total = await self.bot.db.count_user_infractions(ctx.guild.id, member.id)
             
-            if not infractions:
+            if not total:
                 embed = discord.Embed(
                     title="Infractions de l'utilisateur",
                     description=f"**{member}** n'a aucune infraction.",
@@ -501,33 +692,13 @@ class Moderation(commands.Cog):
                 await ctx.send(embed=embed)
                 return
             
-            embed = discord.Embed(
-                title="Infractions de l'utilisateur",
-                description=f"Infractions for **{member}**",
-                color=self.bot.config.embed_color
-            )
-            
-            for i, infraction in enumerate(infractions[:10], 1):  # Limit to 10 infractions
-                moderator = await get_or_fetch_user(self.bot, infraction['moderator_id'])
-                moderator_name = str(moderator) if moderator else "Unknown Moderator"
-                
-                value = f"**Reason:** {infraction['reason'] or 'No reason'}\n"
-                value += f"**Moderator:** {moderator_name}\n"
-                value += f"**Date:** {infraction['created_at']}"
-                
-                if infraction['duration']:
-                    value += f"\n**Duration:** {format_time(infraction['duration'])}"
-                
-                embed.add_field(
-                    name=f"{i}. {infraction['type'].title()}",
-                    value=value,
-                    inline=False
-                )
+            view = InfractionsView(self.bot, ctx.author.id, ctx.guild.id, member, total)
+            embed = await view.load_page()
+            if total <= INFRACTIONS_PAGE_SIZE:
+                await ctx.send(embed=embed)
+                return
             
-            if len(infractions) > 10:
-                embed.set_footer(text=f"Showing 10 of {len(infractions)} infractions")
-            
-            await ctx.send(embed=embed)
+            view.message = await ctx.send(embed=embed, view=view)
             
         except Exception as e:
             embed = discord.Embed(
@@ -537,41 +708,120 @@ class Moderation(commands.Cog):
             )
             await ctx.send(embed=embed)
     
-    @commands.command(name="clear")
+    @commands.hybrid_command(name="clear")
     @has_permission()
     async def clear_messages(self, ctx, amount: int):
         """Clear a specified number of messages"""
-        if amount <= 0 or amount > 100:
-            await ctx.send("❌ Le nombre doit être entre 1 et 100.")
+        if amount <= 0 or amount > MAX_PURGE:
+            await ctx.send(f"❌ Le nombre doit être entre 1 et {MAX_PURGE}.")
             return
         
+        if ctx.interaction is None:
+            try:
+                await ctx.message.delete()
+            except discord.HTTPException:
+                pass
+        else:
+            await ctx.defer(ephemeral=True)
+        
         try:
-            deleted = await ctx.channel.purge(limit=amount + 1)  # +1 to include the command message
+            stats = await purge_channel(
+                # Same rules as an unfiltered +purge: pins are kept and scanned past
+                ctx.channel, amount, check=PurgeFilter(), before=ctx.message,
+                scan_limit=amount + MAX_PINS,
+                reason=f"Clear par {ctx.author}"
+            )
             
             # Log moderation action
             await self.bot.db.log_moderation_action(
                 ctx.guild.id, 0, ctx.author.id, "clear", 
-                f"Cleared {len(deleted) - 1} messages in {ctx.channel.name}"
+                f"Cleared {stats.deleted} messages in {ctx.channel.name}"
             )
             
             # Send confirmation and delete after 5 seconds
-            await ctx.send(f"🧹 {len(deleted) - 1} messages supprimés.", delete_after=5)
+            await ctx.send(f"🧹 {stats.deleted} messages supprimés.", delete_after=5)
             
         except discord.Forbidden:
             await ctx.send("❌ Je n'ai pas la permission de supprimer les messages.")
         except Exception as e:
             await ctx.send(f"❌ Erreur lors de la suppression des messages: {str(e)}")
     
-    @commands.command(name="lock")
+    @commands.hybrid_command(name="purge")
+    @has_permission()
+    async def purge_messages(self, ctx, amount: int, *, filters: Optional[str] = None):
+        """Filtered purge of a channel's history
+        
+        Usage: +purge <nombre> [@membre/ID] [bots] [fichiers] [liens] [before:<id>] [after:<id>] [regex:<motif>]
+        """
+        if amount <= 0 or amount > MAX_PURGE:
+            await ctx.send(f"❌ Le nombre doit être entre 1 et {MAX_PURGE}.")
+            return
+        
+        try:
+            purge_filter = parse_purge_filters(filters)
+        except ValueError as e:
+            await ctx.send(f"❌ {e}")
+            return
+        
+        if ctx.interaction is None:
+            try:
+                await ctx.message.delete()
+            except discord.HTTPException:
+                pass
+        else:
+            await ctx.defer()
+        
+        # Without filters only pinned messages are skipped: scanning past them is enough
+        scan_limit = amount + MAX_PINS if purge_filter.is_empty else min(amount * 10, MAX_SCAN)
+        status = await ctx.send(f"🧹 Purge en cours... (filtres : {purge_filter.describe()})")
+        
+        async def report_progress(stats):
+            await status.edit(content=(
+                f"🧹 Purge en cours... **{stats.deleted}** supprimés / "
+                f"{stats.matched} ciblés / {stats.scanned} parcourus"
+            ))
+        
+        try:
+            stats = await purge_channel(
+                ctx.channel, amount, check=purge_filter,
+                before=purge_filter.before or ctx.message,
+                after=purge_filter.after,
+                scan_limit=scan_limit,
+                progress=report_progress,
+                reason=f"Purge par {ctx.author}"
+            )
+            
+            await self.bot.db.log_moderation_action(
+                ctx.guild.id, 0, ctx.author.id, "purge",
+                f"Purged {stats.deleted} messages in {ctx.channel.name}",
+                f"Filters: {purge_filter.describe()} | Scanned: {stats.scanned} | Failed: {stats.failed}"
+            )
+            
+            summary = f"🧹 Purge terminée : **{stats.deleted}** messages supprimés en {stats.elapsed:.1f}s."
+            if stats.failed:
+                summary += f"\n⚠️ {stats.failed} suppressions ont échoué."
+            # Webhook messages (slash commands) have no delete_after on edit
+            await status.edit(content=summary)
+            await status.delete(delay=10)
+            
+        except discord.Forbidden:
+            await status.edit(content="❌ Je n'ai pas la permission de supprimer les messages.")
+        except Exception as e:
+            await status.edit(content=f"❌ Erreur lors de la purge: {str(e)}")
+    
+    @commands.hybrid_command(name="lock")
     @has_permission()
     async def lock_channel(self, ctx, channel: Optional[discord.TextChannel] = None):
         """Lock a channel (prevent @everyone from sending messages)"""
         channel = channel or ctx.channel
         
         try:
-            overwrite = channel.overwrites_for(ctx.guild.default_role)
-            overwrite.send_messages = False
-            await channel.set_permissions(ctx.guild.default_role, overwrite=overwrite)
+            result = await lock_channels(
+                self.bot.db, ctx.guild, [channel], reason=f"Lock par {ctx.author}"
+            )
+            if result.failed:
+                await ctx.send("❌ Je n'ai pas la permission de gérer ce salon.")
+                return
             
             # Log moderation action
             await self.bot.db.log_moderation_action(
@@ -585,16 +835,25 @@ class Moderation(commands.Cog):
         except Exception as e:
             await ctx.send(f"❌ Erreur lors du verrouillage: {str(e)}")
     
-    @commands.command(name="unlock")
+    @commands.hybrid_command(name="unlock")
     @has_permission()
     async def unlock_channel(self, ctx, channel: Optional[discord.TextChannel] = None):
         """Unlock a channel (allow @everyone to send messages)"""
         channel = channel or ctx.channel
         
         try:
-            overwrite = channel.overwrites_for(ctx.guild.default_role)
-            overwrite.send_messages = None  # Reset to default
-            await channel.set_permissions(ctx.guild.default_role, overwrite=overwrite)
+            result = await unlock_channels(
+                self.bot.db, ctx.guild, [channel.id], reason=f"Unlock par {ctx.author}"
+            )
+            if result.failed:
+                await ctx.send("❌ Je n'ai pas la permission de gérer ce salon.")
+                return
+            
+            if not result.changed:
+                # No snapshot (locked by hand): just remove the deny
+                overwrite = channel.overwrites_for(ctx.guild.default_role)
+                overwrite.send_messages = None  # Reset to default
+                await channel.set_permissions(ctx.guild.default_role, overwrite=overwrite)
             
             # Log moderation action
             await self.bot.db.log_moderation_action(
@@ -607,6 +866,56 @@ class Moderation(commands.Cog):
             await ctx.send("❌ Je n'ai pas la permission de gérer ce salon.")
         except Exception as e:
             await ctx.send(f"❌ Erreur lors du déverrouillage: {str(e)}")
+    
+    @commands.hybrid_command(name="lockdown")
+    @has_permission()
+    async def lockdown_server(self, ctx, *, reason: str = "Aucune raison fournie"):
+        """Lock every text channel of the server"""
+        status = await ctx.send("🔒 Verrouillage du serveur en cours...")
+        
+        try:
+            result = await lock_guild(self.bot.db, ctx.guild, reason=f"Lockdown par {ctx.author}: {reason}")
+            
+            await self.bot.db.log_moderation_action(
+                ctx.guild.id, 0, ctx.author.id, "lockdown", reason,
+                f"Locked: {result.changed} | Skipped: {result.skipped} | Failed: {result.failed}"
+            )
+            
+            summary = f"🔒 Serveur verrouillé : **{result.changed}** salons verrouillés"
+            if result.skipped:
+                summary += f", {result.skipped} déjà verrouillés"
+            if result.failed:
+                summary += f", ⚠️ {result.failed} échecs"
+            await status.edit(content=summary + ".\n💡 Utilisez `+unlockdown` pour restaurer.")
+            
+        except Exception as e:
+            await status.edit(content=f"❌ Erreur lors du verrouillage du serveur: {str(e)}")
+    
+    @commands.hybrid_command(name="unlockdown")
+    @has_permission()
+    async def unlockdown_server(self, ctx):
+        """Restore the permissions of channels locked by +lockdown"""
+        status = await ctx.send("🔓 Restauration des salons en cours...")
+        
+        try:
+            result = await unlock_guild(self.bot.db, ctx.guild, reason=f"Unlockdown par {ctx.author}")
+            
+            await self.bot.db.log_moderation_action(
+                ctx.guild.id, 0, ctx.author.id, "unlockdown", None,
+                f"Restored: {result.changed} | Skipped: {result.skipped} | Failed: {result.failed}"
+            )
+            
+            if not result.changed and not result.failed:
+                await status.edit(content="❌ Aucun salon à restaurer.")
+                return
+            
+            summary = f"🔓 **{result.changed}** salons restaurés"
+            if result.failed:
+                summary += f", ⚠️ {result.failed} échecs (relancez `+unlockdown`)"
+            await status.edit(content=summary + ".")
+            
+        except Exception as e:
+            await status.edit(content=f"❌ Erreur lors de la restauration: {str(e)}")
 
 async def setup(bot):
     await bot.add_cog(Moderation(bot))
@@ -1,7 +1,16 @@
 import discord
 from discord.ext import commands
+import os
+import asyncio
+import tempfile
 from typing import Optional
 from utils.converters import MemberConverter, UserConverter
+from utils.export import EXPORT_FORMATS, export_table
+from utils.ipc import rss_bytes
+from utils.memory import guild_cache_report
+
+# Role removals running at once for blacklist-rank enforcement
+ENFORCE_CONCURRENCY = 5
 
 def is_owner_or_buyer():
     """Check if user is owner or buyer"""
@@ -15,14 +24,9 @@ def is_owner_or_buyer():
             if await ctx.bot.is_owner(ctx.author):
                 return True
             
-            # Check buyer
-            buyer = await ctx.bot.db.get_buyer(ctx.guild.id)
-            if buyer and ctx.author.id == buyer:
-                return True
-            
-            # Check owner
-            is_owner = await ctx.bot.db.is_owner(ctx.guild.id, ctx.author.id)
-            if is_owner:
+            # Check buyer and owners (in-memory registry)
+            buyer, owners = await ctx.bot.db.get_ownership(ctx.guild.id)
+            if ctx.author.id == buyer or ctx.author.id in owners:
                 return True
             
             # Debug info - send error message explaining why access was denied
@@ -34,7 +38,6 @@ def is_owner_or_buyer():
             else:
                 error_msg += "🔑 **Buyer :** Aucun configuré (utilisez `+setupbuyer`)\n"
             
-            owners = await ctx.bot.db.get_owners(ctx.guild.id)
             if owners:
                 error_msg += f"👨‍💼 **Owners :** {len(owners)} configuré(s)\n"
             else:
@@ -48,7 +51,7 @@ def is_owner_or_buyer():
             
         except Exception as e:
             await ctx.send(f"❌ **Erreur système :** {str(e)}\n🔧 Contactez l'administrateur du bot.")
-            print(f"Error in ownership check: {e}")
+            ctx.bot.logger.error(f"Error in ownership check: {e}", extra={'guild_id': ctx.guild.id, 'user_id': ctx.author.id})
             return False
     
     return commands.check(predicate)
@@ -65,7 +68,7 @@ def is_buyer_only():
             if await ctx.bot.is_owner(ctx.author):
                 return True
                 
-            buyer = await ctx.bot.db.get_buyer(ctx.guild.id)
+            buyer, _ = await ctx.bot.db.get_ownership(ctx.guild.id)
             if buyer and ctx.author.id == buyer:
                 return True
             
@@ -86,7 +89,7 @@ def is_buyer_only():
             
         except Exception as e:
             await ctx.send(f"❌ **Erreur système :** {str(e)}\n🔧 Contactez l'administrateur du bot.")
-            print(f"Error in buyer check: {e}")
+            ctx.bot.logger.error(f"Error in buyer check: {e}", extra={'guild_id': ctx.guild.id, 'user_id': ctx.author.id})
             return False
     
     return commands.check(predicate)
@@ -96,6 +99,36 @@ class Ownership(commands.Cog):
     
     def __init__(self, bot):
         self.bot = bot
+        self._enforce_semaphore = asyncio.Semaphore(ENFORCE_CONCURRENCY)
+    
+    async def cog_load(self):
+        await self.bot.db.load_blacklist_cache()
+    
+    @commands.Cog.listener("on_member_update")
+    async def enforce_blacklist_rank(self, before, after):
+        """Remove roles given to a blacklist-rank member"""
+        if after.id not in await self.bot.db.get_blacklist_rank_set(after.guild.id):
+            return
+        
+        me = after.guild.me
+        previous = set(before.roles)
+        added = [
+            role for role in after.roles
+            if role not in previous and not role.managed and role < me.top_role
+        ]
+        if not added:
+            return
+        
+        async with self._enforce_semaphore:
+            try:
+                await after.remove_roles(*added, reason="Blacklist-rank : rôles interdits")
+            except (discord.Forbidden, discord.NotFound):
+                pass
+            except discord.HTTPException as e:
+                self.bot.logger.error(
+                    f"Blacklist-rank enforcement failed for {after.id}: {e}",
+                    extra={'guild_id': after.guild.id, 'user_id': after.id}
+                )
     
     @commands.Cog.listener()
     async def on_member_update(self, before, after):
@@ -123,7 +156,7 @@ class Ownership(commands.Cog):
         if role >= ctx.guild.me.top_role:
             return await ctx.send("❌ Je ne peux pas gérer ce rôle car il est supérieur au mien.")
         
-        humans = [member for member in ctx.guild.members if not member.bot and role not in member.roles]
+        humans = [member for member in await self.bot.ensure_members(ctx.guild) if not member.bot and role not in member.roles]
         
         if not humans:
             return await ctx.send(f"❌ Aucun utilisateur humain à ajouter au rôle {role.mention}.")
@@ -333,6 +366,126 @@ class Ownership(commands.Cog):
         await self.bot.db.remove_blacklist_rank(ctx.guild.id, member.id)
         await ctx.send(f"❌ {member.mention} retiré du blacklist-rank.")
     
+    @commands.command(name="export")
+    @is_owner_or_buyer()
+    async def export_history(self, ctx, table: str = "logs", fmt: str = "jsonl"):
+        """Export the server's moderation history (logs/infractions, jsonl/csv)"""
+        tables = {'logs': 'moderation_logs', 'infractions': 'infractions'}
+        table = tables.get(table.lower())
+        fmt = fmt.lower()
+        if table is None or fmt not in EXPORT_FORMATS:
+            return await ctx.send("❌ Usage : `+export [logs|infractions] [jsonl|csv]`")
+        
+        status = await ctx.send("⏳ Export en cours...")
+        with tempfile.TemporaryDirectory(prefix="crowbot_export_") as out_dir:
+            try:
+                paths, count = await export_table(
+                    self.bot.db, table, out_dir, fmt=fmt,
+                    guild_id=ctx.guild.id, part_limit=ctx.guild.filesize_limit
+                )
+            except Exception as e:
+                self.bot.logger.error(f"Export of {table} failed in {ctx.guild.id}: {e}")
+                return await status.edit(content="❌ Échec de l'export.")
+            
+            if not count:
+                return await status.edit(content="📋 Aucune donnée à exporter.")
+            
+            await status.edit(content=f"✅ {count} lignes exportées en {len(paths)} fichier(s).")
+            # One file per message to stay under the upload limit
+            for path in paths:
+                await ctx.send(file=discord.File(path, filename=os.path.basename(path)))
+    
+    @commands.command(name="sync")
+    @is_owner_or_buyer()
+    async def sync_app_commands(self, ctx, scope: str = "guild"):
+        """Publish slash commands: guild (immediate), global (every server) or clear"""
+        scope = scope.lower()
+        if scope not in ("guild", "global", "clear"):
+            return await ctx.send("❌ Usage: `+sync [guild|global|clear]`")
+
+        if scope == "global":
+            # Global commands are shared by every server: bot owner only
+            if not await self.bot.is_owner(ctx.author):
+                return await ctx.send("❌ Seul le propriétaire du bot peut publier les commandes globalement.")
+            synced = await self.bot.tree.sync()
+            return await ctx.send(f"✅ {len(synced)} commandes slash publiées sur tous les serveurs (propagation jusqu'à 1 h).")
+
+        if scope == "clear":
+            self.bot.tree.clear_commands(guild=ctx.guild)
+            await self.bot.tree.sync(guild=ctx.guild)
+            return await ctx.send("✅ Commandes slash propres à ce serveur retirées.")
+
+        self.bot.tree.copy_global_to(guild=ctx.guild)
+        synced = await self.bot.tree.sync(guild=ctx.guild)
+        await ctx.send(f"✅ {len(synced)} commandes slash publiées sur ce serveur.")
+
+    @commands.command(name="cluster")
+    @is_owner_or_buyer()
+    async def cluster_status(self, ctx):
+        """Status of the cluster processes (shards, servers, memory)"""
+        if self.bot.cluster is None:
+            return await ctx.send("ℹ️ Le bot tourne dans un seul processus (`python main.py`).")
+        
+        try:
+            data = await self.bot.cluster.request('cluster_stats')
+        except (ConnectionError, asyncio.TimeoutError):
+            return await ctx.send("❌ Coordinateur injoignable.")
+        
+        embed = discord.Embed(
+            title="🧩 Cluster",
+            description=(
+                f"**Shards :** {data['shard_count']} • **Serveurs :** {data['guilds']} • "
+                f"**Membres :** {data['members']}\n"
+                f"**Mémoire totale :** {data['rss_bytes'] / 1024 / 1024:.0f} Mo"
+            ),
+            color=0x5865F2
+        )
+        for worker in data['workers']:
+            status = "🟢" if worker['healthy'] else ("🟡" if worker['alive'] else "🔴")
+            latencies = [s['latency_ms'] for s in worker['shards'].values() if s.get('latency_ms') is not None]
+            latency = f"{sum(latencies) / len(latencies):.0f} ms" if latencies else "—"
+            embed.add_field(
+                name=f"{status} Cluster {worker['cluster_id']}",
+                value=(
+                    f"Shards {worker['shard_ids'][0]}–{worker['shard_ids'][-1]}\n"
+                    f"{worker['guilds']} serveurs • {latency}\n"
+                    f"{worker['rss_bytes'] / 1024 / 1024:.0f} Mo • {worker['restarts']} redémarrage(s)"
+                ),
+                inline=True
+            )
+        await ctx.send(embed=embed)
+    
+    @commands.command(name="memory")
+    @is_owner_or_buyer()
+    async def memory_report(self, ctx, top: int = 10):
+        """Estimated memory of the Discord caches per server"""
+        status = await ctx.send("⏳ Mesure en cours...")
+        report = guild_cache_report(self.bot)
+        total = sum(entry['total_bytes'] for entry in report)
+        
+        embed = discord.Embed(
+            title="🧠 Mémoire des caches",
+            description=(
+                f"**Profil :** `{self.bot.config.memory_profile}` • "
+                f"**Messages en cache :** {len(self.bot.cached_messages)}\n"
+                f"**Caches estimés :** {total / 1024 / 1024:.1f} Mo • "
+                f"**Mémoire du processus :** {rss_bytes() / 1024 / 1024:.0f} Mo"
+            ),
+            color=self.bot.config.embed_color
+        )
+        for entry in report[:max(1, min(top, 20))]:
+            embed.add_field(
+                name=f"{entry['name'][:40]} ({entry['guild_id']})",
+                value=(
+                    f"{entry['total_bytes'] / 1024:.0f} Ko • "
+                    f"membres {entry['cached_members']}/{entry['member_count']}"
+                    f"{'' if entry['chunked'] else ' (partiel)'} : {entry['members_bytes'] / 1024:.0f} Ko\n"
+                    f"salons {entry['channels_bytes'] / 1024:.0f} Ko • rôles {entry['roles_bytes'] / 1024:.0f} Ko • "
+                    f"{entry['cached_messages']} messages {entry['messages_bytes'] / 1024:.0f} Ko"
+                ),
+                inline=False
+            )
+        await status.edit(content=None, embed=embed)
 
 async def setup(bot):
     await bot.add_cog(Ownership(bot))
\ No newline at end of file
@@ -1,16 +1,60 @@
 import discord
 from discord.ext import commands
+from itertools import islice
 from typing import Optional
 from utils.permissions import has_permission
 from utils.converters import MemberConverter, RoleConverter
+from utils.roleindex import RoleIndex
+
+ROLES_PAGE_CHARS = 4000
 
 class RoleManagement(commands.Cog):
     """Gestion des rôles du serveur"""
     
     def __init__(self, bot):
         self.bot = bot
+        self.index = RoleIndex()
+    
+    async def role_index(self, guild) -> RoleIndex:
+        """Role index of this guild, built the first time it is needed"""
+        if not self.index.is_indexed(guild.id):
+            members = await self.bot.ensure_members(guild)
+            self.index.build(guild.id, members)
+        return self.index
+    
+    def role_count(self, guild, role) -> int:
+        if role.is_default():
+            return guild.member_count or 0
+        return self.index.count(guild.id, role.id)
+    
+    @commands.Cog.listener()
+    async def on_member_join(self, member):
+        self.index.add_member(member.guild.id, member._roles)
+    
+    @commands.Cog.listener()
+    async def on_member_remove(self, member):
+        self.index.remove_member(member.guild.id, member._roles)
+    
+    @commands.Cog.listener()
+    async def on_member_update(self, before, after):
+        # _roles holds role ids without building Role objects
+        if before._roles != after._roles:
+            self.index.update_member(after.guild.id, before._roles, after._roles)
+    
+    @commands.Cog.listener()
+    async def on_guild_role_delete(self, role):
+        self.index.drop_role(role.guild.id, role.id)
+    
+    @commands.Cog.listener()
+    async def on_guild_available(self, guild):
+        # Events missed while the guild was unavailable: rebuilt on next use
+        self.index.drop_guild(guild.id)
     
-    @commands.command(name="addrole")
+    @commands.Cog.listener()
+    async def on_guild_remove(self, guild):
+        self.index.drop_guild(guild.id)
+    
+    @commands.hybrid_command(name="addrole")
     @has_permission()
     async def add_role(self, ctx, member: MemberConverter, role: RoleConverter):
         """Ajouter un rôle à un membre"""
@@ -63,7 +107,7 @@ class RoleManagement(commands.Cog):
         except Exception as e:
             await ctx.send(f"❌ Échec de l'ajout du rôle : {str(e)}")
     
-    @commands.command(name="delrole", aliases=["removerole"])
+    @commands.hybrid_command(name="delrole", aliases=["removerole"])
     @has_permission()
     async def remove_role(self, ctx, member: MemberConverter, role: RoleConverter):
         """Retirer un rôle d'un membre"""
@@ -116,7 +160,7 @@ class RoleManagement(commands.Cog):
         except Exception as e:
             await ctx.send(f"❌ Échec du retrait du rôle : {str(e)}")
     
-    @commands.command(name="createrole")
+    @commands.hybrid_command(name="createrole")
     @has_permission()
     async def create_role(self, ctx, name: str, color: str = None, *, permissions: str = None):
         """Créer un nouveau rôle"""
@@ -213,10 +257,11 @@ class RoleManagement(commands.Cog):
             )
             await ctx.send(embed=embed)
     
-    @commands.command(name="deleterole")
+    @commands.hybrid_command(name="deleterole")
     @has_permission()
     async def delete_role(self, ctx, role: RoleConverter):
         """Supprimer un rôle existant"""
+        await ctx.defer()
         # Vérifier la hiérarchie des rôles
         if role >= ctx.author.top_role and ctx.author != ctx.guild.owner:
             embed = discord.Embed(
@@ -247,7 +292,8 @@ class RoleManagement(commands.Cog):
             return
         
         role_name = role.name
-        member_count = len(role.members)
+        await self.role_index(ctx.guild)
+        member_count = self.role_count(ctx.guild, role)
         
         try:
             await role.delete(reason=f"Supprimé par {ctx.author}")
@@ -282,11 +328,18 @@ class RoleManagement(commands.Cog):
             )
             await ctx.send(embed=embed)
     
-    @commands.command(name="rolestats", aliases=["roleinfo"])
+    @commands.hybrid_command(name="rolestats", aliases=["roleinfo"])
     @has_permission()
     async def role_stats(self, ctx, role: RoleConverter):
         """Afficher les statistiques d'un rôle"""
-        members_with_role = role.members
+        await ctx.defer()
+        await self.role_index(ctx.guild)
+        member_count = self.role_count(ctx.guild, role)
+        # The index only keeps counts: the first holders are found in the member cache, chunked by role_index
+        members_with_role = list(islice(
+            (member for member in await self.bot.ensure_members(ctx.guild)
+             if role.is_default() or member._roles.has(role.id)), 20
+        ))
         
         embed = discord.Embed(
             title=f"📊 Statistiques du rôle {role.name}",
@@ -295,7 +348,7 @@ class RoleManagement(commands.Cog):
         
         embed.add_field(name="Nom", value=role.name, inline=True)
         embed.add_field(name="ID", value=role.id, inline=True)
-        embed.add_field(name="Membres", value=len(members_with_role), inline=True)
+        embed.add_field(name="Membres", value=member_count, inline=True)
         
         embed.add_field(name="Position", value=role.position, inline=True)
         embed.add_field(name="Couleur", value=str(role.color), inline=True)
@@ -308,12 +361,12 @@ class RoleManagement(commands.Cog):
         # Liste des membres (limité à 20 pour éviter les messages trop longs)
         if members_with_role:
             member_list = []
-            for i, member in enumerate(members_with_role[:20]):
+            for i, member in enumerate(members_with_role):
                 member_list.append(f"{i+1}. {member.mention}")
             
             members_text = "\n".join(member_list)
-            if len(members_with_role) > 20:
-                members_text += f"\n... et {len(members_with_role) - 20} autres"
+            if member_count > len(members_with_role):
+                members_text += f"\n... et {member_count - len(members_with_role)} autres"
             
             embed.add_field(
                 name="Membres possédant ce rôle",
@@ -328,6 +381,32 @@ class RoleManagement(commands.Cog):
             )
         
         await ctx.send(embed=embed)
+    
+    @commands.hybrid_command(name="roles")
+    @has_permission()
+    async def roles_overview(self, ctx):
+        """Member count of every role in the server"""
+        await ctx.defer()
+        await self.role_index(ctx.guild)
+        
+        pages = [""]
+        for role in reversed(ctx.guild.roles):
+            line = f"{role.mention if not role.is_default() else '@everyone'} — **{self.role_count(ctx.guild, role)}**\n"
+            if len(pages[-1]) + len(line) > ROLES_PAGE_CHARS:
+                pages.append("")
+            pages[-1] += line
+        
+        for number, page in enumerate(pages, 1):
+            embed = discord.Embed(
+                title=f"📊 Rôles de {ctx.guild.name}",
+                description=page,
+                color=self.bot.config.embed_color
+            )
+            footer = f"{len(ctx.guild.roles)} rôles • {ctx.guild.member_count} membres"
+            if len(pages) > 1:
+                footer += f" • Page {number}/{len(pages)}"
+            embed.set_footer(text=footer)
+            await ctx.send(embed=embed, allowed_mentions=discord.AllowedMentions.none())
 
 async def setup(bot):
     await bot.add_cog(RoleManagement(bot))
\ No newline at end of file
@@ -90,7 +90,7 @@ class Triggers(commands.Cog):
         except (discord.NotFound, discord.Forbidden):
             pass
         except Exception as e:
-            print(f"[❌] Erreur protection salon: {e}")
+            self.bot.logger.error(f"Erreur protection salon {message.channel.id}: {e}")
 
     async def handle_auto_reactions(self, message: discord.Message):
         """Ajoute des réactions automatiques sur certains salons"""
@@ -104,7 +104,7 @@ class Triggers(commands.Cog):
             except (discord.NotFound, discord.Forbidden):
                 pass
             except Exception as e:
-                print(f"[❌] Erreur réaction {emoji}: {e}")
+                self.bot.logger.error(f"Erreur réaction {emoji} dans {message.channel.id}: {e}")
 
     async def handle_selfie_embed(self, message: discord.Message):
         """Crée un embed automatique pour les selfies avec règles du serveur"""
@@ -1,3 +1,5 @@
+import os
+
 class Config:
     def __init__(self):
         self.default_prefix = "+"
@@ -18,6 +20,39 @@ class Config:
             'cooldown', 'settings', 'prefix'
         ]
         
+        # Storage backend: SQLite file by default, or a postgresql:// URL shared by several processes
+        self.database_url = os.getenv('DATABASE_URL')
+        # Optional redis:// server sharing the prefix/permission/owner cache between processes
+        self.redis_url = os.getenv('REDIS_URL')
+        
+        # Discord cache sizing: MEMORY_PROFILE=lean skips member chunking at startup
+        self.memory_profile = os.getenv('MEMORY_PROFILE', 'standard')
+        self.memory_profiles = {
+            # discord.py defaults: every member chunked at login, 1000 cached messages
+            'standard': {'chunk_guilds_at_startup': True, 'cache_voice_members': True, 'max_messages': 1000},
+            # Members cached when they join or when a command needs the full list
+            'lean': {'chunk_guilds_at_startup': False, 'cache_voice_members': False, 'max_messages': 100}
+        }
+        
+        # Logging: LOG_FORMAT=json writes one JSON object per line (guild, command, latency...)
+        self.log_level = os.getenv('LOG_LEVEL', 'INFO').upper()
+        self.log_format = os.getenv('LOG_FORMAT', 'text')
+        self.log_max_bytes = int(os.getenv('LOG_MAX_BYTES', 10 * 1024 * 1024))
+        self.log_rotate_hours = float(os.getenv('LOG_ROTATE_HOURS', 24))
+        self.log_backup_count = int(os.getenv('LOG_BACKUP_COUNT', 7))
+        
+        # Event-loop watchdog: lag sampled every interval, stalls above threshold logged with their stack
+        self.watchdog_interval = float(os.getenv('WATCHDOG_INTERVAL', 0.5))
+        self.watchdog_threshold = float(os.getenv('WATCHDOG_THRESHOLD', 0.25))
+        
+        # Memory recording: RSS and cache sizes logged every N minutes, warning above MEMORY_WARN_MB (0 = off)
+        self.memory_record_minutes = float(os.getenv('MEMORY_RECORD_MINUTES', 10))
+        self.memory_warn_mb = int(os.getenv('MEMORY_WARN_MB', 0))
+        
+        # Database maintenance (retention and compaction)
+        self.maintenance_interval_hours = 6
+        self.archive_dir = "archives"
+        
         # Time parsing formats
         self.time_units = {
             's': 1,
@@ -1,1181 +1,1325 @@
-import sqlite3
 import asyncio
-import json
-import time
+import logging
+import datetime
 import secrets
-from typing import List, Optional, Dict, Any
+from typing import Callable, List, Optional, Dict, Any, Sequence, Set, Tuple
+from storage import StorageBackend, SQLiteBackend, CacheLayer
+
+logger = logging.getLogger('chdfz gestion.database')
+
+DEFAULT_COMMAND_PERMISSIONS = {
+    # Perm 1 - Basic moderation
+    'clear': 'perm1',
+    'warn': 'perm1', 
+    'mute': 'perm1',
+    
+    # Perm 2 - Full moderation
+    'kick': 'perm2',
+    'ban': 'perm2',
+    'unban': 'perm2',
+    'unmute': 'perm2',
+    'delwarn': 'perm2',
+    'infractions': 'perm2',
+    'mutelist': 'perm2',
+    'lock': 'perm2',
+    'unlock': 'perm2',
+    'purge': 'perm2',
+    'lockdown': 'perm2',
+    'unlockdown': 'perm2',
+    'massban': 'perm3',
+    'antiraid': 'owner',
+    'antispam': 'owner',
+    'export': 'owner',
+    'retention': 'owner',
+    'cluster': 'owner',
+    'memory': 'owner',
+    'sync': 'owner',
+    'lag': 'owner',
+    'profile': 'owner',
+    'memtrace': 'owner',
+    
+    # Perm 3 - Administration
+    'setperm': 'perm3',
+    'delperm': 'perm3',
+    'clearperm': 'perm3',
+    'change': 'perm3',
+    'changeall': 'perm3',
+    'resetperms': 'perm3',
+    'setcooldown': 'perm3',
+    'settings': 'perm3',
+    'prefix': 'perm3',
+    'addrole': 'perm3',
+    'delrole': 'perm3',
+    'roles': 'perm3',
+    'massrole': 'perm3',
+    
+    # Owners only
+    'say': 'owner',
+    'dm': 'owner',
+    'laisse': 'owner',
+    'unlaisse': 'owner',
+    'wl': 'owner',
+    'unwl': 'owner',
+    'blrank': 'owner',
+    
+    # Buyer only
+    'owner': 'buyer',
+    'unowner': 'buyer',
+    'buyer': 'buyer',
+    
+    # Public commands
+    'help': 'public',
+    'helpall': 'public',
+    'ping': 'public',
+    'perms': 'public'
+}
+
+ANTIRAID_DEFAULTS = {
+    'enabled': 0,
+    'join_threshold': 10,
+    'window_seconds': 10,
+    'young_account_hours': 24,
+    'young_threshold': 5,
+    'action': 'kick',
+    'auto_lockdown': 1
+}
+
+ANTISPAM_DEFAULTS = {
+    'enabled': 0,
+    'message_rate': 6,
+    'per_seconds': 5,
+    'max_mentions': 8,
+    'duplicate_threshold': 4,
+    'mute_seconds': 600
+}
+
+# Levels a command can be assigned to with +change / +changeall / +permimport
+COMMAND_PERMISSION_LEVELS = [f'perm{level}' for level in range(1, 10)] + ['owner', 'buyer', 'public', 'everyone']
+
+# Format of +permexport files, checked by +permimport
+PERMISSION_EXPORT_VERSION = 1
+
+# 0 = no limit. Moderation history is kept forever unless a guild opts in.
+RETENTION_DEFAULTS = {
+    'logs_days': 0,
+    'logs_max_rows': 0,
+    'infractions_days': 0,
+    'infractions_max_rows': 0,
+    'usage_days': 30,
+    'archive': 0
+}
+
+# Tables pruned by the maintenance task and their (age, row count) settings
+RETENTION_TABLES = {
+    'moderation_logs': ('logs_days', 'logs_max_rows'),
+    'infractions': ('infractions_days', 'infractions_max_rows')
+}
+
+# Hot reads served through Database.cache: (kind, key) -> (query on guild_id, single value)
+# `kind` is the invalidation kind published by the methods that write these rows
+CACHED_READS = {
+    ('prefix', 'prefix'): ('SELECT prefix FROM guild_settings WHERE guild_id = ?', True),
+    ('whitelist', 'list'): ('SELECT user_id FROM whitelist WHERE guild_id = ?', False),
+    ('permissions', 'commands'): ('SELECT command_name, permission_level FROM command_permissions WHERE guild_id = ?', False),
+    ('permissions', 'specific'): ('SELECT command_name, role_id, user_id FROM command_specific_permissions WHERE guild_id = ?', False),
+    ('permissions', 'levels'): ('SELECT level, role_id, user_id FROM permission_levels WHERE guild_id = ? ORDER BY level', False),
+    ('cooldowns', 'commands'): ('SELECT command_name, cooldown_seconds FROM command_cooldowns WHERE guild_id = ?', False)
+}
+
+def _utc_text(days_ago: int = 0) -> str:
+    """UTC time in the 'YYYY-MM-DD HH:MM:SS' format used by every timestamp column"""
+    moment = datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(days=days_ago)
+    return moment.strftime('%Y-%m-%d %H:%M:%S')
+
+def _import_id(value: Any) -> Optional[int]:
+    """Discord ID from a +permimport document: an integer or a string of digits"""
+    if value is None or value == '':
+        return None
+    if isinstance(value, bool) or not isinstance(value, (int, str)) or not str(value).strip().isdigit():
+        raise ValueError(f"identifiant invalide : {value!r}")
+    return int(value)
 
 class Database:
-    def __init__(self, db_path: str = "crowbot.db"):
+    """Data access for the bot, independent of the storage engine
+    
+    Queries are written once in SQL understood by both SQLite and PostgreSQL
+    (`?` parameters, ON CONFLICT upserts) and run through a StorageBackend.
+    """
+    
+    def __init__(self, db_path: str = "crowbot.db", backend: Optional[StorageBackend] = None, cache: Optional[CacheLayer] = None):
         self.db_path = db_path
-        self._lock = asyncio.Lock()
+        self.backend = backend or SQLiteBackend(db_path)
+        # Local LRU for prefix/permission lookups, optionally backed by a shared Redis
+        self.cache = cache or CacheLayer()
+        # In-memory whitelist sets, kept in sync by add_whitelist/remove_whitelist
+        self._whitelist_cache: Dict[int, Set[int]] = {}
+        self._whitelist_loaded = False
+        # In-memory blacklist-rank sets, kept in sync by add_blacklist_rank/remove_blacklist_rank
+        self._blacklist_cache: Dict[int, Set[int]] = {}
+        self._blacklist_loaded = False
+        # Buyer and owner set per guild, answered from memory by every ownership check
+        self._buyers: Dict[int, int] = {}
+        self._owners: Dict[int, Set[int]] = {}
+        self._ownership_loaded = False
+        # Guilds changed by another process, reloaded on next lookup
+        self._stale_ownership: Set[int] = set()
+        # Called with (kind, guild_id) after writes to state other processes may cache
+        self.invalidation_hook: Optional[Callable[[str, Optional[int]], None]] = None
+        # Called with (kind, guild_id) once a change published on the shared cache has been applied
+        self.remote_invalidation_hook: Optional[Callable[[str, Optional[int]], None]] = None
+        self._remote_invalidation_tasks: Set[asyncio.Task] = set()
+        # Bumped on every change to a guild's permissions, locally or in another process
+        self._permission_versions: Dict[int, int] = {}
+        self.cache.on_invalidate = self._on_remote_invalidation
+        # Guilds known to have their command permissions, so command checks never ask again
+        self.initialized_guilds: Set[int] = set()
     
     async def initialize(self):
         """Initialize the database with required tables"""
-        async with self._lock:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            # Guild settings table
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS guild_settings (
-                    guild_id INTEGER PRIMARY KEY,
-                    prefix TEXT DEFAULT '+',
-                    log_channel_id INTEGER,
-                    mute_role_id INTEGER,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            ''')
-            
-            # Permission levels table (perm 1-9)
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS permission_levels (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    guild_id INTEGER,
-                    level INTEGER,
-                    level_name TEXT,
-                    role_id INTEGER,
-                    user_id INTEGER,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    UNIQUE(guild_id, level, role_id),
-                    UNIQUE(guild_id, level, user_id)
-                )
-            ''')
-            
-            # Command permissions table - now maps commands to permission levels
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS command_permissions (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    guild_id INTEGER,
-                    command_name TEXT,
-                    permission_level TEXT,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    UNIQUE(guild_id, command_name)
-                )
-            ''')
-            
-            # Command-specific permissions (for individual roles/users)
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS command_specific_permissions (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    guild_id INTEGER,
-                    command_name TEXT,
-                    role_id INTEGER,
-                    user_id INTEGER,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    UNIQUE(guild_id, command_name, role_id),
-                    UNIQUE(guild_id, command_name, user_id)
-                )
-            ''')
-            
-            # Command cooldowns table
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS command_cooldowns (
-                    guild_id INTEGER,
-                    command_name TEXT,
-                    cooldown_seconds INTEGER,
-                    PRIMARY KEY(guild_id, command_name)
-                )
-            ''')
-            
-            # Command usage tracking
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS command_usage (
-                    guild_id INTEGER,
-                    user_id INTEGER,
-                    command_name TEXT,
-                    last_used TIMESTAMP,
-                    PRIMARY KEY(guild_id, user_id, command_name)
-                )
-            ''')
-            
-            # Infractions table
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS infractions (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    guild_id INTEGER,
-                    user_id INTEGER,
-                    moderator_id INTEGER,
-                    infraction_type TEXT,
-                    reason TEXT,
-                    duration INTEGER,
-                    active BOOLEAN DEFAULT 1,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            ''')
-            
-            # Muted users table
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS muted_users (
-                    guild_id INTEGER,
-                    user_id INTEGER,
-                    muted_until TIMESTAMP,
-                    reason TEXT,
-                    moderator_id INTEGER,
-                    PRIMARY KEY(guild_id, user_id)
-                )
-            ''')
-            
-            # Moderation logs
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS moderation_logs (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    guild_id INTEGER,
-                    user_id INTEGER,
-                    moderator_id INTEGER,
-                    action TEXT,
-                    reason TEXT,
-                    details TEXT,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            ''')
-            
-            # Bot ownership tables
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS bot_ownership (
-                    guild_id INTEGER PRIMARY KEY,
-                    buyer_id INTEGER,
-                    recovery_code TEXT,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            ''')
-            
-            # Owners table
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS owners (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    guild_id INTEGER,
-                    user_id INTEGER,
-                    added_by INTEGER,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    UNIQUE(guild_id, user_id)
-                )
-            ''')
-            
-            # Whitelist table
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS whitelist (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    guild_id INTEGER,
-                    user_id INTEGER,
-                    added_by INTEGER,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    UNIQUE(guild_id, user_id)
-                )
-            ''')
-            
-            # Blacklist rank table
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS blacklist_rank (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    guild_id INTEGER,
-                    user_id INTEGER,
-                    added_by INTEGER,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    UNIQUE(guild_id, user_id)
-                )
-            ''')
-            
-            # Leash system table
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS leash_system (
-                    guild_id INTEGER,
-                    user_id INTEGER,
-                    owner_id INTEGER,
-                    original_nick TEXT,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    PRIMARY KEY(guild_id, user_id)
-                )
-            ''')
-            
-            conn.commit()
-            conn.close()
+        await self.backend.connect()
+        await self.backend.create_schema()
+        await self.cache.start()
+    
+    async def close(self):
+        for task in self._remote_invalidation_tasks:
+            task.cancel()
+        await asyncio.gather(*self._remote_invalidation_tasks, return_exceptions=True)
+        await self.cache.close()
+        await self.backend.close()
+    
+    async def _invalidate(self, kind: str, guild_id: Optional[int]):
+        if kind == 'permissions':
+            self._bump_permission_version(guild_id)
+        await self.cache.invalidate(kind, guild_id)
+        if self.invalidation_hook is not None:
+            self.invalidation_hook(kind, guild_id)
+    
+    def _on_remote_invalidation(self, kind: str, guild_id: Optional[int]):
+        # Same dispatch as cluster messages, so both buses refresh every in-memory copy
+        task = asyncio.create_task(
+            self._apply_remote_invalidation(kind, guild_id), name=f"invalidate:{kind}:{guild_id}"
+        )
+        self._remote_invalidation_tasks.add(task)
+        task.add_done_callback(self._remote_invalidation_done)
+    
+    async def _apply_remote_invalidation(self, kind: str, guild_id: Optional[int]):
+        await self.apply_invalidation(kind, guild_id)
+        if self.remote_invalidation_hook is not None:
+            self.remote_invalidation_hook(kind, guild_id)
+    
+    def _remote_invalidation_done(self, task: asyncio.Task):
+        self._remote_invalidation_tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning(f"Failed to apply remote invalidation {task.get_name()} ({task.exception()!r})")
+    
+    def _bump_permission_version(self, guild_id: int):
+        self._permission_versions[guild_id] = self._permission_versions.get(guild_id, 0) + 1
+    
+    def get_permission_version(self, guild_id: int) -> int:
+        """Version of a guild's permission configuration, for caches of derived data"""
+        return self._permission_versions.get(guild_id, 0)
+    
+    def _cached_read(self, kind: str, key: str, guild_id: int):
+        """Cache request for one of CACHED_READS"""
+        query, single = CACHED_READS[(kind, key)]
+        
+        async def loader():
+            if single:
+                result = await self.backend.fetchone(query, (guild_id,))
+                return result[0] if result else None
+            return [list(row) for row in await self.backend.fetchall(query, (guild_id,))]
+        
+        return (kind, guild_id, key, loader)
+    
+    async def _cached(self, kind: str, key: str, guild_id: int) -> Any:
+        return (await self.cache.get_many([self._cached_read(kind, key, guild_id)]))[0]
+    
+    async def prefetch_command_state(self, guild_id: int):
+        """Warm every lookup made by a command check in one round trip to the cache server"""
+        await self.cache.get_many([
+            self._cached_read(kind, key, guild_id)
+            for kind, key in CACHED_READS
+            if kind in ('permissions', 'cooldowns')
+        ])
+    
+    async def apply_invalidation(self, kind: str, guild_id: Optional[int]):
+        """Drop local caches after another process changed `kind` for a guild"""
+        self.cache.drop(kind, guild_id)
+        if kind == 'permissions':
+            self._bump_permission_version(guild_id)
+        if kind == 'owners' and guild_id is not None:
+            self._stale_ownership.add(guild_id)
+        if kind == 'whitelist' and guild_id is not None:
+            if self._whitelist_loaded:
+                self._whitelist_cache[guild_id] = set(await self.get_whitelist(guild_id))
+            else:
+                self._whitelist_cache.pop(guild_id, None)
+        if kind == 'blacklist' and guild_id is not None:
+            if self._blacklist_loaded:
+                self._blacklist_cache[guild_id] = set(await self._fetch_blacklist_rank(guild_id))
+            else:
+                self._blacklist_cache.pop(guild_id, None)
     
     # Extensions from database_extensions.py
     # Bot Ownership methods
     async def set_buyer(self, guild_id: int, buyer_id: int) -> str:
         """Set the buyer/owner of the bot for a guild and generate recovery code"""
         recovery_code = secrets.token_hex(16)
-        async with self._lock:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                INSERT OR REPLACE INTO bot_ownership (guild_id, buyer_id, recovery_code)
-                VALUES (?, ?, ?)
-            ''', (guild_id, buyer_id, recovery_code))
-            
-            conn.commit()
-            conn.close()
-            
+        await self.backend.execute('''
+            INSERT INTO bot_ownership (guild_id, buyer_id, recovery_code)
+            VALUES (?, ?, ?)
+            ON CONFLICT (guild_id) DO UPDATE SET buyer_id = excluded.buyer_id, recovery_code = excluded.recovery_code
+        ''', (guild_id, buyer_id, recovery_code))
+        
+        if self._ownership_loaded or guild_id in self._owners:
+            self._buyers[guild_id] = buyer_id
+        
+        await self._invalidate('owners', guild_id)
         return recovery_code
     
     async def get_buyer(self, guild_id: int) -> Optional[int]:
         """Get the buyer ID for a guild"""
-        async with self._lock:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                SELECT buyer_id FROM bot_ownership WHERE guild_id = ?
-            ''', (guild_id,))
-            
-            result = cursor.fetchone()
-            conn.close()
-            
-            return result[0] if result else None
+        buyer, _ = await self.get_ownership(guild_id)
+        return buyer
     
     async def verify_recovery_code(self, guild_id: int, code: str) -> bool:
         """Verify recovery code for buyer transfer"""
-        async with self._lock:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                SELECT recovery_code FROM bot_ownership WHERE guild_id = ?
-            ''', (guild_id,))
-            
-            result = cursor.fetchone()
-            conn.close()
-            
-            return result and result[0] == code
+        result = await self.backend.fetchone('''
+            SELECT recovery_code FROM bot_ownership WHERE guild_id = ?
+        ''', (guild_id,))
+        
+        return result and result[0] == code
     
     # Owners methods
     async def add_owner(self, guild_id: int, user_id: int, added_by: int):
         """Add an owner"""
-        async with self._lock:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                INSERT OR IGNORE INTO owners (guild_id, user_id, added_by)
-                VALUES (?, ?, ?)
-            ''', (guild_id, user_id, added_by))
-            
-            conn.commit()
-            conn.close()
+        await self.backend.execute('''
+            INSERT INTO owners (guild_id, user_id, added_by)
+            VALUES (?, ?, ?)
+            ON CONFLICT DO NOTHING
+        ''', (guild_id, user_id, added_by))
+        
+        if self._ownership_loaded or guild_id in self._owners:
+            self._owners.setdefault(guild_id, set()).add(user_id)
+        
+        await self._invalidate('owners', guild_id)
     
     async def remove_owner(self, guild_id: int, user_id: int):
         """Remove an owner"""
-        async with self._lock:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                DELETE FROM owners WHERE guild_id = ? AND user_id = ?
-            ''', (guild_id, user_id))
-            
-            conn.commit()
-            conn.close()
+        await self.backend.execute('''
+            DELETE FROM owners WHERE guild_id = ? AND user_id = ?
+        ''', (guild_id, user_id))
+        
+        self._owners.get(guild_id, set()).discard(user_id)
+        
+        await self._invalidate('owners', guild_id)
     
     async def is_owner(self, guild_id: int, user_id: int) -> bool:
         """Check if user is an owner"""
-        async with self._lock:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                SELECT 1 FROM owners WHERE guild_id = ? AND user_id = ?
-            ''', (guild_id, user_id))
-            
-            result = cursor.fetchone()
-            conn.close()
-            
-            return bool(result)
+        _, owners = await self.get_ownership(guild_id)
+        return user_id in owners
     
     async def get_owners(self, guild_id: int) -> List[int]:
         """Get all owners for a guild"""
-        async with self._lock:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                SELECT user_id FROM owners WHERE guild_id = ?
-            ''', (guild_id,))
-            
-            results = cursor.fetchall()
-            conn.close()
-            
-            return [result[0] for result in results]
+        _, owners = await self.get_ownership(guild_id)
+        return list(owners)
+    
+    async def load_ownership_cache(self):
+        """Load every buyer and owner into memory in two queries"""
+        buyers = await self.backend.fetchall('SELECT guild_id, buyer_id FROM bot_ownership WHERE buyer_id IS NOT NULL')
+        owners = await self.backend.fetchall('SELECT guild_id, user_id FROM owners')
+        
+        owner_sets: Dict[int, Set[int]] = {}
+        for guild_id, user_id in owners:
+            owner_sets.setdefault(guild_id, set()).add(user_id)
+        
+        self._buyers = {guild_id: buyer_id for guild_id, buyer_id in buyers}
+        self._owners = owner_sets
+        self._stale_ownership.clear()
+        self._ownership_loaded = True
+    
+    async def _load_guild_ownership(self, guild_id: int):
+        buyer = await self.backend.fetchone('SELECT buyer_id FROM bot_ownership WHERE guild_id = ?', (guild_id,))
+        owners = await self.backend.fetchall('SELECT user_id FROM owners WHERE guild_id = ?', (guild_id,))
+        
+        self._stale_ownership.discard(guild_id)
+        if buyer and buyer[0] is not None:
+            self._buyers[guild_id] = buyer[0]
+        else:
+            self._buyers.pop(guild_id, None)
+        self._owners[guild_id] = {row[0] for row in owners}
+    
+    async def get_ownership(self, guild_id: int) -> Tuple[Optional[int], Set[int]]:
+        """Buyer and owner set of a guild, from memory (loaded on first use)"""
+        if guild_id in self._stale_ownership or not (self._ownership_loaded or guild_id in self._owners):
+            await self._load_guild_ownership(guild_id)
+        return self._buyers.get(guild_id), self._owners.get(guild_id, set())
     
     # Whitelist methods
     async def add_whitelist(self, guild_id: int, user_id: int, added_by: int):
         """Add user to whitelist"""
-        async with self._lock:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                INSERT OR IGNORE INTO whitelist (guild_id, user_id, added_by)
-                VALUES (?, ?, ?)
-            ''', (guild_id, user_id, added_by))
-            
-            conn.commit()
-            conn.close()
+        await self.backend.execute('''
+            INSERT INTO whitelist (guild_id, user_id, added_by)
+            VALUES (?, ?, ?)
+            ON CONFLICT DO NOTHING
+        ''', (guild_id, user_id, added_by))
+        
+        if self._whitelist_loaded or guild_id in self._whitelist_cache:
+            self._whitelist_cache.setdefault(guild_id, set()).add(user_id)
+        
+        await self._invalidate('whitelist', guild_id)
     
     async def remove_whitelist(self, guild_id: int, user_id: int):
         """Remove user from whitelist"""
-        async with self._lock:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                DELETE FROM whitelist WHERE guild_id = ? AND user_id = ?
-            ''', (guild_id, user_id))
-            
-            conn.commit()
-            conn.close()
+        await self.backend.execute('''
+            DELETE FROM whitelist WHERE guild_id = ? AND user_id = ?
+        ''', (guild_id, user_id))
+        
+        self._whitelist_cache.get(guild_id, set()).discard(user_id)
+        
+        await self._invalidate('whitelist', guild_id)
     
     async def is_whitelisted(self, guild_id: int, user_id: int) -> bool:
         """Check if user is whitelisted"""
-        async with self._lock:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                SELECT 1 FROM whitelist WHERE guild_id = ? AND user_id = ?
-            ''', (guild_id, user_id))
-            
-            result = cursor.fetchone()
-            conn.close()
-            
-            return bool(result)
+        return user_id in await self.get_whitelist(guild_id)
     
     async def get_whitelist(self, guild_id: int) -> List[int]:
         """Get all whitelisted users"""
-        async with self._lock:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                SELECT user_id FROM whitelist WHERE guild_id = ?
-            ''', (guild_id,))
-            
-            results = cursor.fetchall()
-            conn.close()
-            
-            return [result[0] for result in results]
+        results = await self._cached('whitelist', 'list', guild_id)
+        
+        return [result[0] for result in results]
+    
+    async def load_whitelist_cache(self):
+        """Load every whitelist into memory in a single query"""
+        results = await self.backend.fetchall('SELECT guild_id, user_id FROM whitelist')
+        
+        cache: Dict[int, Set[int]] = {}
+        for guild_id, user_id in results:
+            cache.setdefault(guild_id, set()).add(user_id)
+        
+        self._whitelist_cache = cache
+        self._whitelist_loaded = True
+    
+    async def get_whitelist_set(self, guild_id: int) -> Set[int]:
+        """Get the in-memory whitelist set for a guild (loaded on first use)"""
+        cached = self._whitelist_cache.get(guild_id)
+        if cached is not None:
+            return cached
+        if self._whitelist_loaded:
+            return set()
+        
+        cached = set(await self.get_whitelist(guild_id))
+        self._whitelist_cache[guild_id] = cached
+        return cached
     
     # Blacklist rank methods
     async def add_blacklist_rank(self, guild_id: int, user_id: int, added_by: int):
         """Add user to blacklist rank"""
-        async with self._lock:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                INSERT OR IGNORE INTO blacklist_rank (guild_id, user_id, added_by)
-                VALUES (?, ?, ?)
-            ''', (guild_id, user_id, added_by))
-            
-            conn.commit()
-            conn.close()
+        await self.backend.execute('''
+            INSERT INTO blacklist_rank (guild_id, user_id, added_by)
+            VALUES (?, ?, ?)
+            ON CONFLICT DO NOTHING
+        ''', (guild_id, user_id, added_by))
+        
+        if self._blacklist_loaded or guild_id in self._blacklist_cache:
+            self._blacklist_cache.setdefault(guild_id, set()).add(user_id)
+        
+        await self._invalidate('blacklist', guild_id)
     
     async def remove_blacklist_rank(self, guild_id: int, user_id: int):
         """Remove user from blacklist rank"""
-        async with self._lock:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                DELETE FROM blacklist_rank WHERE guild_id = ? AND user_id = ?
-            ''', (guild_id, user_id))
-            
-            conn.commit()
-            conn.close()
+        await self.backend.execute('''
+            DELETE FROM blacklist_rank WHERE guild_id = ? AND user_id = ?
+        ''', (guild_id, user_id))
+        
+        self._blacklist_cache.get(guild_id, set()).discard(user_id)
+        
+        await self._invalidate('blacklist', guild_id)
     
     async def is_blacklist_rank(self, guild_id: int, user_id: int) -> bool:
         """Check if user is in blacklist rank"""
-        async with self._lock:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                SELECT 1 FROM blacklist_rank WHERE guild_id = ? AND user_id = ?
-            ''', (guild_id, user_id))
-            
-            result = cursor.fetchone()
-            conn.close()
-            
-            return bool(result)
+        return user_id in await self.get_blacklist_rank_set(guild_id)
     
     async def get_blacklist_rank(self, guild_id: int) -> List[int]:
         """Get all blacklisted rank users"""
-        async with self._lock:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                SELECT user_id FROM blacklist_rank WHERE guild_id = ?
-            ''', (guild_id,))
-            
-            results = cursor.fetchall()
-            conn.close()
-            
-            return [result[0] for result in results]
+        return list(await self.get_blacklist_rank_set(guild_id))
+    
+    async def _fetch_blacklist_rank(self, guild_id: int) -> List[int]:
+        results = await self.backend.fetchall('''
+            SELECT user_id FROM blacklist_rank WHERE guild_id = ?
+        ''', (guild_id,))
+        
+        return [result[0] for result in results]
+    
+    async def load_blacklist_cache(self):
+        """Load every blacklist-rank into memory in a single query"""
+        results = await self.backend.fetchall('SELECT guild_id, user_id FROM blacklist_rank')
+        
+        cache: Dict[int, Set[int]] = {}
+        for guild_id, user_id in results:
+            cache.setdefault(guild_id, set()).add(user_id)
+        
+        self._blacklist_cache = cache
+        self._blacklist_loaded = True
+    
+    async def get_blacklist_rank_set(self, guild_id: int) -> Set[int]:
+        """Get the in-memory blacklist-rank set for a guild (loaded on first use)"""
+        cached = self._blacklist_cache.get(guild_id)
+        if cached is not None:
+            return cached
+        if self._blacklist_loaded:
+            return set()
+        
+        cached = set(await self._fetch_blacklist_rank(guild_id))
+        self._blacklist_cache[guild_id] = cached
+        return cached
     
     # Leash system methods
     async def add_leash(self, guild_id: int, user_id: int, owner_id: int, original_nick: str):
         """Put user on leash"""
-        async with self._lock:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                INSERT OR REPLACE INTO leash_system (guild_id, user_id, owner_id, original_nick)
-                VALUES (?, ?, ?, ?)
-            ''', (guild_id, user_id, owner_id, original_nick))
-            
-            conn.commit()
-            conn.close()
+        await self.backend.execute('''
+            INSERT INTO leash_system (guild_id, user_id, owner_id, original_nick)
+            VALUES (?, ?, ?, ?)
+            ON CONFLICT (guild_id, user_id) DO UPDATE SET owner_id = excluded.owner_id, original_nick = excluded.original_nick
+        ''', (guild_id, user_id, owner_id, original_nick))
+        
+        await self._invalidate('leashes', guild_id)
     
     async def remove_leash(self, guild_id: int, user_id: int):
         """Remove user from leash"""
-        async with self._lock:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                DELETE FROM leash_system WHERE guild_id = ? AND user_id = ?
-            ''', (guild_id, user_id))
-            
-            conn.commit()
-            conn.close()
+        await self.backend.execute('''
+            DELETE FROM leash_system WHERE guild_id = ? AND user_id = ?
+        ''', (guild_id, user_id))
+        
+        await self._invalidate('leashes', guild_id)
     
     async def get_leash_info(self, guild_id: int, user_id: int) -> Optional[Dict[str, Any]]:
         """Get leash info for user"""
-        async with self._lock:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                SELECT owner_id, original_nick FROM leash_system 
-                WHERE guild_id = ? AND user_id = ?
-            ''', (guild_id, user_id))
-            
-            result = cursor.fetchone()
-            conn.close()
-            
-            if result:
-                return {
-                    'owner_id': result[0],
-                    'original_nick': result[1]
-                }
-            return None
+        result = await self.backend.fetchone('''
+            SELECT owner_id, original_nick FROM leash_system
+            WHERE guild_id = ? AND user_id = ?
+        ''', (guild_id, user_id))
+        
+        if result:
+            return {
+                'owner_id': result[0],
+                'original_nick': result[1]
+            }
+        return None
     
     async def is_leashed(self, guild_id: int, user_id: int) -> bool:
         """Check if user is leashed"""
-        async with self._lock:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                SELECT 1 FROM leash_system WHERE guild_id = ? AND user_id = ?
-            ''', (guild_id, user_id))
-            
-            result = cursor.fetchone()
-            conn.close()
-            
-            return bool(result)
+        result = await self.backend.fetchone('''
+            SELECT 1 FROM leash_system WHERE guild_id = ? AND user_id = ?
+        ''', (guild_id, user_id))
+        
+        return bool(result)
     
     async def setup_guild(self, guild_id: int):
         """Setup a new guild in the database"""
-        async with self._lock:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                INSERT OR IGNORE INTO guild_settings (guild_id) VALUES (?)
-            ''', (guild_id,))
-            
-            conn.commit()
-            conn.close()
+        await self.backend.execute('''
+            INSERT INTO guild_settings (guild_id) VALUES (?)
+            ON CONFLICT DO NOTHING
+        ''', (guild_id,))
     
     # Guild settings methods
     async def get_guild_prefix(self, guild_id: int) -> Optional[str]:
         """Get the prefix for a guild"""
-        async with self._lock:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                SELECT prefix FROM guild_settings WHERE guild_id = ?
-            ''', (guild_id,))
-            
-            result = cursor.fetchone()
-            conn.close()
-            
-            return result[0] if result else None
+        return await self._cached('prefix', 'prefix', guild_id)
     
     async def set_guild_prefix(self, guild_id: int, prefix: str):
         """Set the prefix for a guild"""
-        async with self._lock:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                INSERT OR REPLACE INTO guild_settings (guild_id, prefix) VALUES (?, ?)
-            ''', (guild_id, prefix))
-            
-            conn.commit()
-            conn.close()
+        await self.backend.execute('''
+            INSERT INTO guild_settings (guild_id, prefix) VALUES (?, ?)
+            ON CONFLICT (guild_id) DO UPDATE SET prefix = excluded.prefix
+        ''', (guild_id, prefix))
+        
+        await self._invalidate('prefix', guild_id)
     
     # Permission Level methods
     async def set_permission_level(self, guild_id: int, level: int, role_id: Optional[int] = None, user_id: Optional[int] = None):
         """Set a role or user to a permission level"""
         level_name = f"perm{level}"
-        async with self._lock:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            if role_id:
-                cursor.execute('''
-                    INSERT OR REPLACE INTO permission_levels (guild_id, level, level_name, role_id) 
-                    VALUES (?, ?, ?, ?)
-                ''', (guild_id, level, level_name, role_id))
-            elif user_id:
-                cursor.execute('''
-                    INSERT OR REPLACE INTO permission_levels (guild_id, level, level_name, user_id) 
-                    VALUES (?, ?, ?, ?)
-                ''', (guild_id, level, level_name, user_id))
-            
-            conn.commit()
-            conn.close()
+        if role_id:
+            await self.backend.execute('''
+                INSERT INTO permission_levels (guild_id, level, level_name, role_id)
+                VALUES (?, ?, ?, ?)
+                ON CONFLICT (guild_id, level, role_id) DO UPDATE SET level_name = excluded.level_name
+            ''', (guild_id, level, level_name, role_id))
+        elif user_id:
+            await self.backend.execute('''
+                INSERT INTO permission_levels (guild_id, level, level_name, user_id)
+                VALUES (?, ?, ?, ?)
+                ON CONFLICT (guild_id, level, user_id) DO UPDATE SET level_name = excluded.level_name
+            ''', (guild_id, level, level_name, user_id))
+        
+        await self._invalidate('permissions', guild_id)
     
     async def remove_permission_level(self, guild_id: int, level: int, role_id: Optional[int] = None, user_id: Optional[int] = None):
         """Remove a role or user from a permission level"""
-        async with self._lock:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            if role_id:
-                cursor.execute('''
-                    DELETE FROM permission_levels 
-                    WHERE guild_id = ? AND level = ? AND role_id = ?
-                ''', (guild_id, level, role_id))
-            elif user_id:
-                cursor.execute('''
-                    DELETE FROM permission_levels 
-                    WHERE guild_id = ? AND level = ? AND user_id = ?
-                ''', (guild_id, level, user_id))
-            
-            conn.commit()
-            conn.close()
+        if role_id:
+            await self.backend.execute('''
+                DELETE FROM permission_levels
+                WHERE guild_id = ? AND level = ? AND role_id = ?
+            ''', (guild_id, level, role_id))
+        elif user_id:
+            await self.backend.execute('''
+                DELETE FROM permission_levels
+                WHERE guild_id = ? AND level = ? AND user_id = ?
+            ''', (guild_id, level, user_id))
+        
+        await self._invalidate('permissions', guild_id)
     
     async def get_permission_levels(self, guild_id: int) -> Dict[int, Dict]:
         """Get all permission levels for a guild"""
-        async with self._lock:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                SELECT level, role_id, user_id FROM permission_levels 
-                WHERE guild_id = ?
-                ORDER BY level
-            ''', (guild_id,))
-            
-            results = cursor.fetchall()
-            conn.close()
-            
-            levels = {}
-            for level, role_id, user_id in results:
-                if level not in levels:
-                    levels[level] = {'roles': [], 'users': []}
-                if role_id:
-                    levels[level]['roles'].append(role_id)
-                if user_id:
-                    levels[level]['users'].append(user_id)
-            
-            return levels
+        results = await self._cached('permissions', 'levels', guild_id)
+        
+        levels = {}
+        for level, role_id, user_id in results:
+            if level not in levels:
+                levels[level] = {'roles': [], 'users': []}
+            if role_id:
+                levels[level]['roles'].append(role_id)
+            if user_id:
+                levels[level]['users'].append(user_id)
+        
+        return levels
     
     async def set_command_permission(self, guild_id: int, command_name: str, permission_level: str):
         """Set command to a permission level"""
-        async with self._lock:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                INSERT OR REPLACE INTO command_permissions (guild_id, command_name, permission_level) 
-                VALUES (?, ?, ?)
-            ''', (guild_id, command_name, permission_level))
-            
-            conn.commit()
-            conn.close()
+        await self.backend.execute('''
+            INSERT INTO command_permissions (guild_id, command_name, permission_level)
+            VALUES (?, ?, ?)
+            ON CONFLICT (guild_id, command_name) DO UPDATE SET permission_level = excluded.permission_level
+        ''', (guild_id, command_name, permission_level))
+        
+        await self._invalidate('permissions', guild_id)
     
     async def set_command_specific_permission(self, guild_id: int, command_name: str, role_id: Optional[int] = None, user_id: Optional[int] = None):
         """Set specific permission for a command to a role or user"""
-        async with self._lock:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            if role_id:
-                cursor.execute('''
-                    INSERT OR REPLACE INTO command_specific_permissions (guild_id, command_name, role_id) 
-                    VALUES (?, ?, ?)
-                ''', (guild_id, command_name, role_id))
-            elif user_id:
-                cursor.execute('''
-                    INSERT OR REPLACE INTO command_specific_permissions (guild_id, command_name, user_id) 
-                    VALUES (?, ?, ?)
-                ''', (guild_id, command_name, user_id))
-            
-            conn.commit()
-            conn.close()
+        if role_id:
+            await self.backend.execute('''
+                INSERT INTO command_specific_permissions (guild_id, command_name, role_id)
+                VALUES (?, ?, ?)
+                ON CONFLICT DO NOTHING
+            ''', (guild_id, command_name, role_id))
+        elif user_id:
+            await self.backend.execute('''
+                INSERT INTO command_specific_permissions (guild_id, command_name, user_id)
+                VALUES (?, ?, ?)
+                ON CONFLICT DO NOTHING
+            ''', (guild_id, command_name, user_id))
+        
+        await self._invalidate('permissions', guild_id)
     
     async def remove_command_specific_permission(self, guild_id: int, command_name: str, role_id: Optional[int] = None, user_id: Optional[int] = None):
         """Remove specific permission for a command from a role or user"""
-        async with self._lock:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            if role_id:
-                cursor.execute('''
-                    DELETE FROM command_specific_permissions 
-                    WHERE guild_id = ? AND command_name = ? AND role_id = ?
-                ''', (guild_id, command_name, role_id))
-            elif user_id:
-                cursor.execute('''
-                    DELETE FROM command_specific_permissions 
-                    WHERE guild_id = ? AND command_name = ? AND user_id = ?
-                ''', (guild_id, command_name, user_id))
-            
-            conn.commit()
-            conn.close()
+        if role_id:
+            await self.backend.execute('''
+                DELETE FROM command_specific_permissions
+                WHERE guild_id = ? AND command_name = ? AND role_id = ?
+            ''', (guild_id, command_name, role_id))
+        elif user_id:
+            await self.backend.execute('''
+                DELETE FROM command_specific_permissions
+                WHERE guild_id = ? AND command_name = ? AND user_id = ?
+            ''', (guild_id, command_name, user_id))
+        
+        await self._invalidate('permissions', guild_id)
     
     async def get_command_permission_level(self, guild_id: int, command_name: str) -> Optional[str]:
         """Get permission level for a command"""
-        async with self._lock:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                SELECT permission_level FROM command_permissions 
-                WHERE guild_id = ? AND command_name = ?
-            ''', (guild_id, command_name))
-            
-            result = cursor.fetchone()
-            conn.close()
-            
-            return result[0] if result else None
+        permissions = await self.get_all_command_permissions(guild_id)
+        
+        return permissions.get(command_name)
     
     async def get_all_command_permissions(self, guild_id: int) -> Dict[str, str]:
         """Get all command permissions for a guild"""
-        async with self._lock:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                SELECT command_name, permission_level FROM command_permissions 
-                WHERE guild_id = ?
-            ''', (guild_id,))
-            
-            results = cursor.fetchall()
-            conn.close()
-            
-            return {command_name: permission_level for command_name, permission_level in results}
+        results = await self._cached('permissions', 'commands', guild_id)
+        
+        return {command_name: permission_level for command_name, permission_level in results}
     
     async def get_command_specific_permissions(self, guild_id: int, command_name: str) -> Dict:
         """Get specific permissions for a command"""
-        async with self._lock:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                SELECT role_id, user_id FROM command_specific_permissions 
-                WHERE guild_id = ? AND command_name = ?
-            ''', (guild_id, command_name))
-            
-            results = cursor.fetchall()
-            conn.close()
-            
-            permissions = {'roles': [], 'users': []}
-            for role_id, user_id in results:
-                if role_id:
-                    permissions['roles'].append(role_id)
-                if user_id:
-                    permissions['users'].append(user_id)
-            
-            return permissions
+        results = await self._cached('permissions', 'specific', guild_id)
+        
+        permissions = {'roles': [], 'users': []}
+        for name, role_id, user_id in results:
+            if name != command_name:
+                continue
+            if role_id:
+                permissions['roles'].append(role_id)
+            if user_id:
+                permissions['users'].append(user_id)
+        
+        return permissions
     
     async def reset_permissions(self, guild_id: int):
         """Reset all permissions for a guild"""
-        async with self._lock:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute('DELETE FROM permission_levels WHERE guild_id = ?', (guild_id,))
-            cursor.execute('DELETE FROM command_permissions WHERE guild_id = ?', (guild_id,))
-            cursor.execute('DELETE FROM command_specific_permissions WHERE guild_id = ?', (guild_id,))
-            
-            conn.commit()
-            conn.close()
-    
-    async def initialize_default_permissions(self, guild_id: int):
-        """Initialize default command permissions"""
-        defaults = {
-            # Perm 1 - Basic moderation
-            'clear': 'perm1',
-            'warn': 'perm1', 
-            'mute': 'perm1',
-            
-            # Perm 2 - Full moderation
-            'kick': 'perm2',
-            'ban': 'perm2',
-            'unban': 'perm2',
-            'unmute': 'perm2',
-            'delwarn': 'perm2',
-            'infractions': 'perm2',
-            'mutelist': 'perm2',
-            'lock': 'perm2',
-            'unlock': 'perm2',
-            
-            # Perm 3 - Administration
-            'setperm': 'perm3',
-            'delperm': 'perm3',
-            'clearperm': 'perm3',
-            'change': 'perm3',
-            'changeall': 'perm3',
-            'resetperms': 'perm3',
-            'setcooldown': 'perm3',
-            'settings': 'perm3',
-            'prefix': 'perm3',
-            'addrole': 'perm3',
-            'delrole': 'perm3',
-            'massrole': 'perm3',
-            
-            # Owners only
-            'say': 'owner',
-            'dm': 'owner',
-            'laisse': 'owner',
-            'unlaisse': 'owner',
-            'wl': 'owner',
-            'unwl': 'owner',
-            'blrank': 'owner',
-            
-            # Buyer only
-            'owner': 'buyer',
-            'unowner': 'buyer',
-            'buyer': 'buyer',
-            
-            # Public commands
-            'help': 'public',
-            'helpall': 'public',
-            'ping': 'public',
-            'perms': 'public'
-        }
+        async with self.backend.transaction() as session:
+            await session.execute('DELETE FROM permission_levels WHERE guild_id = ?', (guild_id,))
+            await session.execute('DELETE FROM command_permissions WHERE guild_id = ?', (guild_id,))
+            await session.execute('DELETE FROM command_specific_permissions WHERE guild_id = ?', (guild_id,))
         
-        async with self._lock:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            for command, perm_level in defaults.items():
-                cursor.execute('''
-                    INSERT OR IGNORE INTO command_permissions (guild_id, command_name, permission_level) 
+        self.initialized_guilds.discard(guild_id)
+        await self._invalidate('permissions', guild_id)
+    
+    async def initialize_default_permissions(self, guild_id: int, defaults: Optional[Dict[str, str]] = None):
+        """Initialize default command permissions (DEFAULT_COMMAND_PERMISSIONS or a template map)"""
+        defaults = DEFAULT_COMMAND_PERMISSIONS if defaults is None else defaults
+        await self.backend.executemany('''
+            INSERT INTO command_permissions (guild_id, command_name, permission_level)
+            VALUES (?, ?, ?)
+            ON CONFLICT DO NOTHING
+        ''', [(guild_id, command, perm_level) for command, perm_level in defaults.items()])
+        
+        self.initialized_guilds.add(guild_id)
+        await self._invalidate('permissions', guild_id)
+    
+    async def bootstrap_guilds(self, guild_ids: Sequence[int], chunk_size: int = 500) -> int:
+        """Create settings and default permissions for every guild that has none
+        
+        Guilds already seen are skipped without a query; the others are checked
+        and initialized in a single transaction. Returns the number initialized.
+        """
+        pending = [guild_id for guild_id in guild_ids if guild_id not in self.initialized_guilds]
+        if not pending:
+            return 0
+        
+        async with self.backend.transaction() as session:
+            existing = set()
+            for start in range(0, len(pending), chunk_size):
+                chunk = pending[start:start + chunk_size]
+                placeholders = ','.join(['?'] * len(chunk))
+                rows = await session.fetchall(f'''
+                    SELECT DISTINCT guild_id FROM command_permissions WHERE guild_id IN ({placeholders})
+                ''', chunk)
+                existing.update(row[0] for row in rows)
+            
+            missing = [guild_id for guild_id in pending if guild_id not in existing]
+            if missing:
+                await session.executemany('''
+                    INSERT INTO guild_settings (guild_id) VALUES (?)
+                    ON CONFLICT DO NOTHING
+                ''', [(guild_id,) for guild_id in missing])
+                await session.executemany('''
+                    INSERT INTO command_permissions (guild_id, command_name, permission_level)
                     VALUES (?, ?, ?)
-                ''', (guild_id, command, perm_level))
-            
-            conn.commit()
-            conn.close()
+                    ON CONFLICT DO NOTHING
+                ''', [
+                    (guild_id, command, perm_level)
+                    for guild_id in missing
+                    for command, perm_level in DEFAULT_COMMAND_PERMISSIONS.items()
+                ])
+        
+        self.initialized_guilds.update(pending)
+        for guild_id in missing:
+            await self._invalidate('permissions', guild_id)
+        return len(missing)
+    
+    async def apply_permission_diff(self, guild_id: int, commands: Optional[Dict[str, str]] = None,
+                                    remove_commands: Sequence[str] = (),
+                                    levels: Sequence[tuple] = (), remove_levels: Sequence[tuple] = (),
+                                    specific: Sequence[tuple] = (), remove_specific: Sequence[tuple] = (),
+                                    replace: bool = False):
+        """Apply a set of permission changes in a single transaction
+        
+        levels are (level, role_id, user_id) and specific grants are
+        (command_name, role_id, user_id), with one of the two ids set.
+        With replace=True the guild's current configuration is wiped first.
+        """
+        if replace and not commands:
+            self.initialized_guilds.discard(guild_id)
+        
+        async with self.backend.transaction() as session:
+            if replace:
+                await session.execute('DELETE FROM permission_levels WHERE guild_id = ?', (guild_id,))
+                await session.execute('DELETE FROM command_permissions WHERE guild_id = ?', (guild_id,))
+                await session.execute('DELETE FROM command_specific_permissions WHERE guild_id = ?', (guild_id,))
+            
+            if remove_commands:
+                await session.executemany('''
+                    DELETE FROM command_permissions WHERE guild_id = ? AND command_name = ?
+                ''', [(guild_id, command) for command in remove_commands])
+            if commands:
+                await session.executemany('''
+                    INSERT INTO command_permissions (guild_id, command_name, permission_level)
+                    VALUES (?, ?, ?)
+                    ON CONFLICT (guild_id, command_name) DO UPDATE SET permission_level = excluded.permission_level
+                ''', [(guild_id, command, level) for command, level in commands.items()])
+            
+            for level, role_id, user_id in remove_levels:
+                column, target = ('role_id', role_id) if role_id else ('user_id', user_id)
+                await session.execute(f'''
+                    DELETE FROM permission_levels WHERE guild_id = ? AND level = ? AND {column} = ?
+                ''', (guild_id, level, target))
+            if levels:
+                await session.executemany('''
+                    INSERT INTO permission_levels (guild_id, level, level_name, role_id, user_id)
+                    VALUES (?, ?, ?, ?, ?)
+                    ON CONFLICT DO NOTHING
+                ''', [(guild_id, level, f"perm{level}", role_id or None, None if role_id else user_id)
+                      for level, role_id, user_id in levels])
+            
+            for command, role_id, user_id in remove_specific:
+                column, target = ('role_id', role_id) if role_id else ('user_id', user_id)
+                await session.execute(f'''
+                    DELETE FROM command_specific_permissions WHERE guild_id = ? AND command_name = ? AND {column} = ?
+                ''', (guild_id, command, target))
+            if specific:
+                await session.executemany('''
+                    INSERT INTO command_specific_permissions (guild_id, command_name, role_id, user_id)
+                    VALUES (?, ?, ?, ?)
+                    ON CONFLICT DO NOTHING
+                ''', [(guild_id, command, role_id or None, None if role_id else user_id)
+                      for command, role_id, user_id in specific])
+        
+        await self._invalidate('permissions', guild_id)
+    
+    async def export_permissions(self, guild_id: int) -> Dict[str, Any]:
+        """Levels, command mappings and specific grants of a guild as JSON-ready data"""
+        levels = await self._cached('permissions', 'levels', guild_id)
+        specific = await self._cached('permissions', 'specific', guild_id)
+        
+        return {
+            'version': PERMISSION_EXPORT_VERSION,
+            'levels': [
+                {'level': level, 'role_id': role_id, 'user_id': user_id}
+                for level, role_id, user_id in levels
+            ],
+            'commands': await self.get_all_command_permissions(guild_id),
+            'specific': [
+                {'command': command, 'role_id': role_id, 'user_id': user_id}
+                for command, role_id, user_id in specific
+            ]
+        }
+    
+    async def import_permissions(self, guild_id: int, data: Dict[str, Any], replace: bool = True):
+        """Apply an export_permissions() document in one transaction
+        
+        Raises ValueError if the document is malformed, before anything is written.
+        """
+        if not isinstance(data, dict) or data.get('version') != PERMISSION_EXPORT_VERSION:
+            raise ValueError("format de fichier inconnu")
+        
+        commands = data.get('commands', {})
+        if not isinstance(commands, dict):
+            raise ValueError("'commands' doit être un objet")
+        for command, level in commands.items():
+            if level not in COMMAND_PERMISSION_LEVELS:
+                raise ValueError(f"niveau invalide pour {command} : {level}")
+        
+        try:
+            levels = [(int(entry['level']), entry.get('role_id'), entry.get('user_id')) for entry in data.get('levels', [])]
+            specific = [(str(entry['command']), entry.get('role_id'), entry.get('user_id')) for entry in data.get('specific', [])]
+        except (KeyError, TypeError, ValueError):
+            raise ValueError("entrée 'levels' ou 'specific' invalide")
+        
+        # Bound as integers: a string ID never matches a stored snowflake (and asyncpg rejects it)
+        levels = [(level, _import_id(role_id), _import_id(user_id)) for level, role_id, user_id in levels]
+        specific = [(command, _import_id(role_id), _import_id(user_id)) for command, role_id, user_id in specific]
+        if any(not 1 <= level <= 9 for level, _, _ in levels):
+            raise ValueError("les niveaux doivent être entre 1 et 9")
+        if any(not role_id and not user_id for _, role_id, user_id in levels + specific):
+            raise ValueError("chaque entrée doit avoir un role_id ou un user_id")
+        
+        await self.apply_permission_diff(guild_id, commands=commands, levels=levels, specific=specific, replace=replace)
     
     # Cooldown methods
     async def set_command_cooldown(self, guild_id: int, command_name: str, cooldown_seconds: int):
         """Set cooldown for a command"""
-        async with self._lock:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                INSERT OR REPLACE INTO command_cooldowns (guild_id, command_name, cooldown_seconds) 
-                VALUES (?, ?, ?)
-            ''', (guild_id, command_name, cooldown_seconds))
-            
-            conn.commit()
-            conn.close()
+        await self.backend.execute('''
+            INSERT INTO command_cooldowns (guild_id, command_name, cooldown_seconds)
+            VALUES (?, ?, ?)
+            ON CONFLICT (guild_id, command_name) DO UPDATE SET cooldown_seconds = excluded.cooldown_seconds
+        ''', (guild_id, command_name, cooldown_seconds))
+        
+        await self._invalidate('cooldowns', guild_id)
     
     async def get_command_cooldown(self, guild_id: int, command_name: str) -> Optional[int]:
         """Get cooldown for a command"""
-        async with self._lock:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                SELECT cooldown_seconds FROM command_cooldowns 
-                WHERE guild_id = ? AND command_name = ?
-            ''', (guild_id, command_name))
-            
-            result = cursor.fetchone()
-            conn.close()
-            
-            return result[0] if result else None
+        results = await self._cached('cooldowns', 'commands', guild_id)
+        
+        return next((seconds for name, seconds in results if name == command_name), None)
     
     async def get_last_command_use(self, guild_id: int, user_id: int, command_name: str) -> Optional[float]:
         """Get last time user used a command"""
-        async with self._lock:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                SELECT last_used FROM command_usage 
-                WHERE guild_id = ? AND user_id = ? AND command_name = ?
-            ''', (guild_id, user_id, command_name))
-            
-            result = cursor.fetchone()
-            conn.close()
-            
-            return result[0] if result else None
+        result = await self.backend.fetchone('''
+            SELECT last_used FROM command_usage
+            WHERE guild_id = ? AND user_id = ? AND command_name = ?
+        ''', (guild_id, user_id, command_name))
+        
+        return result[0] if result else None
     
     async def update_command_usage(self, guild_id: int, user_id: int, command_name: str):
         """Update last usage time for a command"""
-        async with self._lock:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                INSERT OR REPLACE INTO command_usage (guild_id, user_id, command_name, last_used) 
-                VALUES (?, ?, ?, CURRENT_TIMESTAMP)
-            ''', (guild_id, user_id, command_name))
-            
-            conn.commit()
-            conn.close()
+        await self.update_last_command_use(guild_id, user_id, command_name)
     
     # Infraction methods
     async def add_infraction(self, guild_id: int, user_id: int, moderator_id: int, infraction_type: str, reason: str, duration: Optional[int] = None):
         """Add an infraction"""
-        async with self._lock:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute('''
+        await self.backend.execute('''
+            INSERT INTO infractions (guild_id, user_id, moderator_id, infraction_type, reason, duration)
+            VALUES (?, ?, ?, ?, ?, ?)
+        ''', (guild_id, user_id, moderator_id, infraction_type, reason, duration))
+    
+    async def add_infractions_bulk(self, infractions: List[tuple], log_actions: bool = True):
+        """Add many (guild_id, user_id, moderator_id, type, reason, duration) infractions in one transaction
+        
+        With log_actions the matching moderation_logs rows are written in the same transaction.
+        """
+        if not infractions:
+            return
+        
+        async with self.backend.transaction() as session:
+            await session.executemany('''
                 INSERT INTO infractions (guild_id, user_id, moderator_id, infraction_type, reason, duration)
                 VALUES (?, ?, ?, ?, ?, ?)
-            ''', (guild_id, user_id, moderator_id, infraction_type, reason, duration))
-            
-            conn.commit()
-            conn.close()
+            ''', infractions)
+            
+            if log_actions:
+                await session.executemany('''
+                    INSERT INTO moderation_logs (guild_id, user_id, moderator_id, action, reason, details)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                ''', [
+                    (guild_id, user_id, moderator_id, infraction_type, reason or "Aucune raison",
+                     f"Duration: {duration}s" if duration else "")
+                    for guild_id, user_id, moderator_id, infraction_type, reason, duration in infractions
+                ])
     
     async def get_user_infractions(self, guild_id: int, user_id: int) -> List[Dict[str, Any]]:
         """Get all infractions for a user"""
-        async with self._lock:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute('''
+        results = await self.backend.fetchall('''
+            SELECT id, moderator_id, infraction_type, reason, duration, active, created_at
+            FROM infractions
+            WHERE guild_id = ? AND user_id = ?
+            ORDER BY created_at DESC
+        ''', (guild_id, user_id))
+        
+        infractions = []
+        for result in results:
+            infractions.append({
+                'id': result[0],
+                'moderator_id': result[1],
+                'infraction_type': result[2],
+                'reason': result[3],
+                'duration': result[4],
+                'active': result[5],
+                'created_at': result[6]
+            })
+        
+        return infractions
+    
+    async def count_user_infractions(self, guild_id: int, user_id: int) -> int:
+        """Count a user's infractions (index-only scan)"""
+        result = await self.backend.fetchone('''
+            SELECT COUNT(*) FROM infractions WHERE guild_id = ? AND user_id = ?
+        ''', (guild_id, user_id))
+        
+        return result[0]
+    
+    async def get_user_infractions_page(self, guild_id: int, user_id: int, before_id: Optional[int] = None, after_id: Optional[int] = None, limit: int = 10) -> List[Dict[str, Any]]:
+        """Get one page of a user's infractions, newest first
+        
+        Keyset pagination on (guild_id, user_id, id): pass the smallest id of the
+        current page as before_id for the next page, or the largest as after_id
+        for the previous one.
+        """
+        if after_id is not None:
+            results = await self.backend.fetchall('''
                 SELECT id, moderator_id, infraction_type, reason, duration, active, created_at
-                FROM infractions 
-                WHERE guild_id = ? AND user_id = ?
-                ORDER BY created_at DESC
-            ''', (guild_id, user_id))
-            
-            results = cursor.fetchall()
-            conn.close()
-            
-            infractions = []
-            for result in results:
-                infractions.append({
-                    'id': result[0],
-                    'moderator_id': result[1],
-                    'infraction_type': result[2],
-                    'reason': result[3],
-                    'duration': result[4],
-                    'active': result[5],
-                    'created_at': result[6]
-                })
-            
-            return infractions
+                FROM infractions
+                WHERE guild_id = ? AND user_id = ? AND id > ?
+                ORDER BY id ASC LIMIT ?
+            ''', (guild_id, user_id, after_id, limit))
+            results = results[::-1]
+        else:
+            results = await self.backend.fetchall('''
+                SELECT id, moderator_id, infraction_type, reason, duration, active, created_at
+                FROM infractions
+                WHERE guild_id = ? AND user_id = ? AND id < ?
+                ORDER BY id DESC LIMIT ?
+            ''', (guild_id, user_id, before_id if before_id is not None else 2 ** 63 - 1, limit))
+        
+        return [
+            {
+                'id': result[0],
+                'moderator_id': result[1],
+                'infraction_type': result[2],
+                'reason': result[3],
+                'duration': result[4],
+                'active': result[5],
+                'created_at': result[6]
+            }
+            for result in results
+        ]
     
     async def delete_infraction(self, infraction_id: int):
         """Delete an infraction"""
-        async with self._lock:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute('DELETE FROM infractions WHERE id = ?', (infraction_id,))
-            
-            conn.commit()
-            conn.close()
+        await self.backend.execute('DELETE FROM infractions WHERE id = ?', (infraction_id,))
     
     async def deactivate_infraction(self, infraction_id: int):
         """Deactivate an infraction"""
-        async with self._lock:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute('UPDATE infractions SET active = 0 WHERE id = ?', (infraction_id,))
-            
-            conn.commit()
-            conn.close()
+        await self.backend.execute('UPDATE infractions SET active = 0 WHERE id = ?', (infraction_id,))
     
     # Mute methods
     async def add_mute(self, guild_id: int, user_id: int, moderator_id: int, reason: str, muted_until: Optional[str] = None):
         """Add a muted user"""
-        async with self._lock:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                INSERT OR REPLACE INTO muted_users (guild_id, user_id, moderator_id, reason, muted_until)
-                VALUES (?, ?, ?, ?, ?)
-            ''', (guild_id, user_id, moderator_id, reason, muted_until))
-            
-            conn.commit()
-            conn.close()
+        await self.backend.execute('''
+            INSERT INTO muted_users (guild_id, user_id, moderator_id, reason, muted_until)
+            VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT (guild_id, user_id) DO UPDATE SET
+                moderator_id = excluded.moderator_id, reason = excluded.reason, muted_until = excluded.muted_until
+        ''', (guild_id, user_id, moderator_id, reason, muted_until))
     
     async def remove_mute(self, guild_id: int, user_id: int):
         """Remove a muted user"""
-        async with self._lock:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute('DELETE FROM muted_users WHERE guild_id = ? AND user_id = ?', (guild_id, user_id))
-            
-            conn.commit()
-            conn.close()
+        await self.backend.execute('DELETE FROM muted_users WHERE guild_id = ? AND user_id = ?', (guild_id, user_id))
     
     async def is_muted(self, guild_id: int, user_id: int) -> bool:
         """Check if user is muted"""
-        async with self._lock:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                SELECT 1 FROM muted_users WHERE guild_id = ? AND user_id = ?
-            ''', (guild_id, user_id))
-            
-            result = cursor.fetchone()
-            conn.close()
-            
-            return bool(result)
+        result = await self.backend.fetchone('''
+            SELECT 1 FROM muted_users WHERE guild_id = ? AND user_id = ?
+        ''', (guild_id, user_id))
+        
+        return bool(result)
     
     async def get_muted_users(self, guild_id: int) -> List[Dict[str, Any]]:
         """Get all muted users for a guild"""
-        async with self._lock:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                SELECT user_id, moderator_id, reason, muted_until
-                FROM muted_users WHERE guild_id = ?
+        results = await self.backend.fetchall('''
+            SELECT user_id, moderator_id, reason, muted_until
+            FROM muted_users WHERE guild_id = ?
+        ''', (guild_id,))
+        
+        muted_users = []
+        for result in results:
+            muted_users.append({
+                'user_id': result[0],
+                'moderator_id': result[1],
+                'reason': result[2],
+                'muted_until': result[3]
+            })
+        
+        return muted_users
+    
+    # Per-guild settings tables (anti-raid, anti-spam, retention)
+    async def _get_settings(self, table: str, defaults: Dict[str, Any], guild_id: int) -> Dict[str, Any]:
+        result = await self.backend.fetchone(f'''
+            SELECT {', '.join(defaults)} FROM {table} WHERE guild_id = ?
+        ''', (guild_id,))
+        
+        if not result:
+            return dict(defaults)
+        return dict(zip(defaults, result))
+    
+    async def _get_all_settings(self, table: str, defaults: Dict[str, Any]) -> Dict[int, Dict[str, Any]]:
+        results = await self.backend.fetchall(f'''
+            SELECT guild_id, {', '.join(defaults)} FROM {table}
+        ''')
+        
+        return {result[0]: dict(zip(defaults, result[1:])) for result in results}
+    
+    async def _set_setting(self, table: str, guild_id: int, key: str, value: Any):
+        async with self.backend.transaction() as session:
+            await session.execute(f'INSERT INTO {table} (guild_id) VALUES (?) ON CONFLICT DO NOTHING', (guild_id,))
+            await session.execute(f'UPDATE {table} SET {key} = ? WHERE guild_id = ?', (value, guild_id))
+        
+        await self._invalidate(table.replace('_settings', ''), guild_id)
+    
+    # Anti-raid methods
+    async def get_antiraid_settings(self, guild_id: int) -> Dict[str, Any]:
+        """Get anti-raid settings for a guild (defaults if not configured)"""
+        return await self._get_settings('antiraid_settings', ANTIRAID_DEFAULTS, guild_id)
+    
+    async def get_all_antiraid_settings(self) -> Dict[int, Dict[str, Any]]:
+        """Get anti-raid settings for every configured guild"""
+        return await self._get_all_settings('antiraid_settings', ANTIRAID_DEFAULTS)
+    
+    async def set_antiraid_setting(self, guild_id: int, key: str, value: Any):
+        """Set a single anti-raid setting for a guild"""
+        if key not in ANTIRAID_DEFAULTS:
+            raise ValueError(f"Unknown anti-raid setting: {key}")
+        
+        await self._set_setting('antiraid_settings', guild_id, key, value)
+    
+    # Anti-spam methods
+    async def get_antispam_settings(self, guild_id: int) -> Dict[str, Any]:
+        """Get anti-spam settings for a guild (defaults if not configured)"""
+        return await self._get_settings('antispam_settings', ANTISPAM_DEFAULTS, guild_id)
+    
+    async def get_all_antispam_settings(self) -> Dict[int, Dict[str, Any]]:
+        """Get anti-spam settings for every configured guild"""
+        return await self._get_all_settings('antispam_settings', ANTISPAM_DEFAULTS)
+    
+    async def set_antispam_setting(self, guild_id: int, key: str, value: Any):
+        """Set a single anti-spam setting for a guild"""
+        if key not in ANTISPAM_DEFAULTS:
+            raise ValueError(f"Unknown anti-spam setting: {key}")
+        
+        await self._set_setting('antispam_settings', guild_id, key, value)
+    
+    # Lockdown methods
+    async def save_lockdown_snapshots(self, guild_id: int, snapshots: List[tuple]):
+        """Save (channel_id, allow, deny, had_overwrite) snapshots in one transaction
+        
+        Existing snapshots are kept so that locking twice never overwrites the original state.
+        """
+        await self.backend.executemany('''
+            INSERT INTO lockdown_snapshots (guild_id, channel_id, allow_value, deny_value, had_overwrite)
+            VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT DO NOTHING
+        ''', [(guild_id, channel_id, allow, deny, int(had_overwrite)) for channel_id, allow, deny, had_overwrite in snapshots])
+    
+    async def get_lockdown_snapshots(self, guild_id: int, channel_ids: Optional[List[int]] = None) -> List[Dict[str, Any]]:
+        """Get lockdown snapshots for a guild, optionally restricted to some channels"""
+        if channel_ids is not None:
+            if not channel_ids:
+                return []
+            placeholders = ','.join(['?'] * len(channel_ids))
+            results = await self.backend.fetchall(f'''
+                SELECT channel_id, allow_value, deny_value, had_overwrite FROM lockdown_snapshots
+                WHERE guild_id = ? AND channel_id IN ({placeholders})
+            ''', [guild_id] + list(channel_ids))
+        else:
+            results = await self.backend.fetchall('''
+                SELECT channel_id, allow_value, deny_value, had_overwrite FROM lockdown_snapshots
+                WHERE guild_id = ?
             ''', (guild_id,))
-            
-            results = cursor.fetchall()
-            conn.close()
-            
-            muted_users = []
-            for result in results:
-                muted_users.append({
-                    'user_id': result[0],
-                    'moderator_id': result[1],
-                    'reason': result[2],
-                    'muted_until': result[3]
-                })
-            
-            return muted_users
+        
+        return [
+            {
+                'channel_id': result[0],
+                'allow': result[1],
+                'deny': result[2],
+                'had_overwrite': bool(result[3])
+            }
+            for result in results
+        ]
+    
+    async def delete_lockdown_snapshots(self, guild_id: int, channel_ids: List[int]):
+        """Delete restored lockdown snapshots in one transaction"""
+        await self.backend.executemany('''
+            DELETE FROM lockdown_snapshots WHERE guild_id = ? AND channel_id = ?
+        ''', [(guild_id, channel_id) for channel_id in channel_ids])
+    
+    # Retention methods
+    async def get_retention_settings(self, guild_id: int) -> Dict[str, Any]:
+        """Get retention settings for a guild (defaults if not configured)"""
+        return await self._get_settings('retention_settings', RETENTION_DEFAULTS, guild_id)
+    
+    async def get_all_retention_settings(self) -> Dict[int, Dict[str, Any]]:
+        """Get retention settings for every configured guild"""
+        return await self._get_all_settings('retention_settings', RETENTION_DEFAULTS)
+    
+    async def set_retention_setting(self, guild_id: int, key: str, value: Any):
+        """Set a single retention setting for a guild"""
+        if key not in RETENTION_DEFAULTS:
+            raise ValueError(f"Unknown retention setting: {key}")
+        
+        await self._set_setting('retention_settings', guild_id, key, value)
+    
+    async def get_retention_cutoff_id(self, table: str, guild_id: int, keep_rows: int) -> Optional[int]:
+        """Get the newest id beyond the `keep_rows` most recent rows of a guild, if any"""
+        if table not in RETENTION_TABLES:
+            raise ValueError(f"Unknown retention table: {table}")
+        
+        result = await self.backend.fetchone(f'''
+            SELECT id FROM {table} WHERE guild_id = ?
+            ORDER BY id DESC LIMIT 1 OFFSET ?
+        ''', (guild_id, keep_rows))
+        
+        return result[0] if result else None
+    
+    async def get_prunable_rows(self, table: str, guild_id: int, max_id: Optional[int] = None, max_age_days: int = 0,
+                                limit: int = 500, columns: tuple = ('id',)) -> List[tuple]:
+        """Get up to `limit` of a guild's oldest rows that are at or below max_id or older than max_age_days
+        
+        Only the oldest `limit` rows are examined. Nothing is deleted: the caller archives
+        the rows first, then removes them with delete_rows.
+        """
+        if table not in RETENTION_TABLES:
+            raise ValueError(f"Unknown retention table: {table}")
+        
+        return await self.backend.fetchall(f'''
+            SELECT {', '.join(columns)} FROM (
+                SELECT * FROM {table} WHERE guild_id = ? ORDER BY id LIMIT ?
+            ) AS oldest
+            WHERE id <= ? OR (? > 0 AND created_at < ?)
+            ORDER BY id
+        ''', (guild_id, limit, max_id if max_id is not None else -1, max_age_days, _utc_text(max_age_days)))
+    
+    async def delete_rows(self, table: str, ids: List[int]):
+        """Delete rows of a retention table by id in one short transaction"""
+        if table not in RETENTION_TABLES:
+            raise ValueError(f"Unknown retention table: {table}")
+        
+        await self.backend.executemany(f'DELETE FROM {table} WHERE id = ?', [(row_id,) for row_id in ids])
+    
+    async def prune_command_usage(self, guild_id: int, max_age_days: int, limit: int = 500) -> int:
+        """Delete up to `limit` command usage rows not updated for max_age_days"""
+        return await self.backend.execute('''
+            DELETE FROM command_usage WHERE (guild_id, user_id, command_name) IN (
+                SELECT guild_id, user_id, command_name FROM command_usage
+                WHERE guild_id = ? AND last_used < ?
+                LIMIT ?
+            )
+        ''', (guild_id, _utc_text(max_age_days), limit))
+    
+    async def get_rows_after(self, table: str, guild_id: Optional[int], after_id: int, limit: int, columns: tuple) -> List[tuple]:
+        """Get the next `limit` rows of a table in id order (keyset pagination for exports)"""
+        if table not in RETENTION_TABLES:
+            raise ValueError(f"Unknown table: {table}")
+        
+        if guild_id is None:
+            return await self.backend.fetchall(f'''
+                SELECT {', '.join(columns)} FROM {table}
+                WHERE id > ? ORDER BY id LIMIT ?
+            ''', (after_id, limit))
+        
+        return await self.backend.fetchall(f'''
+            SELECT {', '.join(columns)} FROM {table}
+            WHERE guild_id = ? AND id > ? ORDER BY id LIMIT ?
+        ''', (guild_id, after_id, limit))
+    
+    async def compact(self, max_pages: int = 0) -> int:
+        """Return free pages to the OS and refresh query planner statistics
+        
+        Returns the number of pages freed.
+        """
+        return await self.backend.compact(max_pages)
+    
+    async def get_database_stats(self) -> Dict[str, int]:
+        """Get the database file size and free pages"""
+        return await self.backend.stats()
     
     # Logging methods
     async def log_moderation_action(self, guild_id: int, user_id: int, moderator_id: int, action: str, reason: Optional[str] = None, details: Optional[str] = None):
         """Log a moderation action"""
-        async with self._lock:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                INSERT INTO moderation_logs (guild_id, user_id, moderator_id, action, reason, details)
-                VALUES (?, ?, ?, ?, ?, ?)
-            ''', (guild_id, user_id, moderator_id, action, reason or "Aucune raison", details or ""))
-            
-            conn.commit()
-            conn.close()
+        await self.backend.execute('''
+            INSERT INTO moderation_logs (guild_id, user_id, moderator_id, action, reason, details)
+            VALUES (?, ?, ?, ?, ?, ?)
+        ''', (guild_id, user_id, moderator_id, action, reason or "Aucune raison", details or ""))
     
     # Guild settings helpers
     async def get_mute_role_id(self, guild_id: int) -> Optional[int]:
         """Get mute role ID for a guild"""
-        async with self._lock:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute('SELECT mute_role_id FROM guild_settings WHERE guild_id = ?', (guild_id,))
-            
-            result = cursor.fetchone()
-            conn.close()
-            
-            return result[0] if result and result[0] else None
+        result = await self.backend.fetchone('SELECT mute_role_id FROM guild_settings WHERE guild_id = ?', (guild_id,))
+        
+        return result[0] if result and result[0] else None
     
     async def set_mute_role_id(self, guild_id: int, role_id: int):
         """Set mute role ID for a guild"""
-        async with self._lock:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                INSERT OR REPLACE INTO guild_settings (guild_id, mute_role_id) 
-                VALUES (?, ?)
-            ''', (guild_id, role_id))
-            
-            conn.commit()
-            conn.close()
+        await self.backend.execute('''
+            INSERT INTO guild_settings (guild_id, mute_role_id)
+            VALUES (?, ?)
+            ON CONFLICT (guild_id) DO UPDATE SET mute_role_id = excluded.mute_role_id
+        ''', (guild_id, role_id))
+        
+        await self._invalidate('settings', guild_id)
     
     async def get_log_channel_id(self, guild_id: int) -> Optional[int]:
         """Get log channel ID for a guild"""
-        async with self._lock:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute('SELECT log_channel_id FROM guild_settings WHERE guild_id = ?', (guild_id,))
-            
-            result = cursor.fetchone()
-            conn.close()
-            
-            return result[0] if result and result[0] else None
+        result = await self.backend.fetchone('SELECT log_channel_id FROM guild_settings WHERE guild_id = ?', (guild_id,))
+        
+        return result[0] if result and result[0] else None
     
     async def set_log_channel_id(self, guild_id: int, channel_id: int):
         """Set log channel ID for a guild"""
-        async with self._lock:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                INSERT OR REPLACE INTO guild_settings (guild_id, log_channel_id) 
-                VALUES (?, ?)
-            ''', (guild_id, channel_id))
-            
-            conn.commit()
-            conn.close()
+        await self.backend.execute('''
+            INSERT INTO guild_settings (guild_id, log_channel_id)
+            VALUES (?, ?)
+            ON CONFLICT (guild_id) DO UPDATE SET log_channel_id = excluded.log_channel_id
+        ''', (guild_id, channel_id))
+        
+        await self._invalidate('settings', guild_id)
     
     # Permission helper methods
     async def has_permission_level(self, guild_id: int, user_id: int, required_level: int, user_roles: List[int]) -> bool:
         """Check if user has required permission level (hierarchical)"""
-        async with self._lock:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
+        async with self.backend.transaction() as session:
             # Check user-specific permissions (user with level X can use commands of level X and below)
-            cursor.execute('''
-                SELECT level FROM permission_levels 
+            result = await session.fetchone('''
+                SELECT level FROM permission_levels
                 WHERE guild_id = ? AND user_id = ? AND level <= ?
                 ORDER BY level ASC LIMIT 1
             ''', (guild_id, user_id, required_level))
             
-            result = cursor.fetchone()
             if result:
-                conn.close()
                 return True
             
             # Check role-based permissions (hierarchical check - lower numbers = higher access)
             if user_roles:
                 placeholders = ','.join(['?'] * len(user_roles))
-                cursor.execute(f'''
-                    SELECT level FROM permission_levels 
+                result = await session.fetchone(f'''
+                    SELECT level FROM permission_levels
                     WHERE guild_id = ? AND role_id IN ({placeholders}) AND level <= ?
                     ORDER BY level ASC LIMIT 1
                 ''', [guild_id] + user_roles + [required_level])
                 
-                result = cursor.fetchone()
-                conn.close()
                 return bool(result)
             
-            conn.close()
             return False
     
     async def has_command_permission(self, guild_id: int, user_id: int, command_name: str, user_roles: List[int]) -> bool:
         """Check if user has permission for a specific command"""
-        async with self._lock:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
+        async with self.backend.transaction() as session:
             # Check command-specific permissions first
-            cursor.execute('''
-                SELECT 1 FROM command_specific_permissions 
+            result = await session.fetchone('''
+                SELECT 1 FROM command_specific_permissions
                 WHERE guild_id = ? AND command_name = ? AND user_id = ?
             ''', (guild_id, command_name, user_id))
             
-            result = cursor.fetchone()
             if result:
-                conn.close()
                 return True
             
             # Check role-based command permissions
             if user_roles:
                 placeholders = ','.join(['?'] * len(user_roles))
-                cursor.execute(f'''
-                    SELECT 1 FROM command_specific_permissions 
+                result = await session.fetchone(f'''
+                    SELECT 1 FROM command_specific_permissions
                     WHERE guild_id = ? AND command_name = ? AND role_id IN ({placeholders})
                 ''', [guild_id, command_name] + user_roles)
                 
-                result = cursor.fetchone()
                 if result:
-                    conn.close()
                     return True
             
-            conn.close()
             return False
     
     # Additional database methods needed by cogs
     async def update_last_command_use(self, guild_id: int, user_id: int, command_name: str):
         """Update last command use time"""
-        async with self._lock:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                INSERT OR REPLACE INTO command_usage (guild_id, user_id, command_name, last_used) 
-                VALUES (?, ?, ?, CURRENT_TIMESTAMP)
-            ''', (guild_id, user_id, command_name))
-            
-            conn.commit()
-            conn.close()
+        await self.backend.execute('''
+            INSERT INTO command_usage (guild_id, user_id, command_name, last_used)
+            VALUES (?, ?, ?, ?)
+            ON CONFLICT (guild_id, user_id, command_name) DO UPDATE SET last_used = excluded.last_used
+        ''', (guild_id, user_id, command_name, _utc_text()))
     
     async def get_user_warnings(self, guild_id: int, user_id: int) -> List[Dict[str, Any]]:
         """Get all warnings for a user with IDs"""
-        async with self._lock:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                SELECT id, reason, created_at, moderator_id 
-                FROM infractions 
-                WHERE guild_id = ? AND user_id = ? AND infraction_type = 'warn' AND active = 1
-                ORDER BY created_at DESC
-            ''', (guild_id, user_id))
-            
-            results = cursor.fetchall()
-            conn.close()
-            
-            warnings = []
-            for result in results:
-                warnings.append({
-                    'id': result[0],
-                    'reason': result[1],
-                    'created_at': result[2],
-                    'moderator_id': result[3]
-                })
-            
-            return warnings
+        results = await self.backend.fetchall('''
+            SELECT id, reason, created_at, moderator_id
+            FROM infractions
+            WHERE guild_id = ? AND user_id = ? AND infraction_type = 'warn' AND active = 1
+            ORDER BY created_at DESC
+        ''', (guild_id, user_id))
+        
+        warnings = []
+        for result in results:
+            warnings.append({
+                'id': result[0],
+                'reason': result[1],
+                'created_at': result[2],
+                'moderator_id': result[3]
+            })
+        
+        return warnings
     
     async def remove_warning(self, guild_id: int, warning_id: int) -> bool:
         """Remove a specific warning by ID"""
-        async with self._lock:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            # First check if the warning exists and is active
-            cursor.execute('''
-                SELECT user_id FROM infractions 
-                WHERE id = ? AND guild_id = ? AND infraction_type = 'warn' AND active = 1
-            ''', (warning_id, guild_id))
-            
-            result = cursor.fetchone()
-            if not result:
-                conn.close()
-                return False
-            
-            # Mark the warning as inactive instead of deleting
-            cursor.execute('''
-                UPDATE infractions SET active = 0 
-                WHERE id = ? AND guild_id = ?
-            ''', (warning_id, guild_id))
-            
-            conn.commit()
-            conn.close()
-            return True
-
-    
+        # Mark the warning as inactive instead of deleting, only if it exists and is active
+        updated = await self.backend.execute('''
+            UPDATE infractions SET active = 0
+            WHERE id = ? AND guild_id = ? AND infraction_type = 'warn' AND active = 1
+        ''', (warning_id, guild_id))
+        
+        return updated > 0
@@ -2,16 +2,11 @@ import asyncio
 import logging
 import os
 from bot import CrowBot
+from config import Config
+from utils.logs import setup_logging
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('crowbot.log'),
-        logging.StreamHandler()
-    ]
-)
+# Configure logging (queued, written by a background thread)
+setup_logging(Config())
 
 async def main():
     """Main entry point for the bot"""
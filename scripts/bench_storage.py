@@ -0,0 +1,120 @@
+"""Concurrency benchmark of the storage backends
+
+Runs the same query mix (permission reads, infraction writes, usage
+upserts) with N concurrent tasks on each backend and prints throughput
+and latency percentiles per operation.
+
+    python scripts/bench_storage.py
+    python scripts/bench_storage.py --postgres postgresql://postgres@127.0.0.1:5432/postgres --concurrency 1,10,50
+
+Reads go straight to the backend: the Database LRU cache would hide the
+engine's cost.
+"""
+import os
+import sys
+import time
+import uuid
+import random
+import asyncio
+import argparse
+import tempfile
+from typing import Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import Database  # noqa: E402
+from storage import create_backend  # noqa: E402
+from storage.postgres import asyncpg  # noqa: E402
+
+GUILDS = 50
+USERS = 500
+
+def percentile(values: List[float], fraction: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+async def read_permission(db: Database, rng: random.Random):
+    await db.backend.fetchone(
+        'SELECT permission_level FROM command_permissions WHERE guild_id = ? AND command_name = ?',
+        (rng.randrange(GUILDS), 'ban')
+    )
+
+async def read_infractions(db: Database, rng: random.Random):
+    await db.get_user_infractions_page(rng.randrange(GUILDS), rng.randrange(USERS), limit=10)
+
+async def write_infraction(db: Database, rng: random.Random):
+    await db.add_infractions_bulk([(rng.randrange(GUILDS), rng.randrange(USERS), 1, 'warn', 'bench', None)])
+
+async def write_usage(db: Database, rng: random.Random):
+    await db.update_command_usage(rng.randrange(GUILDS), rng.randrange(USERS), 'ban')
+
+# (operation, weight): mostly reads, as in production
+MIX = [(read_permission, 60), (read_infractions, 15), (write_infraction, 10), (write_usage, 15)]
+
+async def run_level(db: Database, concurrency: int, operations: int, seed: int) -> Dict[str, List[float]]:
+    latencies: Dict[str, List[float]] = {op.__name__: [] for op, _ in MIX}
+    ops, weights = zip(*MIX)
+    remaining = operations
+
+    async def worker(worker_id: int):
+        nonlocal remaining
+        rng = random.Random(seed + worker_id)
+        while remaining > 0:
+            remaining -= 1
+            op = rng.choices(ops, weights)[0]
+            started = time.perf_counter()
+            await op(db, rng)
+            latencies[op.__name__].append(time.perf_counter() - started)
+
+    await asyncio.gather(*(worker(i) for i in range(concurrency)))
+    return latencies
+
+async def bench_backend(label: str, url: str, levels: List[int], operations: int):
+    db = Database(backend=create_backend(url))
+    await db.initialize()
+    try:
+        await db.bootstrap_guilds(list(range(GUILDS)))
+        print(f"\n== {label} ==")
+        print(f"{'tâches':>7} {'ops/s':>9}  {'opération':<17} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+        for concurrency in levels:
+            started = time.perf_counter()
+            latencies = await run_level(db, concurrency, operations, seed=concurrency)
+            elapsed = time.perf_counter() - started
+            throughput = operations / elapsed
+            for index, (name, values) in enumerate(latencies.items()):
+                prefix = f"{concurrency:>7} {throughput:>9.0f}" if index == 0 else " " * 17
+                print(
+                    f"{prefix}  {name:<17} {percentile(values, 0.50) * 1000:>8.2f} "
+                    f"{percentile(values, 0.95) * 1000:>8.2f} {percentile(values, 0.99) * 1000:>8.2f}"
+                )
+    finally:
+        await db.close()
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--postgres', help="URL postgresql:// d'un serveur de test (schéma jetable)")
+    parser.add_argument('--concurrency', default='1,10,50', help="niveaux de concurrence, séparés par des virgules")
+    parser.add_argument('--operations', type=int, default=2000, help="requêtes par niveau")
+    args = parser.parse_args()
+    levels = [int(level) for level in args.concurrency.split(',')]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        await bench_backend('sqlite', f"sqlite:///{os.path.join(tmp, 'bench.db')}", levels, args.operations)
+
+    if args.postgres:
+        if asyncpg is None:
+            sys.exit("asyncpg n'est pas installé")
+        schema = f"crowbot_bench_{uuid.uuid4().hex[:12]}"
+        conn = await asyncpg.connect(args.postgres)
+        await conn.execute(f'CREATE SCHEMA {schema}')
+        try:
+            separator = '&' if '?' in args.postgres else '?'
+            await bench_backend('postgresql', f"{args.postgres}{separator}search_path={schema}", levels, args.operations)
+        finally:
+            await conn.execute(f'DROP SCHEMA {schema} CASCADE')
+            await conn.close()
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,93 @@
+"""Compare prefix and slash command latency from the logs
+
+Reads the "Command ... completed" lines written by on_command_completion,
+in text or JSON format (LOG_FORMAT), rotated .gz files included, and
+prints percentiles per source, then per command.
+
+    python scripts/command_latency.py
+    python scripts/command_latency.py crowbot.log crowbot.log.*.gz --min-count 20
+"""
+import re
+import sys
+import glob
+import gzip
+import json
+import argparse
+from collections import defaultdict
+from typing import Dict, Iterator, List, Tuple
+
+SOURCES = ('prefix', 'slash')
+TEXT_LINE = re.compile(r"Command (?P<command>.+?) \((?P<source>prefix|slash)\) completed in (?P<latency>[\d.]+) ms")
+
+def open_log(path: str):
+    if path.endswith('.gz'):
+        return gzip.open(path, 'rt', encoding='utf-8', errors='replace')
+    return open(path, encoding='utf-8', errors='replace')
+
+def read_samples(paths: List[str]) -> Iterator[Tuple[str, str, float]]:
+    """(command, source, latency in ms) for every completed command"""
+    for path in paths:
+        with open_log(path) as f:
+            for line in f:
+                if line.startswith('{'):
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue
+                    if 'latency_ms' in entry and entry.get('source') in SOURCES:
+                        yield entry['command'], entry['source'], float(entry['latency_ms'])
+                    continue
+                match = TEXT_LINE.search(line)
+                if match:
+                    yield match['command'], match['source'], float(match['latency'])
+
+def percentile(values: List[float], fraction: float) -> float:
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+def summary(values: List[float]) -> str:
+    values = sorted(values)
+    return (
+        f"{len(values):>7} {sum(values) / len(values):>9.1f} {percentile(values, 0.50):>9.1f} "
+        f"{percentile(values, 0.90):>9.1f} {percentile(values, 0.99):>9.1f} {values[-1]:>9.1f}"
+    )
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('logs', nargs='*', help="fichiers de logs (défaut : crowbot*.log*)")
+    parser.add_argument('--min-count', type=int, default=5, help="échantillons minimum par source pour comparer une commande")
+    args = parser.parse_args()
+
+    paths = args.logs or sorted(glob.glob('crowbot*.log*'))
+    by_source: Dict[str, List[float]] = defaultdict(list)
+    by_command: Dict[str, Dict[str, List[float]]] = defaultdict(lambda: defaultdict(list))
+    for command, source, latency in read_samples(paths):
+        by_source[source].append(latency)
+        by_command[command][source].append(latency)
+
+    if not by_source:
+        sys.exit("Aucune ligne de latence trouvée (LOG_LEVEL doit être INFO ou plus bas)")
+
+    header = f"{'n':>7} {'moy. ms':>9} {'p50 ms':>9} {'p90 ms':>9} {'p99 ms':>9} {'max ms':>9}"
+    print(f"{'source':<8} {header}")
+    for source in SOURCES:
+        if by_source[source]:
+            print(f"{source:<8} {summary(by_source[source])}")
+
+    compared = [
+        (command, sources) for command, sources in sorted(by_command.items())
+        if all(len(sources[source]) >= args.min_count for source in SOURCES)
+    ]
+    if not compared:
+        return
+    print(f"\nCommandes utilisées des deux façons (au moins {args.min_count} fois chacune) :")
+    print(f"{'commande':<16} {'p50 préfixe':>12} {'p50 slash':>10} {'écart':>8} {'p99 préfixe':>12} {'p99 slash':>10}")
+    for command, sources in compared:
+        prefix, slash = sorted(sources['prefix']), sorted(sources['slash'])
+        prefix_p50, slash_p50 = percentile(prefix, 0.50), percentile(slash, 0.50)
+        print(
+            f"{command:<16} {prefix_p50:>12.1f} {slash_p50:>10.1f} {slash_p50 - prefix_p50:>+8.1f} "
+            f"{percentile(prefix, 0.99):>12.1f} {percentile(slash, 0.99):>10.1f}"
+        )
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,29 @@
+from typing import Optional
+from storage.base import StorageBackend, StorageSession
+from storage.sqlite import SQLiteBackend
+from storage.postgres import PostgresBackend
+from storage.cache import CacheLayer, LRUCache, MemoryStore, RedisStore, RemoteStore, create_cache
+
+def create_backend(url: Optional[str] = None, default_path: str = "crowbot.db") -> StorageBackend:
+    """Pick the backend from a URL: postgresql://... or sqlite:///path.db"""
+    if not url:
+        return SQLiteBackend(default_path)
+    if url.startswith(("postgres://", "postgresql://")):
+        return PostgresBackend(url)
+    if url.startswith("sqlite:///"):
+        return SQLiteBackend(url[len("sqlite:///"):])
+    raise ValueError(f"URL de base de données non prise en charge : {url}")
+
+__all__ = [
+    'StorageBackend',
+    'StorageSession',
+    'SQLiteBackend',
+    'PostgresBackend',
+    'create_backend',
+    'CacheLayer',
+    'LRUCache',
+    'RemoteStore',
+    'RedisStore',
+    'MemoryStore',
+    'create_cache'
+]
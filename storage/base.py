@@ -0,0 +1,76 @@
+from abc import ABC, abstractmethod
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+class StorageSession(ABC):
+    """Connection held inside a transaction (see StorageBackend.transaction)
+
+    Queries use `?` parameters and SQL understood by both SQLite and
+    PostgreSQL (ON CONFLICT, named subqueries, dates stored as text).
+    """
+
+    @abstractmethod
+    async def execute(self, query: str, params: Sequence[Any] = ()) -> int:
+        """Run a query and return the number of affected rows"""
+
+    @abstractmethod
+    async def executemany(self, query: str, params_seq: Iterable[Sequence[Any]]):
+        ...
+
+    @abstractmethod
+    async def fetchone(self, query: str, params: Sequence[Any] = ()) -> Optional[tuple]:
+        ...
+
+    @abstractmethod
+    async def fetchall(self, query: str, params: Sequence[Any] = ()) -> List[tuple]:
+        ...
+
+class StorageBackend(ABC):
+    """Common interface of the storage engines used by Database"""
+
+    name = "base"
+
+    @abstractmethod
+    async def connect(self):
+        ...
+
+    @abstractmethod
+    async def close(self):
+        ...
+
+    @abstractmethod
+    async def create_schema(self):
+        """Create missing tables and indexes"""
+
+    @abstractmethod
+    def transaction(self):
+        """Async context yielding a StorageSession, committed on exit
+
+        Any exception rolls back every query of the transaction.
+        """
+
+    async def execute(self, query: str, params: Sequence[Any] = ()) -> int:
+        async with self.transaction() as session:
+            return await session.execute(query, params)
+
+    async def executemany(self, query: str, params_seq: Iterable[Sequence[Any]]):
+        async with self.transaction() as session:
+            await session.executemany(query, params_seq)
+
+    async def fetchone(self, query: str, params: Sequence[Any] = ()) -> Optional[tuple]:
+        async with self.transaction() as session:
+            return await session.fetchone(query, params)
+
+    async def fetchall(self, query: str, params: Sequence[Any] = ()) -> List[tuple]:
+        async with self.transaction() as session:
+            return await session.fetchall(query, params)
+
+    @abstractmethod
+    async def compact(self, max_pages: int = 0) -> int:
+        """Return free space to the OS and refresh the query planner statistics
+
+        Returns the number of pages freed (0 when the engine does not report it).
+        """
+
+    @abstractmethod
+    async def stats(self) -> Dict[str, int]:
+        """Database size and free space, in bytes"""
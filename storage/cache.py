@@ -0,0 +1,344 @@
+import json
+import time
+import asyncio
+import logging
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
+
+try:
+    import redis.asyncio as aioredis
+except ImportError:  # Optional dependency, only needed for a REDIS_URL
+    aioredis = None
+
+LOCAL_CACHE_SIZE = 10000
+# Bounds staleness if an invalidation message is missed
+LOCAL_TTL = 60.0
+REMOTE_TTL = 3600
+KEY_PREFIX = 'crowbot'
+CHANNEL = 'crowbot:invalidate'
+RECONNECT_DELAY = 2.0
+
+logger = logging.getLogger('chdfz gestion.cache')
+
+Loader = Callable[[], Awaitable[Any]]
+
+class LRUCache:
+    """Bounded dictionary: least recently used entries are evicted first"""
+
+    def __init__(self, maxsize: int = LOCAL_CACHE_SIZE, ttl: float = LOCAL_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: 'OrderedDict[Any, Tuple[int, Any, float]]' = OrderedDict()
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, key: Any, version: int) -> Tuple[bool, Any]:
+        entry = self._data.get(key)
+        if entry is None:
+            return False, None
+        entry_version, value, expires_at = entry
+        if entry_version != version or expires_at < time.monotonic():
+            del self._data[key]
+            return False, None
+        self._data.move_to_end(key)
+        return True, value
+
+    def set(self, key: Any, version: int, value: Any):
+        self._data[key] = (version, value, time.monotonic() + self.ttl)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def clear(self):
+        self._data.clear()
+
+class RemoteStore(ABC):
+    """Shared cache server (Redis or equivalent) as seen by CacheLayer"""
+
+    @abstractmethod
+    async def get_many(self, keys: Sequence[str]) -> List[Optional[str]]:
+        """Read several keys in a single round trip"""
+
+    @abstractmethod
+    async def set(self, key: str, value: str, ttl: int):
+        ...
+
+    @abstractmethod
+    async def incr(self, key: str) -> int:
+        ...
+
+    @abstractmethod
+    async def publish(self, channel: str, message: str):
+        ...
+
+    @abstractmethod
+    async def listen(self, channel: str, callback: Callable[[str], None]):
+        """Call callback for every published message; returns if the connection drops"""
+
+    async def close(self):
+        pass
+
+class RedisStore(RemoteStore):
+    """Redis-compatible server through redis.asyncio; errors become ConnectionError"""
+
+    def __init__(self, url: str):
+        if aioredis is None:
+            raise RuntimeError("Le cache partagé nécessite le paquet redis (pip install redis)")
+        self.client = aioredis.from_url(url, decode_responses=True)
+
+    async def get_many(self, keys: Sequence[str]) -> List[Optional[str]]:
+        try:
+            async with self.client.pipeline(transaction=False) as pipe:
+                for key in keys:
+                    pipe.get(key)
+                return await pipe.execute()
+        except aioredis.RedisError as e:
+            raise ConnectionError(str(e)) from e
+
+    async def set(self, key: str, value: str, ttl: int):
+        try:
+            await self.client.set(key, value, ex=ttl)
+        except aioredis.RedisError as e:
+            raise ConnectionError(str(e)) from e
+
+    async def incr(self, key: str) -> int:
+        try:
+            return await self.client.incr(key)
+        except aioredis.RedisError as e:
+            raise ConnectionError(str(e)) from e
+
+    async def publish(self, channel: str, message: str):
+        try:
+            await self.client.publish(channel, message)
+        except aioredis.RedisError as e:
+            raise ConnectionError(str(e)) from e
+
+    async def listen(self, channel: str, callback: Callable[[str], None]):
+        pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+        try:
+            await pubsub.subscribe(channel)
+            async for message in pubsub.listen():
+                callback(message['data'])
+        except aioredis.RedisError as e:
+            raise ConnectionError(str(e)) from e
+        finally:
+            await pubsub.aclose()
+
+    async def close(self):
+        await self.client.aclose()
+
+class MemoryStore(RemoteStore):
+    """In-memory stand-in server: several CacheLayer sharing one instance
+    behave like processes connected to the same Redis (tests, development)"""
+
+    def __init__(self):
+        self.data: Dict[str, str] = {}
+        self.round_trips = 0
+        self._subscribers: Dict[str, List[asyncio.Queue]] = {}
+
+    async def get_many(self, keys: Sequence[str]) -> List[Optional[str]]:
+        self.round_trips += 1
+        return [self.data.get(key) for key in keys]
+
+    async def set(self, key: str, value: str, ttl: int):
+        self.round_trips += 1
+        self.data[key] = value
+
+    async def incr(self, key: str) -> int:
+        self.round_trips += 1
+        value = int(self.data.get(key, 0)) + 1
+        self.data[key] = str(value)
+        return value
+
+    async def publish(self, channel: str, message: str):
+        self.round_trips += 1
+        for queue in self._subscribers.get(channel, []):
+            queue.put_nowait(message)
+
+    async def listen(self, channel: str, callback: Callable[[str], None]):
+        queue: asyncio.Queue = asyncio.Queue()
+        self._subscribers.setdefault(channel, []).append(queue)
+        try:
+            while True:
+                callback(await queue.get())
+        finally:
+            self._subscribers[channel].remove(queue)
+
+class CacheLayer:
+    """Cache of frequent reads in front of Database
+
+    A local LRU serves reads without a round trip. With a RemoteStore,
+    values are shared between processes under keys versioned per
+    (kind, guild): a write increments the version and publishes it, and
+    entries from older versions are never read again.
+    """
+
+    def __init__(self, store: Optional[RemoteStore] = None, maxsize: int = LOCAL_CACHE_SIZE,
+                 ttl: float = LOCAL_TTL, remote_ttl: int = REMOTE_TTL):
+        self.store = store
+        self.remote_ttl = remote_ttl
+        self.local = LRUCache(maxsize, ttl)
+        # Known version per (kind, guild_id); with a store, unknown means "ask the store"
+        self._versions: Dict[Tuple[str, Optional[int]], int] = {}
+        self._listener: Optional[asyncio.Task] = None
+        # Called with (kind, guild_id) when another process publishes an invalidation
+        self.on_invalidate: Optional[Callable[[str, Optional[int]], None]] = None
+        self.hits = 0
+        self.remote_hits = 0
+        self.misses = 0
+        self.errors = 0
+
+    async def start(self):
+        if self.store is not None and self._listener is None:
+            self._listener = asyncio.create_task(self._listen_loop())
+
+    async def close(self):
+        if self._listener is not None:
+            self._listener.cancel()
+            await asyncio.gather(self._listener, return_exceptions=True)
+            self._listener = None
+        if self.store is not None:
+            await self.store.close()
+
+    async def _listen_loop(self):
+        while True:
+            try:
+                await self.store.listen(CHANNEL, self._on_message)
+            except (ConnectionError, OSError) as e:
+                logger.warning(f"Cache invalidation channel lost: {e}")
+            # Invalidations may have been missed while disconnected
+            self._versions.clear()
+            await asyncio.sleep(RECONNECT_DELAY)
+
+    def _on_message(self, message: str):
+        kind, guild_id, version = message.rsplit(':', 2)
+        key = (kind, None if guild_id == '' else int(guild_id))
+        if int(version) > self._versions.get(key, 0):
+            self._versions[key] = int(version)
+            if self.on_invalidate is not None:
+                self.on_invalidate(*key)
+
+    @staticmethod
+    def _version_key(kind: str, guild_id: Optional[int]) -> str:
+        return f'{KEY_PREFIX}:v:{kind}:{"" if guild_id is None else guild_id}'
+
+    @staticmethod
+    def _value_key(kind: str, guild_id: Optional[int], key: str) -> str:
+        return f'{KEY_PREFIX}:d:{kind}:{"" if guild_id is None else guild_id}:{key}'
+
+    def _local_version(self, kind: str, guild_id: Optional[int]) -> Optional[int]:
+        version = self._versions.get((kind, guild_id))
+        if version is None and self.store is None:
+            return 0
+        return version
+
+    async def get(self, kind: str, guild_id: Optional[int], key: str, loader: Loader) -> Any:
+        """Cached value, or the result of loader() once cached"""
+        return (await self.get_many([(kind, guild_id, key, loader)]))[0]
+
+    async def get_many(self, requests: Sequence[Tuple[str, Optional[int], str, Loader]]) -> List[Any]:
+        """Several reads: local LRU first, then one batched round trip to the store"""
+        results: List[Any] = [None] * len(requests)
+        pending = []
+        for index, (kind, guild_id, key, loader) in enumerate(requests):
+            version = self._local_version(kind, guild_id)
+            if version is not None:
+                found, value = self.local.get((kind, guild_id, key), version)
+                if found:
+                    self.hits += 1
+                    results[index] = value
+                    continue
+            pending.append(index)
+
+        if not pending:
+            return results
+
+        remote: Dict[int, Tuple[int, Optional[str]]] = {}
+        if self.store is not None:
+            keys = []
+            for index in pending:
+                kind, guild_id, key, _ = requests[index]
+                keys.append(self._version_key(kind, guild_id))
+                keys.append(self._value_key(kind, guild_id, key))
+            try:
+                values = await self.store.get_many(keys)
+            except (ConnectionError, OSError) as e:
+                self.errors += 1
+                logger.warning(f"Cache store unavailable, reading from the database: {e}")
+                for index in pending:
+                    results[index] = await requests[index][3]()
+                return results
+            for position, index in enumerate(pending):
+                remote[index] = (int(values[2 * position] or 0), values[2 * position + 1])
+
+        writes = []
+        for index in pending:
+            kind, guild_id, key, loader = requests[index]
+            if self.store is None:
+                version = self._local_version(kind, guild_id)
+            else:
+                version, raw = remote[index]
+                self._versions[(kind, guild_id)] = version
+                if raw is not None:
+                    entry = json.loads(raw)
+                    if entry['v'] == version:
+                        self.remote_hits += 1
+                        self.local.set((kind, guild_id, key), version, entry['d'])
+                        results[index] = entry['d']
+                        continue
+
+            self.misses += 1
+            value = await loader()
+            self.local.set((kind, guild_id, key), version, value)
+            results[index] = value
+            if self.store is not None:
+                writes.append((self._value_key(kind, guild_id, key), json.dumps({'v': version, 'd': value})))
+
+        for key, raw in writes:
+            try:
+                await self.store.set(key, raw, self.remote_ttl)
+            except (ConnectionError, OSError) as e:
+                self.errors += 1
+                logger.warning(f"Failed to populate the cache store: {e}")
+                break
+
+        return results
+
+    def drop(self, kind: str, guild_id: Optional[int]):
+        """Forget the local values of (kind, guild_id)"""
+        if self.store is None:
+            self._versions[(kind, guild_id)] = self._versions.get((kind, guild_id), 0) + 1
+        else:
+            self._versions.pop((kind, guild_id), None)
+
+    async def invalidate(self, kind: str, guild_id: Optional[int]):
+        """After a write: new version for this process and for the others"""
+        self.drop(kind, guild_id)
+        if self.store is None:
+            return
+        try:
+            version = await self.store.incr(self._version_key(kind, guild_id))
+            self._versions[(kind, guild_id)] = version
+            await self.store.publish(CHANNEL, f'{kind}:{"" if guild_id is None else guild_id}:{version}')
+        except (ConnectionError, OSError) as e:
+            self.errors += 1
+            logger.warning(f"Failed to publish cache invalidation for {kind}: {e}")
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            'size': len(self.local),
+            'hits': self.hits,
+            'remote_hits': self.remote_hits,
+            'misses': self.misses,
+            'errors': self.errors
+        }
+
+def create_cache(url: Optional[str] = None, maxsize: int = LOCAL_CACHE_SIZE) -> CacheLayer:
+    """Local LRU alone, or backed by a redis://... server shared between processes"""
+    if not url:
+        return CacheLayer(maxsize=maxsize)
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        return CacheLayer(RedisStore(url), maxsize=maxsize)
+    raise ValueError(f"URL de cache non prise en charge : {url}")
@@ -0,0 +1,111 @@
+import re
+from contextlib import asynccontextmanager
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+from storage.base import StorageBackend, StorageSession
+from storage.schema import postgres_schema
+
+try:
+    import asyncpg
+except ImportError:  # Optional dependency, only needed for a postgresql:// DATABASE_URL
+    asyncpg = None
+
+POOL_MIN_SIZE = 2
+POOL_MAX_SIZE = 10
+STATEMENT_CACHE_SIZE = 256
+
+SCHEMA = postgres_schema()
+
+_PLACEHOLDER = re.compile(r"\?")
+
+@lru_cache(maxsize=1024)
+def convert_placeholders(query: str) -> str:
+    """Turn `?` parameters into `$1, $2, ...` (no query contains a literal `?`)"""
+    counter = iter(range(1, 10000))
+    return _PLACEHOLDER.sub(lambda _: f"${next(counter)}", query)
+
+def _rowcount(status: str) -> int:
+    # asyncpg returns the command status, e.g. "DELETE 12" or "INSERT 0 1"
+    try:
+        return int(status.rsplit(' ', 1)[-1])
+    except (ValueError, AttributeError):
+        return 0
+
+class PostgresSession(StorageSession):
+    def __init__(self, conn):
+        self.conn = conn
+
+    async def execute(self, query: str, params: Sequence[Any] = ()) -> int:
+        return _rowcount(await self.conn.execute(convert_placeholders(query), *params))
+
+    async def executemany(self, query: str, params_seq: Iterable[Sequence[Any]]):
+        await self.conn.executemany(convert_placeholders(query), list(params_seq))
+
+    async def fetchone(self, query: str, params: Sequence[Any] = ()) -> Optional[tuple]:
+        row = await self.conn.fetchrow(convert_placeholders(query), *params)
+        return tuple(row) if row is not None else None
+
+    async def fetchall(self, query: str, params: Sequence[Any] = ()) -> List[tuple]:
+        return [tuple(row) for row in await self.conn.fetch(convert_placeholders(query), *params)]
+
+class PostgresBackend(StorageBackend):
+    """PostgreSQL through an asyncpg pool, shareable by several bot processes
+
+    asyncpg prepares each query once per connection and keeps prepared
+    statements cached (STATEMENT_CACHE_SIZE).
+    """
+
+    name = "postgresql"
+
+    def __init__(self, dsn: str, min_size: int = POOL_MIN_SIZE, max_size: int = POOL_MAX_SIZE):
+        self.dsn = dsn
+        self.min_size = min_size
+        self.max_size = max_size
+        self.pool = None
+
+    async def connect(self):
+        if asyncpg is None:
+            raise RuntimeError("Le backend PostgreSQL nécessite le paquet asyncpg (pip install asyncpg)")
+        if self.pool is None:
+            self.pool = await asyncpg.create_pool(
+                self.dsn, min_size=self.min_size, max_size=self.max_size,
+                statement_cache_size=STATEMENT_CACHE_SIZE
+            )
+
+    async def close(self):
+        if self.pool is not None:
+            await self.pool.close()
+            self.pool = None
+
+    async def create_schema(self):
+        async with self.transaction() as session:
+            # Several processes may start at the same time
+            await session.execute("SELECT pg_advisory_xact_lock(hashtext('crowbot_schema'))")
+            for statement in SCHEMA:
+                await session.execute(statement)
+
+    @asynccontextmanager
+    async def transaction(self):
+        async with self.pool.acquire() as conn:
+            async with conn.transaction():
+                yield PostgresSession(conn)
+
+    # Standalone queries: no explicit transaction, a single round trip
+    async def execute(self, query: str, params: Sequence[Any] = ()) -> int:
+        return _rowcount(await self.pool.execute(convert_placeholders(query), *params))
+
+    async def fetchone(self, query: str, params: Sequence[Any] = ()) -> Optional[tuple]:
+        row = await self.pool.fetchrow(convert_placeholders(query), *params)
+        return tuple(row) if row is not None else None
+
+    async def fetchall(self, query: str, params: Sequence[Any] = ()) -> List[tuple]:
+        return [tuple(row) for row in await self.pool.fetch(convert_placeholders(query), *params)]
+
+    async def compact(self, max_pages: int = 0) -> int:
+        # PostgreSQL's autovacuum reclaims space, only the statistics need refreshing
+        await self.pool.execute('ANALYZE')
+        return 0
+
+    async def stats(self) -> Dict[str, int]:
+        size = await self.pool.fetchval('SELECT pg_database_size(current_database())')
+        return {'size_bytes': size, 'free_bytes': 0}
@@ -0,0 +1,248 @@
+import re
+from typing import List
+
+# Tables and indexes, written once in the SQLite dialect.
+# postgres_schema() derives the PostgreSQL DDL from it, so the two cannot drift apart.
+SCHEMA = [
+    # Guild settings table
+    '''
+        CREATE TABLE IF NOT EXISTS guild_settings (
+            guild_id INTEGER PRIMARY KEY,
+            prefix TEXT DEFAULT '+',
+            log_channel_id INTEGER,
+            mute_role_id INTEGER,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''',
+    # Permission levels table (perm 1-9)
+    '''
+        CREATE TABLE IF NOT EXISTS permission_levels (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            guild_id INTEGER,
+            level INTEGER,
+            level_name TEXT,
+            role_id INTEGER,
+            user_id INTEGER,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            UNIQUE(guild_id, level, role_id),
+            UNIQUE(guild_id, level, user_id)
+        )
+    ''',
+    # Command permissions table - now maps commands to permission levels
+    '''
+        CREATE TABLE IF NOT EXISTS command_permissions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            guild_id INTEGER,
+            command_name TEXT,
+            permission_level TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            UNIQUE(guild_id, command_name)
+        )
+    ''',
+    # Command-specific permissions (for individual roles/users)
+    '''
+        CREATE TABLE IF NOT EXISTS command_specific_permissions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            guild_id INTEGER,
+            command_name TEXT,
+            role_id INTEGER,
+            user_id INTEGER,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            UNIQUE(guild_id, command_name, role_id),
+            UNIQUE(guild_id, command_name, user_id)
+        )
+    ''',
+    # Command cooldowns table
+    '''
+        CREATE TABLE IF NOT EXISTS command_cooldowns (
+            guild_id INTEGER,
+            command_name TEXT,
+            cooldown_seconds INTEGER,
+            PRIMARY KEY(guild_id, command_name)
+        )
+    ''',
+    # Command usage tracking
+    '''
+        CREATE TABLE IF NOT EXISTS command_usage (
+            guild_id INTEGER,
+            user_id INTEGER,
+            command_name TEXT,
+            last_used TIMESTAMP,
+            PRIMARY KEY(guild_id, user_id, command_name)
+        )
+    ''',
+    # Infractions table
+    '''
+        CREATE TABLE IF NOT EXISTS infractions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            guild_id INTEGER,
+            user_id INTEGER,
+            moderator_id INTEGER,
+            infraction_type TEXT,
+            reason TEXT,
+            duration INTEGER,
+            active BOOLEAN DEFAULT 1,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''',
+    # Muted users table
+    '''
+        CREATE TABLE IF NOT EXISTS muted_users (
+            guild_id INTEGER,
+            user_id INTEGER,
+            muted_until TIMESTAMP,
+            reason TEXT,
+            moderator_id INTEGER,
+            PRIMARY KEY(guild_id, user_id)
+        )
+    ''',
+    # Moderation logs
+    '''
+        CREATE TABLE IF NOT EXISTS moderation_logs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            guild_id INTEGER,
+            user_id INTEGER,
+            moderator_id INTEGER,
+            action TEXT,
+            reason TEXT,
+            details TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''',
+    # Bot ownership tables
+    '''
+        CREATE TABLE IF NOT EXISTS bot_ownership (
+            guild_id INTEGER PRIMARY KEY,
+            buyer_id INTEGER,
+            recovery_code TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''',
+    # Owners table
+    '''
+        CREATE TABLE IF NOT EXISTS owners (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            guild_id INTEGER,
+            user_id INTEGER,
+            added_by INTEGER,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            UNIQUE(guild_id, user_id)
+        )
+    ''',
+    # Whitelist table
+    '''
+        CREATE TABLE IF NOT EXISTS whitelist (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            guild_id INTEGER,
+            user_id INTEGER,
+            added_by INTEGER,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            UNIQUE(guild_id, user_id)
+        )
+    ''',
+    # Blacklist rank table
+    '''
+        CREATE TABLE IF NOT EXISTS blacklist_rank (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            guild_id INTEGER,
+            user_id INTEGER,
+            added_by INTEGER,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            UNIQUE(guild_id, user_id)
+        )
+    ''',
+    # Leash system table
+    '''
+        CREATE TABLE IF NOT EXISTS leash_system (
+            guild_id INTEGER,
+            user_id INTEGER,
+            owner_id INTEGER,
+            original_nick TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY(guild_id, user_id)
+        )
+    ''',
+    # Keyset pagination of a user's infractions
+    '''
+        CREATE INDEX IF NOT EXISTS idx_infractions_guild_user_id
+        ON infractions (guild_id, user_id, id)
+    ''',
+    # Streaming exports of a guild's history in id order
+    '''
+        CREATE INDEX IF NOT EXISTS idx_infractions_guild_id
+        ON infractions (guild_id, id)
+    ''',
+    '''
+        CREATE INDEX IF NOT EXISTS idx_moderation_logs_guild_id
+        ON moderation_logs (guild_id, id)
+    ''',
+    # Anti-raid settings
+    '''
+        CREATE TABLE IF NOT EXISTS antiraid_settings (
+            guild_id INTEGER PRIMARY KEY,
+            enabled BOOLEAN DEFAULT 0,
+            join_threshold INTEGER DEFAULT 10,
+            window_seconds INTEGER DEFAULT 10,
+            young_account_hours INTEGER DEFAULT 24,
+            young_threshold INTEGER DEFAULT 5,
+            action TEXT DEFAULT 'kick',
+            auto_lockdown BOOLEAN DEFAULT 1
+        )
+    ''',
+    # Anti-spam settings
+    '''
+        CREATE TABLE IF NOT EXISTS antispam_settings (
+            guild_id INTEGER PRIMARY KEY,
+            enabled BOOLEAN DEFAULT 0,
+            message_rate INTEGER DEFAULT 6,
+            per_seconds INTEGER DEFAULT 5,
+            max_mentions INTEGER DEFAULT 8,
+            duplicate_threshold INTEGER DEFAULT 4,
+            mute_seconds INTEGER DEFAULT 600
+        )
+    ''',
+    # Lockdown snapshots (@everyone overwrite before lock)
+    '''
+        CREATE TABLE IF NOT EXISTS lockdown_snapshots (
+            guild_id INTEGER,
+            channel_id INTEGER,
+            allow_value INTEGER,
+            deny_value INTEGER,
+            had_overwrite BOOLEAN,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY(guild_id, channel_id)
+        )
+    ''',
+    # Retention settings
+    '''
+        CREATE TABLE IF NOT EXISTS retention_settings (
+            guild_id INTEGER PRIMARY KEY,
+            logs_days INTEGER DEFAULT 0,
+            logs_max_rows INTEGER DEFAULT 0,
+            infractions_days INTEGER DEFAULT 0,
+            infractions_max_rows INTEGER DEFAULT 0,
+            usage_days INTEGER DEFAULT 30,
+            archive BOOLEAN DEFAULT 0
+        )
+    ''',
+]
+
+# SQLite type -> PostgreSQL type. Timestamps stay text in the 'YYYY-MM-DD HH:MM:SS' UTC
+# format written by CURRENT_TIMESTAMP, so the same comparisons work on both engines.
+_POSTGRES_TYPES = [
+    (re.compile(r'\bINTEGER PRIMARY KEY AUTOINCREMENT\b'), 'BIGINT GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY'),
+    (re.compile(r'\bTIMESTAMP DEFAULT CURRENT_TIMESTAMP\b'),
+     "TEXT DEFAULT to_char(now() AT TIME ZONE 'utc', 'YYYY-MM-DD HH24:MI:SS')"),
+    (re.compile(r'\bTIMESTAMP\b'), 'TEXT'),
+    (re.compile(r'\bBOOLEAN\b'), 'SMALLINT'),
+    (re.compile(r'\bINTEGER\b'), 'BIGINT')
+]
+
+def postgres_schema() -> List[str]:
+    """SCHEMA translated for PostgreSQL (Discord IDs as BIGINT, booleans as SMALLINT)"""
+    statements = []
+    for statement in SCHEMA:
+        for pattern, replacement in _POSTGRES_TYPES:
+            statement = pattern.sub(replacement, statement)
+        statements.append(statement)
+    return statements
@@ -0,0 +1,112 @@
+import asyncio
+import sqlite3
+from contextlib import asynccontextmanager
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+from storage.base import StorageBackend, StorageSession
+from storage.schema import SCHEMA
+
+class SQLiteSession(StorageSession):
+    def __init__(self, cursor: sqlite3.Cursor):
+        self.cursor = cursor
+
+    async def execute(self, query: str, params: Sequence[Any] = ()) -> int:
+        self.cursor.execute(query, params)
+        return self.cursor.rowcount
+
+    async def executemany(self, query: str, params_seq: Iterable[Sequence[Any]]):
+        self.cursor.executemany(query, params_seq)
+
+    async def fetchone(self, query: str, params: Sequence[Any] = ()) -> Optional[tuple]:
+        self.cursor.execute(query, params)
+        return self.cursor.fetchone()
+
+    async def fetchall(self, query: str, params: Sequence[Any] = ()) -> List[tuple]:
+        self.cursor.execute(query, params)
+        return self.cursor.fetchall()
+
+class SQLiteBackend(StorageBackend):
+    """Single SQLite file, one connection serialised by a lock"""
+
+    name = "sqlite"
+
+    def __init__(self, db_path: str = "crowbot.db"):
+        self.db_path = db_path
+        self._lock = asyncio.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+
+    async def connect(self):
+        if self._conn is None:
+            # Waits for the lock held by another cluster worker instead of failing
+            self._conn = sqlite3.connect(self.db_path, timeout=5.0)
+
+    async def close(self):
+        async with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    async def create_schema(self):
+        async with self.transaction() as session:
+            for statement in SCHEMA:
+                await session.execute(statement)
+
+        async with self._lock:
+            cursor = self._conn.cursor()
+            # Freed pages are returned to the OS by the maintenance task (one-time rebuild)
+            cursor.execute('PRAGMA auto_vacuum')
+            if cursor.fetchone()[0] != 2:
+                cursor.execute('PRAGMA auto_vacuum = INCREMENTAL')
+                cursor.execute('VACUUM')
+
+    async def enable_wal(self):
+        """WAL mode: several processes read while one writes (cluster)"""
+        async with self._lock:
+            await self.connect()
+            self._conn.execute('PRAGMA journal_mode = WAL')
+            self._conn.execute('PRAGMA busy_timeout = 5000')
+
+    @asynccontextmanager
+    async def transaction(self):
+        async with self._lock:
+            await self.connect()
+            cursor = self._conn.cursor()
+            try:
+                yield SQLiteSession(cursor)
+            except BaseException:
+                self._conn.rollback()
+                raise
+            else:
+                self._conn.commit()
+            finally:
+                cursor.close()
+
+    async def compact(self, max_pages: int = 0) -> int:
+        async with self._lock:
+            cursor = self._conn.cursor()
+
+            cursor.execute('PRAGMA freelist_count')
+            free_before = cursor.fetchone()[0]
+            # incremental_vacuum frees one page per step, executescript runs it to completion
+            self._conn.executescript(f'PRAGMA incremental_vacuum({int(max_pages)});')
+            cursor.execute('PRAGMA freelist_count')
+            free_after = cursor.fetchone()[0]
+            cursor.execute('PRAGMA optimize')
+            self._conn.commit()
+
+            return free_before - free_after
+
+    async def stats(self) -> Dict[str, int]:
+        async with self._lock:
+            cursor = self._conn.cursor()
+
+            cursor.execute('PRAGMA page_size')
+            page_size = cursor.fetchone()[0]
+            cursor.execute('PRAGMA page_count')
+            page_count = cursor.fetchone()[0]
+            cursor.execute('PRAGMA freelist_count')
+            freelist_count = cursor.fetchone()[0]
+
+            return {
+                'size_bytes': page_size * page_count,
+                'free_bytes': page_size * freelist_count
+            }
@@ -0,0 +1,168 @@
+"""CacheLayer behaviour with and without a shared store
+
+MemoryStore stands in for Redis: several CacheLayer instances sharing one
+behave like processes connected to the same server.
+"""
+import asyncio
+from typing import List, Optional, Sequence
+
+from database import Database
+from storage import CacheLayer, MemoryStore, SQLiteBackend
+from storage.cache import CHANNEL
+
+GUILD_ID = 1_100_000_000_000_000_001
+USER_ID = 900_000_000_000_000_001
+MODERATOR_ID = 900_000_000_000_000_002
+
+class FailingStore(MemoryStore):
+    """MemoryStore that can be switched off to simulate a lost Redis"""
+
+    def __init__(self):
+        super().__init__()
+        self.down = False
+
+    async def get_many(self, keys: Sequence[str]) -> List[Optional[str]]:
+        if self.down:
+            raise ConnectionError("store down")
+        return await super().get_many(keys)
+
+    async def set(self, key: str, value: str, ttl: int):
+        if self.down:
+            raise ConnectionError("store down")
+        await super().set(key, value, ttl)
+
+    async def incr(self, key: str) -> int:
+        if self.down:
+            raise ConnectionError("store down")
+        return await super().incr(key)
+
+def counting_loader(value):
+    """Loader returning `value` and recording how many times it was called"""
+    async def loader():
+        loader.calls += 1
+        return value
+    loader.calls = 0
+    return loader
+
+async def wait_until(condition, timeout: float = 2.0):
+    """Let listener and invalidation tasks run until condition() holds"""
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not condition():
+        assert asyncio.get_running_loop().time() < deadline, "condition not reached"
+        await asyncio.sleep(0.01)
+
+async def wait_for_listeners(store: MemoryStore, count: int):
+    """Publications made before a layer subscribes are not delivered to it"""
+    await wait_until(lambda: len(store._subscribers.get(CHANNEL, [])) == count)
+
+def test_local_versions_without_store():
+    async def main():
+        cache = CacheLayer()
+        loader = counting_loader('!')
+        assert await cache.get('prefix', GUILD_ID, 'prefix', loader) == '!'
+        assert await cache.get('prefix', GUILD_ID, 'prefix', loader) == '!'
+        assert loader.calls == 1 and cache.hits == 1
+
+        await cache.invalidate('prefix', GUILD_ID)
+        assert await cache.get('prefix', GUILD_ID, 'prefix', loader) == '!'
+        assert loader.calls == 2
+    asyncio.run(main())
+
+def test_versioned_keys_in_store():
+    async def main():
+        store = MemoryStore()
+        cache = CacheLayer(store)
+        loader = counting_loader(['ban', 'perm2'])
+        await cache.get('permissions', GUILD_ID, 'commands', loader)
+
+        value_key = CacheLayer._value_key('permissions', GUILD_ID, 'commands')
+        assert value_key in store.data
+        assert CacheLayer._version_key('permissions', GUILD_ID) not in store.data
+
+        await cache.invalidate('permissions', GUILD_ID)
+        assert store.data[CacheLayer._version_key('permissions', GUILD_ID)] == '1'
+
+        # The entry written under version 0 is never served again
+        fresh = CacheLayer(store)
+        assert await fresh.get('permissions', GUILD_ID, 'commands', counting_loader(['ban', 'perm5'])) == ['ban', 'perm5']
+        assert fresh.remote_hits == 0 and fresh.misses == 1
+        assert await CacheLayer(store).get('permissions', GUILD_ID, 'commands', loader) == ['ban', 'perm5']
+    asyncio.run(main())
+
+def test_invalidation_between_layers_sharing_a_store():
+    async def main():
+        store = MemoryStore()
+        first, second = CacheLayer(store), CacheLayer(store)
+        received = []
+        second.on_invalidate = lambda kind, guild_id: received.append((kind, guild_id))
+        await first.start()
+        await second.start()
+        await wait_for_listeners(store, 2)
+        try:
+            await second.get('prefix', GUILD_ID, 'prefix', counting_loader('!'))
+            # Served by the shared store, not by second's loader
+            assert await first.get('prefix', GUILD_ID, 'prefix', counting_loader('?')) == '!'
+            assert first.remote_hits == 1
+
+            await first.invalidate('prefix', GUILD_ID)
+            await wait_until(lambda: received)
+            assert received == [('prefix', GUILD_ID)]
+
+            loader = counting_loader('?')
+            assert await second.get('prefix', GUILD_ID, 'prefix', loader) == '?'
+            assert loader.calls == 1
+        finally:
+            await first.close()
+            await second.close()
+    asyncio.run(main())
+
+def test_store_errors_fall_back_to_local_lru():
+    async def main():
+        store = FailingStore()
+        cache = CacheLayer(store)
+        loader = counting_loader('!')
+        await cache.get('prefix', GUILD_ID, 'prefix', loader)
+
+        store.down = True
+        # The version is known, so the local LRU answers without asking the store
+        assert await cache.get('prefix', GUILD_ID, 'prefix', loader) == '!'
+        assert loader.calls == 1 and cache.errors == 0
+
+        # A miss reads from the database instead of failing the command
+        other = counting_loader('?')
+        assert await cache.get('prefix', GUILD_ID + 1, 'prefix', other) == '?'
+        assert other.calls == 1 and cache.errors == 1
+
+        # A failed invalidation still forgets the local value
+        await cache.invalidate('prefix', GUILD_ID)
+        assert cache.errors == 2
+        assert await cache.get('prefix', GUILD_ID, 'prefix', counting_loader('?')) == '?'
+    asyncio.run(main())
+
+def test_remote_invalidation_refreshes_database_state(tmp_path):
+    async def main():
+        store = MemoryStore()
+        path = str(tmp_path / 'test.db')
+        first = Database(backend=SQLiteBackend(path), cache=CacheLayer(store))
+        second = Database(backend=SQLiteBackend(path), cache=CacheLayer(store))
+        received = []
+        second.remote_invalidation_hook = lambda kind, guild_id: received.append((kind, guild_id))
+        await first.initialize()
+        await second.initialize()
+        await wait_for_listeners(store, 2)
+        try:
+            await second.load_whitelist_cache()
+            assert await second.get_whitelist_set(GUILD_ID) == set()
+
+            await first.add_whitelist(GUILD_ID, USER_ID, MODERATOR_ID)
+            await wait_until(lambda: ('whitelist', GUILD_ID) in received)
+            assert await second.get_whitelist_set(GUILD_ID) == {USER_ID}
+
+            version = second.get_permission_version(GUILD_ID)
+            await first.set_permission_level(GUILD_ID, 2, role_id=USER_ID)
+            await wait_until(lambda: ('permissions', GUILD_ID) in received)
+            assert second.get_permission_version(GUILD_ID) > version
+        finally:
+            await first.close()
+            await second.close()
+    asyncio.run(main())
@@ -0,0 +1,197 @@
+"""Shared suite for both storage backends
+
+SQLite always runs (temporary file). PostgreSQL runs when
+CROWBOT_TEST_POSTGRES_URL points to a local server, for example:
+
+    CROWBOT_TEST_POSTGRES_URL=postgresql://postgres@127.0.0.1:5432/postgres python -m pytest tests
+
+Each PostgreSQL test works in a throwaway schema, dropped at the end.
+"""
+import os
+import uuid
+import asyncio
+import pytest
+
+from database import Database, DEFAULT_COMMAND_PERMISSIONS
+from storage import PostgresBackend, SQLiteBackend
+from storage.postgres import asyncpg
+
+POSTGRES_URL = os.getenv('CROWBOT_TEST_POSTGRES_URL')
+
+# Discord snowflakes do not fit in 32 bits
+GUILD_ID = 1_100_000_000_000_000_001
+OTHER_GUILD_ID = 1_100_000_000_000_000_002
+USER_ID = 900_000_000_000_000_001
+MODERATOR_ID = 900_000_000_000_000_002
+
+def _with_search_path(url: str, schema: str) -> str:
+    # asyncpg passes unknown query parameters to the server as settings
+    return f"{url}{'&' if '?' in url else '?'}search_path={schema}"
+
+@pytest.fixture(params=['sqlite', 'postgresql'])
+def make_db(request, tmp_path):
+    """Database factory for the parametrised backend, to call inside the test's loop"""
+    schema = None
+    if request.param == 'postgresql':
+        if not POSTGRES_URL:
+            pytest.skip("CROWBOT_TEST_POSTGRES_URL not set")
+        if asyncpg is None:
+            pytest.skip("asyncpg not installed")
+        schema = f"crowbot_test_{uuid.uuid4().hex[:12]}"
+
+    async def factory() -> Database:
+        if schema is None:
+            backend = SQLiteBackend(str(tmp_path / 'test.db'))
+        else:
+            conn = await asyncpg.connect(POSTGRES_URL)
+            try:
+                await conn.execute(f'CREATE SCHEMA IF NOT EXISTS {schema}')
+            finally:
+                await conn.close()
+            backend = PostgresBackend(_with_search_path(POSTGRES_URL, schema))
+        db = Database(backend=backend)
+        await db.initialize()
+        return db
+
+    yield factory
+
+    if schema is not None:
+        async def drop():
+            conn = await asyncpg.connect(POSTGRES_URL)
+            try:
+                await conn.execute(f'DROP SCHEMA IF EXISTS {schema} CASCADE')
+            finally:
+                await conn.close()
+        asyncio.run(drop())
+
+def run(make_db, test):
+    """Run test(db) in a fresh loop, then close the database"""
+    async def main():
+        db = await make_db()
+        try:
+            await test(db)
+        finally:
+            await db.close()
+    asyncio.run(main())
+
+def test_schema_is_idempotent(make_db):
+    async def test(db):
+        await db.backend.create_schema()
+        assert await db.get_guild_prefix(GUILD_ID) is None
+    run(make_db, test)
+
+def test_prefix_upsert(make_db):
+    async def test(db):
+        await db.set_guild_prefix(GUILD_ID, '!')
+        await db.set_guild_prefix(GUILD_ID, '?')
+        assert await db.get_guild_prefix(GUILD_ID) == '?'
+        assert await db.get_guild_prefix(OTHER_GUILD_ID) is None
+    run(make_db, test)
+
+def test_bootstrap_and_permissions(make_db):
+    async def test(db):
+        assert await db.bootstrap_guilds([GUILD_ID, OTHER_GUILD_ID]) == 2
+        db.initialized_guilds.clear()
+        assert await db.bootstrap_guilds([GUILD_ID]) == 0
+
+        commands = await db.get_all_command_permissions(GUILD_ID)
+        assert commands == DEFAULT_COMMAND_PERMISSIONS
+
+        await db.set_command_permission(GUILD_ID, 'ban', 'perm5')
+        assert await db.get_command_permission_level(GUILD_ID, 'ban') == 'perm5'
+        assert await db.get_command_permission_level(OTHER_GUILD_ID, 'ban') == DEFAULT_COMMAND_PERMISSIONS['ban']
+
+        await db.set_permission_level(GUILD_ID, 2, role_id=USER_ID)
+        await db.set_permission_level(GUILD_ID, 2, role_id=USER_ID)
+        assert (await db.get_permission_levels(GUILD_ID))[2]['roles'] == [USER_ID]
+
+        await db.set_command_specific_permission(GUILD_ID, 'ban', user_id=USER_ID)
+        assert (await db.get_command_specific_permissions(GUILD_ID, 'ban'))['users'] == [USER_ID]
+    run(make_db, test)
+
+def test_ownership(make_db):
+    async def test(db):
+        code = await db.set_buyer(GUILD_ID, USER_ID)
+        assert await db.verify_recovery_code(GUILD_ID, code)
+        assert not await db.verify_recovery_code(GUILD_ID, 'wrong')
+
+        await db.add_owner(GUILD_ID, MODERATOR_ID, USER_ID)
+        await db.add_owner(GUILD_ID, MODERATOR_ID, USER_ID)
+        await db.load_ownership_cache()
+        assert await db.get_ownership(GUILD_ID) == (USER_ID, {MODERATOR_ID})
+
+        await db.remove_owner(GUILD_ID, MODERATOR_ID)
+        assert not await db.is_owner(GUILD_ID, MODERATOR_ID)
+    run(make_db, test)
+
+def test_infraction_pages(make_db):
+    async def test(db):
+        await db.add_infractions_bulk([
+            (GUILD_ID, USER_ID, MODERATOR_ID, 'warn', f'reason {i}', None) for i in range(25)
+        ])
+        assert await db.count_user_infractions(GUILD_ID, USER_ID) == 25
+
+        first = await db.get_user_infractions_page(GUILD_ID, USER_ID, limit=10)
+        second = await db.get_user_infractions_page(GUILD_ID, USER_ID, before_id=first[-1]['id'], limit=10)
+        back = await db.get_user_infractions_page(GUILD_ID, USER_ID, after_id=second[0]['id'], limit=10)
+        assert [row['reason'] for row in first] == [f'reason {i}' for i in range(24, 14, -1)]
+        assert second[0]['id'] < first[-1]['id']
+        assert back == first
+
+        rows = await db.get_rows_after('moderation_logs', GUILD_ID, 0, 100, ('id', 'guild_id', 'action'))
+        assert len(rows) == 25 and rows[0][1] == GUILD_ID
+    run(make_db, test)
+
+def test_retention_prune(make_db):
+    async def test(db):
+        await db.add_infractions_bulk([
+            (GUILD_ID, USER_ID, MODERATOR_ID, 'warn', 'r', None) for _ in range(30)
+        ], log_actions=False)
+        cutoff = await db.get_retention_cutoff_id('infractions', GUILD_ID, 10)
+        rows = await db.get_prunable_rows('infractions', GUILD_ID, max_id=cutoff, limit=500, columns=('id', 'reason'))
+        assert len(rows) == 20
+
+        await db.delete_rows('infractions', [row[0] for row in rows])
+        assert await db.count_user_infractions(GUILD_ID, USER_ID) == 10
+    run(make_db, test)
+
+def test_transaction_rollback(make_db):
+    async def test(db):
+        with pytest.raises(RuntimeError):
+            async with db.backend.transaction() as session:
+                await session.execute(
+                    'INSERT INTO guild_settings (guild_id, prefix) VALUES (?, ?)', (GUILD_ID, '!')
+                )
+                raise RuntimeError("rollback")
+        assert await db.backend.fetchone('SELECT prefix FROM guild_settings WHERE guild_id = ?', (GUILD_ID,)) is None
+    run(make_db, test)
+
+def test_concurrent_writes(make_db):
+    async def test(db):
+        await asyncio.gather(*(
+            db.add_infraction(GUILD_ID, USER_ID, MODERATOR_ID, 'warn', f'concurrent {i}')
+            for i in range(50)
+        ))
+        await asyncio.gather(*(db.set_guild_prefix(GUILD_ID, str(i)) for i in range(20)))
+        await asyncio.gather(*(db.add_whitelist(GUILD_ID, USER_ID + i, MODERATOR_ID) for i in range(20)))
+
+        assert await db.count_user_infractions(GUILD_ID, USER_ID) == 50
+        assert await db.get_guild_prefix(GUILD_ID) in {str(i) for i in range(20)}
+        assert len(await db.get_whitelist(GUILD_ID)) == 20
+    run(make_db, test)
+
+def test_permission_import_ids(make_db):
+    async def test(db):
+        document = await db.export_permissions(GUILD_ID)
+        document['levels'] = [{'level': 2, 'role_id': str(USER_ID), 'user_id': None}]
+        document['specific'] = [{'command': 'ban', 'role_id': None, 'user_id': str(MODERATOR_ID)}]
+        await db.import_permissions(GUILD_ID, document)
+        assert (await db.get_permission_levels(GUILD_ID))[2]['roles'] == [USER_ID]
+        assert (await db.get_command_specific_permissions(GUILD_ID, 'ban'))['users'] == [MODERATOR_ID]
+
+        document['levels'] = [{'level': 3, 'role_id': 'not-an-id', 'user_id': None}]
+        with pytest.raises(ValueError):
+            await db.import_permissions(GUILD_ID, document)
+        # Rejected before the transaction: the previous import is untouched
+        assert (await db.get_permission_levels(GUILD_ID))[2]['roles'] == [USER_ID]
+    run(make_db, test)
@@ -0,0 +1,79 @@
+import time
+from collections import deque
+from typing import List, Tuple
+
+# Bounds (in hours) of the account age histogram, the last bucket holds the rest
+AGE_BINS_HOURS = (1, 24, 24 * 7, 24 * 30)
+AGE_BIN_LABELS = ("< 1h", "< 1j", "< 7j", "< 30j", "≥ 30j")
+COHORT_MAX = 1000
+
+def age_bin(age_seconds: float) -> int:
+    """Histogram bucket index for an account age"""
+    hours = age_seconds / 3600
+    for index, bound in enumerate(AGE_BINS_HOURS):
+        if hours < bound:
+            return index
+    return len(AGE_BINS_HOURS)
+
+class JoinWindow:
+    """Constant-memory sliding-window join counter
+
+    The window is split into one-second slots reused as a ring; each slot
+    holds the number of joins, of recent accounts, and the account age
+    histogram.
+    """
+
+    __slots__ = ('size', 'ticks', 'joins', 'young', 'ages', 'cohort')
+
+    def __init__(self, window_seconds: int):
+        self.size = max(1, int(window_seconds))
+        self.ticks = [-1] * self.size
+        self.joins = [0] * self.size
+        self.young = [0] * self.size
+        self.ages = [[0] * (len(AGE_BINS_HOURS) + 1) for _ in range(self.size)]
+        # Latest joins (timestamp, id), bounded to stay O(1) per guild
+        self.cohort = deque(maxlen=COHORT_MAX)
+
+    def add(self, member_id: int, age_seconds: float, is_young: bool, now: float = None):
+        now = time.monotonic() if now is None else now
+        tick = int(now)
+        index = tick % self.size
+        if self.ticks[index] != tick:
+            self.ticks[index] = tick
+            self.joins[index] = 0
+            self.young[index] = 0
+            ages = self.ages[index]
+            for i in range(len(ages)):
+                ages[i] = 0
+        self.joins[index] += 1
+        if is_young:
+            self.young[index] += 1
+        self.ages[index][age_bin(age_seconds)] += 1
+        self.cohort.append((now, member_id))
+
+    def _live(self, now: float):
+        oldest = int(now) - self.size
+        return [index for index, tick in enumerate(self.ticks) if tick > oldest]
+
+    def counts(self, now: float = None) -> Tuple[int, int]:
+        """(joins, recent accounts) over the window"""
+        now = time.monotonic() if now is None else now
+        live = self._live(now)
+        return sum(self.joins[i] for i in live), sum(self.young[i] for i in live)
+
+    def histogram(self, now: float = None) -> List[int]:
+        now = time.monotonic() if now is None else now
+        totals = [0] * (len(AGE_BINS_HOURS) + 1)
+        for index in self._live(now):
+            for i, value in enumerate(self.ages[index]):
+                totals[i] += value
+        return totals
+
+    def recent_members(self, since: float) -> List[int]:
+        """IDs of members who joined since `since` (monotonic clock)"""
+        return [member_id for stamp, member_id in self.cohort if stamp >= since]
+
+    def reset(self):
+        for i in range(self.size):
+            self.ticks[i] = -1
+        self.cohort.clear()
@@ -0,0 +1,85 @@
+import time
+from collections import OrderedDict
+from typing import Optional
+
+IDLE_EXPIRY = 60.0
+MENTION_WINDOW = 10.0
+SWEEP_PER_MESSAGE = 2
+
+class SpamState:
+    """Compact anti-spam state of a member"""
+
+    __slots__ = ('tokens', 'mention_tokens', 'last_seen', 'fingerprint', 'repeats')
+
+    def __init__(self, capacity: float, mention_capacity: float, now: float):
+        self.tokens = capacity
+        self.mention_tokens = mention_capacity
+        self.last_seen = now
+        self.fingerprint = 0
+        self.repeats = 0
+
+class SpamTracker:
+    """Token buckets per (guild, member) with expiry of idle members
+
+    States are kept in order of last activity: the oldest sit at the front
+    and a few are evicted on every message, so memory stays bounded by the
+    number of members active within IDLE_EXPIRY.
+    """
+
+    def __init__(self, idle_expiry: float = IDLE_EXPIRY):
+        self.idle_expiry = idle_expiry
+        self.states: "OrderedDict[tuple, SpamState]" = OrderedDict()
+
+    def __len__(self):
+        return len(self.states)
+
+    def check(self, guild_id: int, user_id: int, content: str, mentions: int, settings: dict, now: Optional[float] = None) -> Optional[str]:
+        """Record a message and return the reason of an infraction, or None"""
+        now = time.monotonic() if now is None else now
+        states = self.states
+        capacity = settings['message_rate']
+        mention_capacity = settings['max_mentions']
+
+        # Lazy expiry of idle members
+        for _ in range(SWEEP_PER_MESSAGE):
+            if not states:
+                break
+            oldest_key = next(iter(states))
+            if now - states[oldest_key].last_seen < self.idle_expiry:
+                break
+            del states[oldest_key]
+
+        key = (guild_id, user_id)
+        state = states.get(key)
+        if state is None:
+            state = states[key] = SpamState(capacity, mention_capacity, now)
+        else:
+            states.move_to_end(key)
+            elapsed = now - state.last_seen
+            state.tokens = min(capacity, state.tokens + elapsed * capacity / settings['per_seconds'])
+            state.mention_tokens = min(mention_capacity, state.mention_tokens + elapsed * mention_capacity / MENTION_WINDOW)
+            state.last_seen = now
+
+        state.tokens -= 1
+        if state.tokens < 0:
+            return "flood"
+
+        if mentions:
+            state.mention_tokens -= mentions
+            if state.mention_tokens < 0:
+                return "mentions"
+
+        if content:
+            fingerprint = hash(content.strip().lower())
+            if fingerprint == state.fingerprint:
+                state.repeats += 1
+                if state.repeats >= settings['duplicate_threshold']:
+                    return "duplicate"
+            else:
+                state.fingerprint = fingerprint
+                state.repeats = 1
+
+        return None
+
+    def reset(self, guild_id: int, user_id: int):
+        self.states.pop((guild_id, user_id), None)
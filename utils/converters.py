@@ -1,10 +1,24 @@
 import discord
+from discord import app_commands
 from discord.ext import commands
 from typing import Union
 
-class MemberConverter(commands.MemberConverter):
+# For slash commands Discord resolves the option itself: the converters below
+# double as app command transformers typed as user/role options, so only the
+# prefix path runs the string matching.
+
+class MemberConverter(commands.MemberConverter, app_commands.Transformer):
     """Custom member converter that accepts names, mentions, and IDs"""
     
+    @property
+    def type(self) -> discord.AppCommandOptionType:
+        return discord.AppCommandOptionType.user
+    
+    async def transform(self, interaction: discord.Interaction, value) -> discord.Member:
+        if not isinstance(value, discord.Member):
+            raise app_commands.TransformerError(value, self.type, self)
+        return value
+    
     async def convert(self, ctx, argument: str) -> discord.Member:
         # Try the default converter first (mentions and IDs)
         try:
@@ -14,7 +28,7 @@ class MemberConverter(commands.MemberConverter):
         
         # Search by username or display name
         argument = argument.lower()
-        for member in ctx.guild.members:
+        for member in await ctx.bot.ensure_members(ctx.guild):
             if (member.name.lower() == argument or 
                 member.display_name.lower() == argument or
                 argument in member.name.lower() or
@@ -23,9 +37,16 @@ class MemberConverter(commands.MemberConverter):
         
         raise commands.MemberNotFound(f"Membre '{argument}' introuvable.")
 
-class RoleConverter(commands.RoleConverter):
+class RoleConverter(commands.RoleConverter, app_commands.Transformer):
     """Custom role converter that accepts names, mentions, and IDs"""
     
+    @property
+    def type(self) -> discord.AppCommandOptionType:
+        return discord.AppCommandOptionType.role
+    
+    async def transform(self, interaction: discord.Interaction, value) -> discord.Role:
+        return value
+    
     async def convert(self, ctx, argument: str) -> discord.Role:
         # Try the default converter first (mentions and IDs)
         try:
@@ -42,9 +63,16 @@ class RoleConverter(commands.RoleConverter):
         
         raise commands.RoleNotFound(f"Rôle '{argument}' introuvable.")
 
-class UserConverter(commands.UserConverter):
+class UserConverter(commands.UserConverter, app_commands.Transformer):
     """Custom user converter for unban command"""
     
+    @property
+    def type(self) -> discord.AppCommandOptionType:
+        return discord.AppCommandOptionType.user
+    
+    async def transform(self, interaction: discord.Interaction, value) -> discord.User:
+        return value
+    
     async def convert(self, ctx, argument: str) -> discord.User:
         # Try to convert as user ID first
         try:
@@ -0,0 +1,118 @@
+import os
+import io
+import csv
+import gzip
+import json
+import asyncio
+from typing import AsyncIterator, List, Optional, Tuple
+
+EXPORTABLE_TABLES = {
+    'moderation_logs': ('id', 'guild_id', 'user_id', 'moderator_id', 'action', 'reason', 'details', 'created_at'),
+    'infractions': ('id', 'guild_id', 'user_id', 'moderator_id', 'infraction_type', 'reason', 'duration', 'active', 'created_at'),
+}
+EXPORT_FORMATS = ('jsonl', 'csv')
+CHUNK_SIZE = 1000
+# Margin under the upload limit: gzip keeps a few blocks in memory before writing them
+PART_SIZE_MARGIN = 256 * 1024
+
+async def iter_row_chunks(db, table: str, guild_id: Optional[int] = None, chunk_size: int = CHUNK_SIZE) -> AsyncIterator[List[tuple]]:
+    """Walk a table in chunks of `chunk_size` rows, in id order
+
+    Each chunk is a short query paginated on the id: no read lock is held
+    between two chunks, so the bot keeps writing meanwhile.
+    """
+    if table not in EXPORTABLE_TABLES:
+        raise ValueError(f"Table non exportable : {table}")
+    columns = EXPORTABLE_TABLES[table]
+
+    last_id = 0
+    while True:
+        rows = await db.get_rows_after(table, guild_id, last_id, chunk_size, columns)
+        if not rows:
+            return
+        yield rows
+        last_id = rows[-1][0]
+        if len(rows) < chunk_size:
+            return
+
+class GzipPartWriter:
+    """Write successive .gz files, none larger than `part_limit` bytes"""
+
+    def __init__(self, out_dir: str, basename: str, fmt: str, columns: Tuple[str, ...], part_limit: int):
+        self.out_dir = out_dir
+        self.basename = basename
+        self.fmt = fmt
+        self.columns = columns
+        self.part_limit = max(part_limit - PART_SIZE_MARGIN, 64 * 1024)
+        self.paths: List[str] = []
+        self._raw = None
+        self._gzip = None
+        self._text = None
+        self._csv = None
+
+    def _open(self):
+        path = os.path.join(self.out_dir, f"{self.basename}.part{len(self.paths) + 1}.{self.fmt}.gz")
+        self.paths.append(path)
+        self._raw = open(path, 'wb')
+        self._gzip = gzip.GzipFile(fileobj=self._raw, mode='wb')
+        self._text = io.TextIOWrapper(self._gzip, encoding='utf-8', newline='')
+        if self.fmt == 'csv':
+            self._csv = csv.writer(self._text)
+            self._csv.writerow(self.columns)
+
+    def _close_part(self):
+        if self._text is not None:
+            self._text.close()
+            self._raw.flush()
+            os.fsync(self._raw.fileno())
+            self._raw.close()
+            self._raw = self._gzip = self._text = self._csv = None
+
+    def write(self, row: Tuple):
+        if self._raw is None:
+            self._open()
+        if self.fmt == 'csv':
+            self._csv.writerow(row)
+        else:
+            self._text.write(json.dumps(dict(zip(self.columns, row)), ensure_ascii=False))
+            self._text.write('\n')
+        if self._raw.tell() >= self.part_limit:
+            self._close_part()
+
+    def write_rows(self, rows):
+        for row in rows:
+            self.write(row)
+
+    def flush(self):
+        """Push the rows written so far to disk (the current part is readable up to here)"""
+        if self._text is not None:
+            self._text.flush()
+            self._gzip.flush()
+            self._raw.flush()
+            os.fsync(self._raw.fileno())
+
+    def close(self) -> List[str]:
+        self._close_part()
+        return self.paths
+
+async def export_table(db, table: str, out_dir: str, fmt: str = 'jsonl', guild_id: Optional[int] = None,
+                       part_limit: int = 8 * 1024 * 1024, chunk_size: int = CHUNK_SIZE) -> Tuple[List[str], int]:
+    """Export a table as compressed JSONL/CSV files, split under `part_limit`
+
+    Memory stays constant whatever the row count: only one chunk is held,
+    and compression runs in a thread so the loop is never blocked.
+    Returns the list of files created and the number of rows.
+    """
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Format inconnu : {fmt}")
+
+    suffix = f"_{guild_id}" if guild_id is not None else ""
+    writer = GzipPartWriter(out_dir, f"{table}{suffix}", fmt, EXPORTABLE_TABLES[table], part_limit)
+    count = 0
+    try:
+        async for rows in iter_row_chunks(db, table, guild_id=guild_id, chunk_size=chunk_size):
+            await asyncio.to_thread(writer.write_rows, rows)
+            count += len(rows)
+    finally:
+        paths = await asyncio.to_thread(writer.close)
+    return paths, count
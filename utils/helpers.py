@@ -1,6 +1,6 @@
 import re
 import time
-from typing import Optional
+from typing import Optional, List
 
 def parse_time(time_str: str) -> Optional[int]:
     """Parse time string like '1h30m' into seconds"""
@@ -21,6 +21,15 @@ def parse_time(time_str: str) -> Optional[int]:
     
     return total_seconds
 
+USER_ID_REGEX = re.compile(r'<@!?(\d{15,20})>|\b(\d{15,20})\b')
+
+def extract_user_ids(text: str) -> List[int]:
+    """Extract user IDs and mentions from text, keeping order and dropping duplicates"""
+    seen = {}
+    for mention_id, raw_id in USER_ID_REGEX.findall(text or ""):
+        seen.setdefault(int(mention_id or raw_id), None)
+    return list(seen)
+
 def format_time(seconds: int) -> str:
     """Format seconds into human readable time"""
     if seconds < 60:
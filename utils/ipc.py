@@ -0,0 +1,170 @@
+import os
+import json
+import math
+import time
+import asyncio
+import logging
+import resource
+from typing import Any, Dict, Optional
+
+STATS_INTERVAL = 10.0
+RECONNECT_DELAY = 2.0
+REQUEST_TIMEOUT = 10.0
+
+async def send_message(writer: asyncio.StreamWriter, message: Dict[str, Any]):
+    """Send a newline-terminated JSON message"""
+    writer.write(json.dumps(message, separators=(',', ':')).encode() + b'\n')
+    await writer.drain()
+
+async def read_message(reader: asyncio.StreamReader) -> Optional[Dict[str, Any]]:
+    """Read a message, or None once the connection is closed"""
+    line = await reader.readline()
+    if not line:
+        return None
+    return json.loads(line)
+
+def rss_bytes() -> int:
+    """Resident memory of the process"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError):
+        # Outside Linux: peak memory (KiB on Linux/BSD)
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+class ClusterClient:
+    """Link between a worker process and the cluster coordinator
+
+    Publishes cache invalidations, receives those of the other workers,
+    asks for a slot before every IDENTIFY and reports its statistics.
+    """
+
+    def __init__(self, socket_path: str, cluster_id: int):
+        self.socket_path = socket_path
+        self.cluster_id = cluster_id
+        self.bot = None
+        self.started_at = time.time()
+        self.logger = logging.getLogger('chdfz gestion.cluster')
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._connected = asyncio.Event()
+        self._pending: Dict[int, asyncio.Future] = {}
+        self._nonce = 0
+        self._tasks = []
+        # Held until sent: the loop only keeps weak references to tasks
+        self._publish_tasks = set()
+
+    async def start(self, bot):
+        self.bot = bot
+        self._tasks = [
+            asyncio.create_task(self._connection_loop()),
+            asyncio.create_task(self._stats_loop())
+        ]
+        await asyncio.wait_for(self._connected.wait(), timeout=REQUEST_TIMEOUT)
+
+    async def close(self):
+        pending = [*self._tasks, *self._publish_tasks]
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+        if self._writer:
+            self._writer.close()
+
+    async def _connection_loop(self):
+        while True:
+            try:
+                reader, self._writer = await asyncio.open_unix_connection(self.socket_path)
+                await send_message(self._writer, {'op': 'hello', 'cluster_id': self.cluster_id, 'pid': os.getpid()})
+                self._connected.set()
+                while True:
+                    message = await read_message(reader)
+                    if message is None:
+                        break
+                    await self._handle(message)
+            except (OSError, ConnectionError, json.JSONDecodeError) as e:
+                self.logger.warning(f"Cluster {self.cluster_id}: coordinator link lost ({e})")
+            finally:
+                self._connected.clear()
+                self._writer = None
+                for future in self._pending.values():
+                    if not future.done():
+                        future.set_exception(ConnectionError("coordinator link lost"))
+                self._pending.clear()
+            await asyncio.sleep(RECONNECT_DELAY)
+
+    async def _handle(self, message: Dict[str, Any]):
+        op = message.get('op')
+        if op == 'invalidate':
+            await self.bot.db.apply_invalidation(message['kind'], message.get('guild_id'))
+            self.bot.dispatch('cache_invalidate', message['kind'], message.get('guild_id'))
+        elif op == 'reply':
+            future = self._pending.pop(message.get('nonce'), None)
+            if future and not future.done():
+                future.set_result(message.get('data'))
+
+    async def _send(self, message: Dict[str, Any]):
+        await self._connected.wait()
+        await send_message(self._writer, message)
+
+    async def request(self, op: str, timeout: Optional[float] = REQUEST_TIMEOUT, **payload) -> Any:
+        """Send a request to the coordinator and wait for its reply"""
+        self._nonce += 1
+        nonce = self._nonce
+        future = asyncio.get_running_loop().create_future()
+        self._pending[nonce] = future
+        try:
+            await self._send({'op': op, 'nonce': nonce, **payload})
+            return await asyncio.wait_for(future, timeout=timeout)
+        finally:
+            self._pending.pop(nonce, None)
+
+    def publish_invalidation(self, kind: str, guild_id: Optional[int]):
+        """Broadcast an invalidation to the other workers (without waiting)"""
+        if self._writer is None:
+            return
+        task = asyncio.create_task(
+            self._send({'op': 'invalidate', 'kind': kind, 'guild_id': guild_id}),
+            name=f"invalidate-{kind}-{guild_id}"
+        )
+        self._publish_tasks.add(task)
+        task.add_done_callback(self._publish_done)
+
+    def _publish_done(self, task: asyncio.Task):
+        self._publish_tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            # Other workers keep serving the stale entry until it expires or is reloaded
+            self.logger.warning(
+                f"Cluster {self.cluster_id}: failed to publish invalidation {task.get_name()} ({task.exception()!r})"
+            )
+
+    async def acquire_identify(self, shard_id: int):
+        """Wait for the IDENTIFY slot granted by the coordinator (shared between processes)"""
+        await self.request('identify', timeout=None, shard_id=shard_id)
+
+    def collect_stats(self) -> Dict[str, Any]:
+        bot = self.bot
+        return {
+            'cluster_id': self.cluster_id,
+            'pid': os.getpid(),
+            'shards': {
+                str(shard_id): {
+                    'latency_ms': round(shard.latency * 1000, 1) if math.isfinite(shard.latency) else None,
+                    'closed': shard.is_closed()
+                }
+                for shard_id, shard in bot.shards.items()
+            },
+            'guilds': len(bot.guilds),
+            'members': sum(guild.member_count or 0 for guild in bot.guilds),
+            'ready': bot.is_ready(),
+            'rss_bytes': rss_bytes(),
+            'uptime': round(time.time() - self.started_at)
+        }
+
+    async def _stats_loop(self):
+        while True:
+            await asyncio.sleep(STATS_INTERVAL)
+            if self._writer is None:
+                continue
+            try:
+                await self._send({'op': 'stats', 'data': self.collect_stats()})
+            except (OSError, ConnectionError) as e:
+                self.logger.warning(f"Cluster {self.cluster_id}: failed to send stats ({e})")
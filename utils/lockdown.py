@@ -0,0 +1,128 @@
+import asyncio
+import discord
+from typing import List, Optional
+
+LOCKDOWN_CONCURRENCY = 10
+
+class LockdownResult:
+    """Outcome of a lock or restore"""
+
+    def __init__(self):
+        self.changed = 0
+        self.skipped = 0
+        self.failed = 0
+
+def lockable_channels(guild: discord.Guild) -> List[discord.abc.GuildChannel]:
+    """Text channels the bot is able to lock"""
+    me = guild.me
+    return [
+        channel for channel in guild.text_channels
+        if channel.permissions_for(me).manage_roles
+    ]
+
+def _locked_overwrite(overwrite: discord.PermissionOverwrite) -> discord.PermissionOverwrite:
+    locked = discord.PermissionOverwrite.from_pair(*overwrite.pair())
+    locked.send_messages = False
+    locked.send_messages_in_threads = False
+    locked.create_public_threads = False
+    return locked
+
+async def _run_bounded(coros, concurrency: int, result: LockdownResult):
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def runner(coro):
+        async with semaphore:
+            try:
+                await coro
+                result.changed += 1
+                return True
+            except discord.NotFound:
+                result.skipped += 1
+            except discord.HTTPException:
+                result.failed += 1
+            return False
+
+    return await asyncio.gather(*(runner(coro) for coro in coros))
+
+async def lock_channels(
+    db,
+    guild: discord.Guild,
+    channels: List[discord.abc.GuildChannel],
+    reason: Optional[str] = None,
+    concurrency: int = LOCKDOWN_CONCURRENCY
+) -> LockdownResult:
+    """Lock channels after saving the @everyone overwrite of each one"""
+    result = LockdownResult()
+    everyone = guild.default_role
+
+    snapshots = []
+    to_lock = []
+    for channel in channels:
+        existing = channel.overwrites.get(everyone)
+        overwrite = existing or discord.PermissionOverwrite()
+        if overwrite.send_messages is False:
+            # Already locked: nothing to save or change
+            result.skipped += 1
+            continue
+        allow, deny = overwrite.pair()
+        snapshots.append((channel.id, allow.value, deny.value, existing is not None))
+        to_lock.append((channel, _locked_overwrite(overwrite)))
+
+    if not to_lock:
+        return result
+
+    # The snapshot is written before any change so it can always be restored
+    await db.save_lockdown_snapshots(guild.id, snapshots)
+
+    await _run_bounded(
+        (channel.set_permissions(everyone, overwrite=overwrite, reason=reason) for channel, overwrite in to_lock),
+        concurrency, result
+    )
+    return result
+
+async def unlock_channels(
+    db,
+    guild: discord.Guild,
+    channel_ids: Optional[List[int]] = None,
+    reason: Optional[str] = None,
+    concurrency: int = LOCKDOWN_CONCURRENCY
+) -> LockdownResult:
+    """Restore exactly the saved @everyone overwrites"""
+    result = LockdownResult()
+    everyone = guild.default_role
+
+    snapshots = await db.get_lockdown_snapshots(guild.id, channel_ids)
+    restorable = []
+    gone = []
+    for snapshot in snapshots:
+        channel = guild.get_channel(snapshot['channel_id'])
+        if channel is None:
+            gone.append(snapshot['channel_id'])
+            continue
+        if snapshot['had_overwrite']:
+            overwrite = discord.PermissionOverwrite.from_pair(
+                discord.Permissions(snapshot['allow']),
+                discord.Permissions(snapshot['deny'])
+            )
+        else:
+            overwrite = None
+        restorable.append((channel, overwrite))
+
+    outcomes = await _run_bounded(
+        (channel.set_permissions(everyone, overwrite=overwrite, reason=reason) for channel, overwrite in restorable),
+        concurrency, result
+    )
+
+    restored = [channel.id for (channel, _), ok in zip(restorable, outcomes) if ok]
+    result.skipped += len(gone)
+    if restored or gone:
+        await db.delete_lockdown_snapshots(guild.id, restored + gone)
+    return result
+
+async def lock_guild(db, guild: discord.Guild, reason: Optional[str] = None, concurrency: int = LOCKDOWN_CONCURRENCY) -> LockdownResult:
+    """Lock every text channel of the guild"""
+    return await lock_channels(db, guild, lockable_channels(guild), reason=reason, concurrency=concurrency)
+
+async def unlock_guild(db, guild: discord.Guild, reason: Optional[str] = None, concurrency: int = LOCKDOWN_CONCURRENCY) -> LockdownResult:
+    """Restore every locked channel of the guild"""
+    return await unlock_channels(db, guild, reason=reason, concurrency=concurrency)
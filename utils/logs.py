@@ -0,0 +1,146 @@
+import os
+import copy
+import gzip
+import json
+import time
+import queue
+import atexit
+import shutil
+import logging
+import logging.handlers
+from typing import Optional
+
+TEXT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+# Optional fields passed with extra={...}, copied into JSON lines when present
+STRUCTURED_FIELDS = ('guild_id', 'channel_id', 'user_id', 'command', 'latency_ms', 'source', 'worker', 'rss_bytes', 'cache_counts')
+
+class CompressingRotatingFileHandler(logging.handlers.RotatingFileHandler):
+    """Log file rotated by size and age, older files are compressed to .gz"""
+
+    def __init__(self, filename: str, max_bytes: int, interval: float, backup_count: int):
+        super().__init__(filename, maxBytes=max_bytes, backupCount=backup_count, encoding='utf-8', delay=True)
+        self.interval = interval
+        self.rollover_at = self._next_rollover()
+        self.namer = lambda name: name + '.gz'
+        self.rotator = self._compress
+
+    def _next_rollover(self) -> float:
+        return time.time() + self.interval if self.interval > 0 else float('inf')
+
+    @staticmethod
+    def _compress(source: str, dest: str):
+        with open(source, 'rb') as src, gzip.open(dest, 'wb') as dst:
+            shutil.copyfileobj(src, dst)
+        os.remove(source)
+
+    def shouldRollover(self, record: logging.LogRecord) -> bool:
+        if time.time() >= self.rollover_at:
+            return True
+        return bool(super().shouldRollover(record))
+
+    def doRollover(self):
+        super().doRollover()
+        self.rollover_at = self._next_rollover()
+
+class JsonFormatter(logging.Formatter):
+    """One JSON line per record, with the structured fields passed in extra"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'time': self.formatTime(record),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage()
+        }
+        for field in STRUCTURED_FIELDS:
+            value = getattr(record, field, None)
+            if value is not None:
+                entry[field] = value
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry['exception'] = record.exc_text
+        if record.stack_info:
+            entry['stack'] = self.formatStack(record.stack_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+class LocalQueueHandler(logging.handlers.QueueHandler):
+    """In-process queue: the exception stays attached to the record
+
+    QueueHandler.prepare formats the message and traceback in the calling
+    thread, then clears exc_info, which leaves JsonFormatter without its
+    `exception` field. Here only the message is frozen; the traceback is
+    formatted by the writer thread.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        return record
+
+class WorkerFilter(logging.Filter):
+    """Add the process name (coordinator, cluster N) to every record"""
+
+    def __init__(self, worker: str):
+        super().__init__()
+        self.worker = worker
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.worker = self.worker
+        return True
+
+def setup_logging(config, filename: str = 'crowbot.log', worker: Optional[str] = None) -> logging.handlers.QueueListener:
+    """The calling thread only puts records on a queue; a dedicated thread
+    formats and writes them (rotated file + console)"""
+    if config.log_format == 'json':
+        formatter = JsonFormatter()
+    else:
+        fmt = TEXT_FORMAT if worker is None else TEXT_FORMAT.replace('%(name)s', f'{worker} - %(name)s')
+        formatter = logging.Formatter(fmt)
+
+    file_handler = CompressingRotatingFileHandler(
+        filename,
+        max_bytes=config.log_max_bytes,
+        interval=config.log_rotate_hours * 3600,
+        backup_count=config.log_backup_count
+    )
+    console_handler = logging.StreamHandler()
+    for handler in (file_handler, console_handler):
+        handler.setFormatter(formatter)
+
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    queue_handler = LocalQueueHandler(log_queue)
+    if worker is not None:
+        queue_handler.addFilter(WorkerFilter(worker))
+
+    root = logging.getLogger()
+    root.setLevel(config.log_level)
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+
+    listener = logging.handlers.QueueListener(log_queue, file_handler, console_handler, respect_handler_level=True)
+    listener.start()
+    # Flush what is still queued when the process exits
+    atexit.register(listener.stop)
+    return listener
+
+def setup_dedicated_log(config, logger_name: str, filename: str) -> logging.handlers.QueueListener:
+    """Copy a logger's records to its own rotated file, written off the loop"""
+    file_handler = CompressingRotatingFileHandler(
+        filename,
+        max_bytes=config.log_max_bytes,
+        interval=config.log_rotate_hours * 3600,
+        backup_count=config.log_backup_count
+    )
+    file_handler.setFormatter(JsonFormatter() if config.log_format == 'json' else logging.Formatter(TEXT_FORMAT))
+
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    logging.getLogger(logger_name).addHandler(LocalQueueHandler(log_queue))
+
+    listener = logging.handlers.QueueListener(log_queue, file_handler)
+    listener.start()
+    atexit.register(listener.stop)
+    return listener
@@ -0,0 +1,166 @@
+import sys
+import time
+import types
+import asyncio
+import tracemalloc
+from collections import Counter, deque
+from typing import Any, Dict, List, Optional, Tuple
+import discord
+from discord.state import ConnectionState
+
+# Objects shared by the whole cache: never counted as part of a member or message
+SHARED_TYPES = (
+    discord.Client, ConnectionState, discord.Guild, discord.Role,
+    discord.abc.GuildChannel, discord.Thread,
+    type, types.ModuleType, types.FunctionType, types.MethodType
+)
+
+SAMPLE_SIZE = 50
+
+def deep_sizeof(obj: Any, skip: tuple = SHARED_TYPES) -> int:
+    """Size in bytes of an object and what it references, shared objects excluded"""
+    total = 0
+    seen = set()
+    stack = [obj]
+    while stack:
+        current = stack.pop()
+        if id(current) in seen or (current is not obj and isinstance(current, skip)):
+            continue
+        seen.add(id(current))
+        total += sys.getsizeof(current)
+
+        if isinstance(current, dict):
+            stack.extend(current.keys())
+            stack.extend(current.values())
+        elif isinstance(current, (list, tuple, set, frozenset)):
+            stack.extend(current)
+        elif not isinstance(current, (str, bytes, int, float)):
+            for cls in type(current).__mro__:
+                for slot in getattr(cls, '__slots__', ()):
+                    if slot != '__weakref__' and hasattr(current, slot):
+                        stack.append(getattr(current, slot))
+            if hasattr(current, '__dict__'):
+                stack.append(current.__dict__)
+    return total
+
+def _sampled_total(items: List[Any]) -> int:
+    """Extrapolate the size of a list from a sample"""
+    if not items:
+        return 0
+    step = max(1, len(items) // SAMPLE_SIZE)
+    sample = items[::step][:SAMPLE_SIZE]
+    return sum(deep_sizeof(item) for item in sample) * len(items) // len(sample)
+
+def guild_cache_report(bot) -> List[Dict[str, Any]]:
+    """Estimated memory of cached members, channels, roles and messages, per guild"""
+    messages_by_guild: Dict[int, List[discord.Message]] = {}
+    for message in bot.cached_messages:
+        if message.guild is not None:
+            messages_by_guild.setdefault(message.guild.id, []).append(message)
+
+    report = []
+    for guild in bot.guilds:
+        members = list(guild.members)
+        messages = messages_by_guild.get(guild.id, [])
+        entry = {
+            'guild_id': guild.id,
+            'name': guild.name,
+            'member_count': guild.member_count or 0,
+            'cached_members': len(members),
+            'chunked': guild.chunked,
+            'cached_messages': len(messages),
+            'members_bytes': _sampled_total(members),
+            'channels_bytes': sum(deep_sizeof(channel) for channel in guild.channels),
+            'roles_bytes': sum(deep_sizeof(role) for role in guild.roles),
+            'messages_bytes': _sampled_total(messages)
+        }
+        entry['total_bytes'] = (
+            entry['members_bytes'] + entry['channels_bytes'] + entry['roles_bytes'] + entry['messages_bytes']
+        )
+        report.append(entry)
+
+    report.sort(key=lambda entry: entry['total_bytes'], reverse=True)
+    return report
+
+# Containers held by cogs and the database layer, reported by cache_object_counts()
+COUNTED_CONTAINERS = (dict, list, set, frozenset, deque)
+# Noise from tracemalloc itself and from the import machinery
+SNAPSHOT_FILTERS = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+    tracemalloc.Filter(False, '<frozen importlib._bootstrap_external>'),
+    tracemalloc.Filter(False, '<unknown>')
+)
+
+def _container_sizes(prefix: str, obj: Any) -> Dict[str, int]:
+    return {
+        f'{prefix}.{name}': len(value)
+        for name, value in vars(obj).items()
+        if isinstance(value, COUNTED_CONTAINERS) and not name.startswith('__')
+    }
+
+def cache_object_counts(bot) -> Dict[str, int]:
+    """Number of objects in the discord.py, cog and database caches"""
+    state = bot._connection
+    counts = {
+        'guilds': len(bot.guilds),
+        'members': sum(len(guild._members) for guild in bot.guilds),
+        'users': len(state._users),
+        'messages': len(bot.cached_messages),
+        'views': len(state._view_store._synced_message_views),
+        'tasks': len(asyncio.all_tasks()),
+        'db.cache.local': len(bot.db.cache.local)
+    }
+    counts.update(_container_sizes('db', bot.db))
+    for name, cog in bot.cogs.items():
+        counts.update(_container_sizes(name, cog))
+    return counts
+
+def task_counts(limit: int = 10) -> List[Tuple[str, int]]:
+    """Live asyncio tasks grouped by coroutine (to spot sleeping tasks piling up)"""
+    counter = Counter(
+        getattr(task.get_coro(), '__qualname__', str(task.get_coro()))
+        for task in asyncio.all_tasks()
+    )
+    return counter.most_common(limit)
+
+class TracemallocSession:
+    """On-demand allocation tracing, compared against a baseline snapshot"""
+
+    def __init__(self):
+        self.baseline: Optional[tracemalloc.Snapshot] = None
+        self.baseline_at: Optional[float] = None
+
+    @property
+    def tracing(self) -> bool:
+        return tracemalloc.is_tracing()
+
+    @staticmethod
+    def _snapshot() -> tracemalloc.Snapshot:
+        return tracemalloc.take_snapshot().filter_traces(SNAPSHOT_FILTERS)
+
+    def start(self, frames: int = 1):
+        """Start tracing (costs memory and CPU while active) and take the baseline"""
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(frames)
+        self.reset_baseline()
+
+    def reset_baseline(self):
+        self.baseline = self._snapshot()
+        self.baseline_at = time.time()
+
+    def stop(self):
+        tracemalloc.stop()
+        self.baseline = None
+        self.baseline_at = None
+
+    def diff(self, key_type: str = 'lineno') -> List[tracemalloc.StatisticDiff]:
+        """Growth per allocation site since the baseline"""
+        return self._snapshot().compare_to(self.baseline, key_type)
+
+def format_stat(stat: tracemalloc.StatisticDiff) -> str:
+    frame = stat.traceback[0]
+    return (
+        f"{stat.size_diff / 1024:+.1f} Ko ({stat.count_diff:+d} objets, "
+        f"{stat.size / 1024:.1f} Ko au total) {frame.filename}:{frame.lineno}"
+    )
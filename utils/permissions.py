@@ -56,15 +56,11 @@ def owner_only():
         if not ctx.guild:
             return False
         
-        # Check if user is owner
-        try:
-            is_owner = await ctx.bot.is_owner_user(ctx.author.id)
-            if not is_owner:
-                raise PermissionError("Seuls les owners peuvent utiliser cette commande.")
-        except AttributeError:
-            # Method not available, fallback to bot owner check
-            if not await ctx.bot.is_owner(ctx.author):
-                raise PermissionError("Seuls les owners peuvent utiliser cette commande.")
+        # Bot owner, then owners and buyer of this guild
+        if await ctx.bot.is_owner(ctx.author):
+            return True
+        if not await ctx.bot.is_owner_user(ctx.author.id, ctx.guild.id):
+            raise PermissionError("Seuls les owners peuvent utiliser cette commande.")
         
         return True
     
@@ -76,15 +72,11 @@ def buyer_only():
         if not ctx.guild:
             return False
         
-        # Check if user is buyer
-        try:
-            is_buyer = await ctx.bot.is_buyer_user(ctx.author.id)
-            if not is_buyer:
-                raise PermissionError("Seul le buyer peut utiliser cette commande.")
-        except AttributeError:
-            # Method not available, fallback to bot owner check
-            if not await ctx.bot.is_owner(ctx.author):
-                raise PermissionError("Seul le buyer peut utiliser cette commande.")
+        # Bot owner, then the buyer of this guild
+        if await ctx.bot.is_owner(ctx.author):
+            return True
+        if not await ctx.bot.is_buyer_user(ctx.author.id, ctx.guild.id):
+            raise PermissionError("Seul le buyer peut utiliser cette commande.")
         
         return True
     
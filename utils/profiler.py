@@ -0,0 +1,110 @@
+import os
+import sys
+import time
+import asyncio
+from collections import Counter
+from typing import List, Tuple
+
+from utils.watchdog import current_task_label
+
+SAMPLE_INTERVAL = 0.005
+IDLE_LABEL = 'idle (waiting for events)'
+# Frames of the event loop machinery itself, dropped from the top of each stack
+LOOP_FRAMES = ('run_forever', '_run_once', '_run', 'run', 'run_until_complete', 'runner', '<module>')
+
+def _frame_label(code) -> str:
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+class SamplingProfiler:
+    """Dependency-free sampling profiler for the asyncio loop thread
+
+    A thread reads the loop thread's stack every `interval` seconds. Each
+    stack is grouped under the running asyncio task and counted in the
+    "collapsed stacks" format used by flamegraph tools.
+    """
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, thread_id: int, interval: float = SAMPLE_INTERVAL):
+        self.loop = loop
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self.idle = 0
+        self.elapsed = 0.0
+
+    def run(self, seconds: float):
+        """Sample for `seconds` seconds (call from outside the loop thread)"""
+        # The sampler needs the GIL: a shorter switch interval lets it in while the loop
+        # runs Python code, instead of mostly when the loop releases it in select()
+        switch_interval = sys.getswitchinterval()
+        sys.setswitchinterval(min(switch_interval, self.interval / 5))
+        started = time.perf_counter()
+        deadline = started + seconds
+        try:
+            while time.perf_counter() < deadline:
+                frame = sys._current_frames().get(self.thread_id)
+                if frame is not None:
+                    self._record(frame)
+                time.sleep(self.interval)
+        finally:
+            sys.setswitchinterval(switch_interval)
+        self.elapsed = time.perf_counter() - started
+
+    def _record(self, frame):
+        codes = []
+        while frame is not None:
+            codes.append(frame.f_code)
+            frame = frame.f_back
+        codes.reverse()
+        while codes and codes[0].co_name in LOOP_FRAMES:
+            codes.pop(0)
+
+        self.samples += 1
+        task = current_task_label(self.loop)
+        if task is None:
+            # Between callbacks: either waiting in the selector or running a plain callback
+            if codes and codes[-1].co_name == 'select':
+                self.idle += 1
+                self.stacks[(IDLE_LABEL,)] += 1
+                return
+            task = 'callbacks'
+        self.stacks[(task.replace(';', ','),) + tuple(_frame_label(code) for code in codes)] += 1
+
+    def collapsed(self) -> str:
+        """One "task;frame;...;frame N" line per stack, for flamegraph.pl, speedscope..."""
+        return ''.join(f"{';'.join(stack)} {count}\n" for stack, count in self.stacks.most_common())
+
+    def top_functions(self, limit: int = 15) -> List[Tuple[str, int, int]]:
+        """(function, self samples, cumulative samples) of the most seen functions"""
+        own: Counter = Counter()
+        total: Counter = Counter()
+        for stack, count in self.stacks.items():
+            if stack == (IDLE_LABEL,):
+                continue
+            frames = stack[1:]
+            if frames:
+                own[frames[-1]] += count
+            for label in set(frames):
+                total[label] += count
+        return [(label, own[label], total[label]) for label, _ in total.most_common(limit)]
+
+    def top_tasks(self, limit: int = 10) -> List[Tuple[str, int]]:
+        tasks: Counter = Counter()
+        for stack, count in self.stacks.items():
+            if stack != (IDLE_LABEL,):
+                tasks[stack[0]] += count
+        return tasks.most_common(limit)
+
+    def report(self) -> str:
+        """Text report: busiest tasks, then most sampled functions"""
+        busy = self.samples - self.idle
+        lines = [
+            f"{self.samples} échantillons en {self.elapsed:.1f} s (toutes les {self.interval * 1000:.0f} ms)",
+            f"Boucle occupée : {busy} ({busy / max(1, self.samples):.0%}), en attente : {self.idle}",
+            "",
+            "Tâches :"
+        ]
+        lines += [f"  {count:6d}  {task}" for task, count in self.top_tasks()]
+        lines += ["", "Fonctions (propre / cumulé) :"]
+        lines += [f"  {own:6d} {total:6d}  {label}" for label, own, total in self.top_functions()]
+        return "\n".join(lines) + "\n"
@@ -0,0 +1,237 @@
+import re
+import time
+import asyncio
+import datetime
+import discord
+from typing import Optional, Callable, Awaitable, Set
+
+# Discord refuses bulk deletion of messages older than 14 days
+BULK_DELETE_MAX_AGE = datetime.timedelta(days=14, minutes=-5)
+BULK_DELETE_CHUNK = 100
+MAX_PURGE = 10000
+MAX_SCAN = 50000
+# Pinned messages per channel: never purged, so an unfiltered purge scans past them
+MAX_PINS = 250
+
+LINK_REGEX = re.compile(r'(https?://\S+|discord\.gg/\S+|www\.\S+)', re.IGNORECASE)
+
+class PurgeFilter:
+    """Filter applied to every message of the history"""
+
+    def __init__(self):
+        self.author_ids: Set[int] = set()
+        self.bots = False
+        self.attachments = False
+        self.links = False
+        self.regex: Optional[re.Pattern] = None
+        self.before: Optional[discord.Object] = None
+        self.after: Optional[discord.Object] = None
+
+    @property
+    def is_empty(self) -> bool:
+        return not (self.author_ids or self.bots or self.attachments or self.links or self.regex)
+
+    def __call__(self, message: discord.Message) -> bool:
+        if message.pinned:
+            return False
+        if self.author_ids and message.author.id not in self.author_ids:
+            return False
+        if self.bots and not message.author.bot:
+            return False
+        if self.attachments and not message.attachments:
+            return False
+        if self.links and not LINK_REGEX.search(message.content):
+            return False
+        if self.regex and not self.regex.search(message.content):
+            return False
+        return True
+
+    def describe(self) -> str:
+        parts = []
+        if self.author_ids:
+            parts.append("auteurs: " + ", ".join(f"<@{user_id}>" for user_id in self.author_ids))
+        if self.bots:
+            parts.append("bots")
+        if self.attachments:
+            parts.append("fichiers")
+        if self.links:
+            parts.append("liens")
+        if self.regex:
+            parts.append(f"regex: `{self.regex.pattern}`")
+        if self.before:
+            parts.append(f"avant: {self.before.id}")
+        if self.after:
+            parts.append(f"après: {self.after.id}")
+        return ", ".join(parts) or "aucun"
+
+def parse_purge_filters(args: Optional[str]) -> PurgeFilter:
+    """Parse purge filters
+
+    Accepted filters: @membre/ID, bots, fichiers, liens, regex:<motif>,
+    before:<id_message>, after:<id_message>
+    """
+    purge_filter = PurgeFilter()
+    if not args:
+        return purge_filter
+
+    # regex:<motif> takes the rest of the line so the pattern may contain spaces
+    regex_index = args.lower().find("regex:")
+    if regex_index != -1:
+        pattern = args[regex_index + len("regex:"):].strip()
+        args = args[:regex_index]
+        try:
+            purge_filter.regex = re.compile(pattern, re.IGNORECASE)
+        except re.error as e:
+            raise ValueError(f"Regex invalide : {e}")
+
+    for token in args.split():
+        lowered = token.lower()
+        if lowered in ("bots", "bot"):
+            purge_filter.bots = True
+        elif lowered in ("fichiers", "files", "attachments", "images"):
+            purge_filter.attachments = True
+        elif lowered in ("liens", "links", "link"):
+            purge_filter.links = True
+        elif lowered.startswith(("before:", "avant:")):
+            purge_filter.before = discord.Object(id=_parse_id(token.split(":", 1)[1]))
+        elif lowered.startswith(("after:", "apres:", "après:")):
+            purge_filter.after = discord.Object(id=_parse_id(token.split(":", 1)[1]))
+        else:
+            purge_filter.author_ids.add(_parse_id(token))
+
+    return purge_filter
+
+def _parse_id(value: str) -> int:
+    cleaned = value.strip('<@!&>')
+    try:
+        return int(cleaned)
+    except ValueError:
+        raise ValueError(f"Filtre inconnu : `{value}`")
+
+class PurgeStats:
+    """Counters of a running purge"""
+
+    def __init__(self):
+        self.scanned = 0
+        self.matched = 0
+        self.deleted = 0
+        self.failed = 0
+        self.started_at = time.monotonic()
+
+    @property
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started_at
+
+async def purge_channel(
+    channel: discord.TextChannel,
+    amount: int,
+    check: Optional[Callable[[discord.Message], bool]] = None,
+    before: Optional[discord.abc.Snowflake] = None,
+    after: Optional[discord.abc.Snowflake] = None,
+    scan_limit: Optional[int] = None,
+    progress: Optional[Callable[[PurgeStats], Awaitable[None]]] = None,
+    progress_interval: float = 2.0,
+    single_delete_concurrency: int = 4,
+    reason: Optional[str] = None
+) -> PurgeStats:
+    """Delete up to `amount` messages matching `check`
+
+    The history is walked lazily. Recent messages are deleted in batches
+    of 100; messages older than 14 days go through a queue of single
+    deletions with bounded concurrency.
+    """
+    stats = PurgeStats()
+    check = check or (lambda message: True)
+    scan_limit = scan_limit or amount
+    cutoff = discord.utils.utcnow() - BULK_DELETE_MAX_AGE
+
+    bulk_batch = []
+    old_queue: asyncio.Queue = asyncio.Queue(maxsize=single_delete_concurrency * 25)
+    last_progress = time.monotonic()
+    # Missing Manage Messages: raised to the caller instead of being counted as failures
+    denied: Optional[discord.Forbidden] = None
+
+    async def report(force=False):
+        nonlocal last_progress
+        if progress is None:
+            return
+        now = time.monotonic()
+        if force or now - last_progress >= progress_interval:
+            last_progress = now
+            try:
+                await progress(stats)
+            except discord.HTTPException:
+                pass
+
+    async def flush_bulk():
+        if not bulk_batch:
+            return
+        batch = bulk_batch[:]
+        bulk_batch.clear()
+        try:
+            await channel.delete_messages(batch, reason=reason)
+            stats.deleted += len(batch)
+        except discord.NotFound:
+            # A message is already gone: fall back to single deletions
+            for message in batch:
+                await old_queue.put(message)
+        except discord.Forbidden:
+            raise
+        except discord.HTTPException:
+            stats.failed += len(batch)
+
+    async def single_delete_worker():
+        nonlocal denied
+        while True:
+            message = await old_queue.get()
+            try:
+                if message is None:
+                    return
+                # Keep draining the queue so the producer never blocks on it
+                if denied is not None:
+                    continue
+                await message.delete()
+                stats.deleted += 1
+            except discord.NotFound:
+                pass
+            except discord.Forbidden as e:
+                denied = e
+            except discord.HTTPException:
+                stats.failed += 1
+            finally:
+                old_queue.task_done()
+
+    workers = [asyncio.create_task(single_delete_worker()) for _ in range(single_delete_concurrency)]
+
+    try:
+        async for message in channel.history(limit=scan_limit, before=before, after=after):
+            stats.scanned += 1
+            if not check(message):
+                continue
+
+            stats.matched += 1
+            if message.created_at > cutoff:
+                bulk_batch.append(message)
+                if len(bulk_batch) >= BULK_DELETE_CHUNK:
+                    await flush_bulk()
+            else:
+                await old_queue.put(message)
+
+            if denied is not None:
+                raise denied
+            await report()
+            if stats.matched >= amount:
+                break
+
+        await flush_bulk()
+        for _ in workers:
+            await old_queue.put(None)
+        await asyncio.gather(*workers)
+        if denied is not None:
+            raise denied
+    finally:
+        for worker in workers:
+            worker.cancel()
+
+    await report(force=True)
+    return stats
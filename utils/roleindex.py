@@ -0,0 +1,61 @@
+from typing import Dict, Iterable
+
+class RoleIndex:
+    """Member count of each role, per guild, kept up to date by events
+
+    A guild is counted in a single pass over its members the first time it
+    is queried; after that, joins, leaves and role changes only adjust the
+    counts of the roles involved and a count costs O(1). Only counts are
+    kept: member lists are computed on demand from the guild's member cache.
+    """
+
+    def __init__(self):
+        self._guilds: Dict[int, Dict[int, int]] = {}
+
+    def is_indexed(self, guild_id: int) -> bool:
+        return guild_id in self._guilds
+
+    def build(self, guild_id: int, members: Iterable):
+        """Count the roles of a guild from its full member list"""
+        counts: Dict[int, int] = {}
+        for member in members:
+            for role_id in member._roles:
+                counts[role_id] = counts.get(role_id, 0) + 1
+        self._guilds[guild_id] = counts
+
+    def drop_guild(self, guild_id: int):
+        self._guilds.pop(guild_id, None)
+
+    def _adjust(self, guild_id: int, role_ids: Iterable[int], delta: int):
+        counts = self._guilds.get(guild_id)
+        if counts is None:
+            return
+        for role_id in role_ids:
+            count = counts.get(role_id, 0) + delta
+            if count > 0:
+                counts[role_id] = count
+            else:
+                counts.pop(role_id, None)
+
+    def add_member(self, guild_id: int, role_ids: Iterable[int]):
+        self._adjust(guild_id, role_ids, 1)
+
+    def remove_member(self, guild_id: int, role_ids: Iterable[int]):
+        self._adjust(guild_id, role_ids, -1)
+
+    def update_member(self, guild_id: int, before: Iterable[int], after: Iterable[int]):
+        before, after = set(before), set(after)
+        self.remove_member(guild_id, before - after)
+        self.add_member(guild_id, after - before)
+
+    def drop_role(self, guild_id: int, role_id: int):
+        counts = self._guilds.get(guild_id)
+        if counts is not None:
+            counts.pop(role_id, None)
+
+    def count(self, guild_id: int, role_id: int) -> int:
+        return self._guilds.get(guild_id, {}).get(role_id, 0)
+
+    def counts(self, guild_id: int) -> Dict[int, int]:
+        """Member count of every role in the guild"""
+        return dict(self._guilds.get(guild_id, {}))
@@ -0,0 +1,98 @@
+import asyncio
+import logging
+import discord
+from typing import Awaitable, Optional
+
+DM_QUEUE_SIZE = 500
+DM_WORKERS = 4
+DM_TIMEOUT = 5.0
+DM_OPEN_TIMEOUT = 2.0
+
+class SanctionPipeline:
+    """Sanction pipeline: a sanction never waits for the direct message
+
+    Notifications go through a bounded queue drained by a few workers with
+    a timeout. For a ban or kick (apply), the sanction is the first request
+    sent; the DM channel opens alongside it and the notice is queued once
+    both are done.
+    """
+
+    def __init__(self, bot, queue_size: int = DM_QUEUE_SIZE, workers: int = DM_WORKERS, timeout: float = DM_TIMEOUT):
+        self.bot = bot
+        self.timeout = timeout
+        self.queue_size = queue_size
+        self.worker_count = workers
+        self.queue: Optional[asyncio.Queue] = None
+        self._workers = []
+        self.logger = logging.getLogger('chdfz gestion.sanctions')
+
+    def start(self):
+        """Start the workers (call from the bot's loop)"""
+        if self._workers:
+            return
+        self.queue = asyncio.Queue(maxsize=self.queue_size)
+        self._workers = [asyncio.create_task(self._dm_worker()) for _ in range(self.worker_count)]
+
+    async def close(self):
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    async def open_dm(self, user: discord.abc.User) -> Optional[discord.DMChannel]:
+        """Open (or reuse) the DM channel, None if Discord refuses or takes too long"""
+        try:
+            return await asyncio.wait_for(user.create_dm(), timeout=DM_OPEN_TIMEOUT)
+        except (discord.HTTPException, asyncio.TimeoutError) as e:
+            self.logger.warning(f"Could not open DM channel with {user.id}: {e!r}")
+            return None
+
+    async def apply(self, user: discord.abc.User, embed: discord.Embed, sanction: Awaitable) -> bool:
+        """Run the sanction with the DM channel opened alongside it, then queue the notice
+
+        The sanction request goes out first and nothing DM-related is awaited
+        before it. The notice is only queued once the sanction succeeded.
+        """
+        sanction_task = asyncio.ensure_future(sanction)
+        dm_task = asyncio.create_task(self.open_dm(user))
+        try:
+            await asyncio.gather(sanction_task, dm_task)
+        except BaseException:
+            dm_task.cancel()
+            raise
+        return self.notify(user, embed, dm_task.result())
+
+    def notify(self, user: discord.abc.User, embed: discord.Embed, channel: Optional[discord.DMChannel] = None) -> bool:
+        """Queue a direct message without waiting. Returns False if the queue is full
+
+        `channel` is the channel returned by open_dm; without it, sending has to open the channel first.
+        """
+        if self.queue is None:
+            return False
+        try:
+            self.queue.put_nowait((user, channel or user, embed))
+            return True
+        except asyncio.QueueFull:
+            self.logger.warning(f"DM queue full, dropping sanction notice for {user.id}")
+            return False
+
+    async def _dm_worker(self):
+        while True:
+            user, destination, embed = await self.queue.get()
+            try:
+                await asyncio.wait_for(destination.send(embed=embed), timeout=self.timeout)
+            except discord.HTTPException as e:
+                # 50007: DMs disabled, or the member no longer shares a server with the bot
+                self.logger.warning(f"Sanction DM to {user.id} not delivered: {e.status} {e.code} {e.text}")
+            except asyncio.TimeoutError:
+                self.logger.warning(f"Sanction DM to {user.id} not delivered: timed out after {self.timeout}s")
+            except Exception as e:
+                self.logger.error(f"Unexpected error while sending sanction DM to {user.id}: {e}")
+            finally:
+                self.queue.task_done()
+
+    async def record(self, guild_id: int, user_id: int, moderator_id: int, action: str, reason: str, duration: Optional[int] = None):
+        """Write the infraction and the moderation log in a single transaction"""
+        await self.bot.db.add_infractions_bulk([
+            (guild_id, user_id, moderator_id, action, reason, duration)
+        ])
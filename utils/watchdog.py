@@ -0,0 +1,125 @@
+import sys
+import time
+import asyncio
+import logging
+import threading
+import traceback
+from collections import deque
+from typing import Any, Dict, List, Optional
+
+# About one hour of samples at the default interval
+SAMPLE_COUNT = 7200
+RECENT_STALLS = 20
+
+def current_task_label(loop: asyncio.AbstractEventLoop) -> Optional[str]:
+    """Name and coroutine of the task running on `loop`, readable from another thread"""
+    # Read without the loop's cooperation: only used for diagnostic labels
+    try:
+        task = asyncio.tasks._current_tasks.get(loop)
+    except AttributeError:
+        return None
+    if task is None:
+        return None
+    coro = task.get_coro()
+    return f"{task.get_name()} ({getattr(coro, '__qualname__', coro)})"
+
+class LoopWatchdog:
+    """Measure asyncio loop lag and capture the stack while the loop is blocked
+
+    A task wakes up every `interval` seconds and measures how late it is.
+    A helper thread watches those wake-ups: if the loop has not woken up
+    for `interval + threshold`, it reads the loop thread's stack during the
+    stall and writes it to the dedicated logger.
+    """
+
+    def __init__(self, logger: logging.Logger, interval: float = 0.5, threshold: float = 0.25):
+        self.logger = logger
+        self.interval = interval
+        self.threshold = threshold
+        self.samples: deque = deque(maxlen=SAMPLE_COUNT)
+        self.stalls: deque = deque(maxlen=RECENT_STALLS)
+        self.stall_count = 0
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread_id: Optional[int] = None
+        self._heartbeat = time.monotonic()
+        self._task: Optional[asyncio.Task] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = threading.Event()
+        # Stack captured by the helper thread for the stall in progress
+        self._pending_stack: Optional[Dict[str, Any]] = None
+
+    def start(self):
+        if self._task is not None:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread_id = threading.get_ident()
+        self._heartbeat = time.monotonic()
+        self._stopping.clear()
+        self._task = asyncio.create_task(self._measure())
+        self._thread = threading.Thread(target=self._watch, name='loop-watchdog', daemon=True)
+        self._thread.start()
+
+    async def close(self):
+        self._stopping.set()
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        if self._thread is not None:
+            await asyncio.to_thread(self._thread.join, self.interval * 2)
+            self._thread = None
+
+    async def _measure(self):
+        while True:
+            started = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, time.perf_counter() - started - self.interval)
+            self._heartbeat = time.monotonic()
+            self.samples.append(lag)
+            if lag >= self.threshold:
+                self._record_stall(lag)
+
+    def _record_stall(self, lag: float):
+        capture, self._pending_stack = self._pending_stack, None
+        self.stall_count += 1
+        stall = {
+            'time': time.time(),
+            'lag': lag,
+            'task': capture['task'] if capture else None,
+            'where': capture['where'] if capture else None
+        }
+        self.stalls.append(stall)
+        if capture:
+            self.logger.warning(
+                f"Event loop blocked for {lag * 1000:.0f} ms in task {capture['task']}\n{capture['stack']}"
+            )
+        else:
+            # Too short for the helper thread to catch it while blocked
+            self.logger.warning(f"Event loop blocked for {lag * 1000:.0f} ms (no stack captured)")
+
+    def _watch(self):
+        deadline = self.interval + self.threshold
+        while not self._stopping.wait(self.threshold / 2):
+            blocked_for = time.monotonic() - self._heartbeat
+            if blocked_for < deadline or self._pending_stack is not None:
+                continue
+            frame = sys._current_frames().get(self._loop_thread_id)
+            if frame is None:
+                continue
+            stack = traceback.extract_stack(frame)
+            self._pending_stack = {
+                'task': current_task_label(self._loop),
+                'where': f"{stack[-1].filename}:{stack[-1].lineno} in {stack[-1].name}" if stack else None,
+                'stack': ''.join(traceback.format_list(stack))
+            }
+
+    def percentiles(self) -> Dict[str, float]:
+        """Loop lag in seconds: p50, p90, p99 and max over the recent samples"""
+        values: List[float] = sorted(self.samples)
+        if not values:
+            return {'p50': 0.0, 'p90': 0.0, 'p99': 0.0, 'max': 0.0}
+
+        def pick(fraction: float) -> float:
+            return values[min(len(values) - 1, int(fraction * len(values)))]
+
+        return {'p50': pick(0.50), 'p90': pick(0.90), 'p99': pick(0.99), 'max': values[-1]}